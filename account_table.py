@@ -0,0 +1,565 @@
+"""
+Mô-đun bảng tài khoản dạng cột (AccountTable): dữ liệu sheet được phân tích
+một lần khi tải (Login ID, equity dạng số, sàn/server/nhánh dạng categorical)
+và dùng chung cho hiển thị, quét, kiểm tra nhánh, tài khoản hết tiền và gợi ý
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+
+from equity_parser import parse_equity_column
+from sheet_client import DISPLAY_START_COL, DISPLAY_END_COL, EQUITY_COL
+
+# Cột tên tài khoản (thường là C)
+NAME_COL = 2
+
+# Chỉ các tài khoản có End Equity lớn hơn mức này mới được dùng làm tài khoản thay thế
+MIN_BRANCH_EQUITY = 100
+# Tài khoản có End Equity dưới mức này được coi là hết tiền
+LOW_EQUITY_THRESHOLD = 100
+
+
+def server_base(server):
+    """Tên server gốc để so khớp: phần trước dấu '-' đầu tiên, chữ thường (MarketEquityInc-Live -> marketequityinc)"""
+    return server.split("-")[0].strip().lower()
+
+
+def broker_key(broker):
+    """Tên sàn đã chuẩn hóa để so khớp (bỏ khoảng trắng hai đầu, chữ thường)"""
+    return broker.strip().lower()
+
+
+class SubstringIndex:
+    """Chỉ mục khóa chuỗi -> vị trí, tìm các khóa khớp chuỗi con theo hai chiều
+    (query nằm trong khóa hoặc khóa nằm trong query) mà không duyệt mọi vị trí
+
+    - Khóa nằm trong query: tra bảng băm với các chuỗi con của query (chỉ các độ dài có trong chỉ mục)
+    - Query nằm trong khóa: tìm nhị phân trên danh sách hậu tố đã sắp xếp của các khóa khác nhau
+    """
+
+    def __init__(self, items):
+        self._positions = {}    # khóa -> các vị trí (tăng dần)
+        for position, key in items:
+            self._positions.setdefault(key, []).append(position)
+        self._key_lengths = sorted(set(len(key) for key in self._positions if key))
+        self._suffixes = sorted((key[start:], key) for key in self._positions for start in range(len(key)))
+
+    def __len__(self):
+        return sum(len(positions) for positions in self._positions.values())
+
+    def exact(self, key):
+        """Các vị trí có khóa đúng bằng key"""
+        return list(self._positions.get(key, ()))
+
+    def matching_keys(self, query, allow_empty=True):
+        """Các khóa k thỏa query in k hoặc k in query (allow_empty=False bỏ qua query/khóa rỗng)"""
+        if not query:
+            return set(self._positions) if allow_empty else set()
+        keys = set()
+        # Khóa nằm trong query
+        for length in self._key_lengths:
+            if length > len(query):
+                break
+            for start in range(len(query) - length + 1):
+                part = query[start:start + length]
+                if part in self._positions:
+                    keys.add(part)
+        # Query nằm trong khóa: các hậu tố bắt đầu bằng query
+        index = bisect_left(self._suffixes, (query,))
+        while index < len(self._suffixes) and self._suffixes[index][0].startswith(query):
+            keys.add(self._suffixes[index][1])
+            index += 1
+        if allow_empty and "" in self._positions:
+            keys.add("")
+        return keys
+
+    def lookup(self, query, allow_empty=True):
+        """Các vị trí khớp với query theo thứ tự tăng dần"""
+        positions = []
+        for key in self.matching_keys(query, allow_empty):
+            positions.extend(self._positions[key])
+        positions.sort()
+        return positions
+
+
+class NgramIndex:
+    """Chỉ mục trigram trên các khóa chuỗi khác nhau: tìm các vị trí có khóa chứa query
+
+    Query dài từ 3 ký tự chỉ kiểm tra các khóa chứa trigram hiếm nhất của query;
+    query ngắn hơn duyệt danh sách khóa khác nhau (không duyệt từng hàng).
+    """
+
+    GRAM = 3
+
+    def __init__(self, items):
+        self._keys = []         # id khóa -> khóa
+        self._positions = []    # id khóa -> các vị trí (tăng dần)
+        self._grams = {}        # trigram -> array id các khóa chứa trigram đó
+        key_ids = {}
+        gram = self.GRAM
+        for position, key in items:
+            key_id = key_ids.get(key)
+            if key_id is None:
+                key_id = key_ids[key] = len(self._keys)
+                self._keys.append(key)
+                self._positions.append([])
+                for part in {key[start:start + gram] for start in range(len(key) - gram + 1)}:
+                    ids = self._grams.get(part)
+                    if ids is None:
+                        ids = self._grams[part] = array("I")
+                    ids.append(key_id)
+            self._positions[key_id].append(position)
+
+    def __len__(self):
+        return sum(len(positions) for positions in self._positions)
+
+    def _matching_ids(self, query):
+        keys = self._keys
+        gram = self.GRAM
+        if len(query) < gram:
+            return [key_id for key_id, key in enumerate(keys) if query in key]
+        candidates = None
+        for start in range(len(query) - gram + 1):
+            ids = self._grams.get(query[start:start + gram])
+            if ids is None:
+                return []
+            if candidates is None or len(ids) < len(candidates):
+                candidates = ids
+        if len(query) == gram:
+            return candidates
+        return [key_id for key_id in candidates if query in keys[key_id]]
+
+    def lookup(self, query):
+        """Tập vị trí có khóa chứa query (query rỗng khớp mọi vị trí)"""
+        positions = set()
+        for key_id in self._matching_ids(query):
+            positions.update(self._positions[key_id])
+        return positions
+
+
+def unique_headers(selected_headers):
+    """Đặt tên cho cột trống và thêm hậu tố _1, _2... cho các header trùng lặp"""
+    result = []
+    header_count = {}
+    for header in selected_headers:
+        if not header:
+            header = "Column"  # Đặt tên mặc định cho cột trống
+        if header in header_count:
+            header_count[header] += 1
+            result.append(f"{header}_{header_count[header]}")
+        else:
+            header_count[header] = 0
+            result.append(header)
+    return result
+
+
+def display_layout(headers, config):
+    """Tên (đã khử trùng) và vị trí các cột hiển thị C..P, giới hạn theo số cột của header"""
+    display_end = min(config.display_end, len(headers) - 1)
+    display_headers = unique_headers(headers[config.display_start:display_end + 1])
+    display_columns = list(range(config.display_start, config.display_start + len(display_headers)))
+    return display_headers, display_columns
+
+
+class ColumnConfig:
+    """Vị trí (index từ 0) các cột đã cấu hình; -1 nghĩa là không cấu hình"""
+
+    def __init__(self, login, broker, server, password, branch, equity=EQUITY_COL, name=NAME_COL,
+                 display_start=DISPLAY_START_COL, display_end=DISPLAY_END_COL):
+        self.login = login
+        self.broker = broker
+        self.server = server
+        self.password = password
+        self.branch = branch
+        self.equity = equity
+        self.name = name
+        self.display_start = display_start
+        self.display_end = display_end
+
+    def stored_columns(self):
+        """Các cột cần giữ lại: vùng hiển thị và các cột đã cấu hình"""
+        columns = set(range(self.display_start, self.display_end + 1))
+        for index in (self.login, self.broker, self.server, self.password, self.branch, self.equity, self.name):
+            if index is not None and index >= 0:
+                columns.add(index)
+        return sorted(columns)
+
+    def __eq__(self, other):
+        return isinstance(other, ColumnConfig) and vars(self) == vars(other)
+
+
+class CategoricalColumn:
+    """Cột giá trị lặp lại nhiều (sàn, server, nhánh...): lưu mã số + danh sách giá trị duy nhất"""
+
+    __slots__ = ("codes", "categories", "_code_by_value")
+
+    def __init__(self):
+        self.codes = array("I")
+        self.categories = []
+        self._code_by_value = {}
+
+    @classmethod
+    def from_values(cls, values):
+        column = cls()
+        codes = column.codes
+        code_by_value = column._code_by_value
+        categories = column.categories
+        for value in values:
+            code = code_by_value.get(value)
+            if code is None:
+                code = code_by_value[value] = len(categories)
+                categories.append(value)
+            codes.append(code)
+        return column
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        return self.categories[self.codes[index]]
+
+    def __iter__(self):
+        categories = self.categories
+        return (categories[code] for code in self.codes)
+
+    def code_of(self, value):
+        """Mã của một giá trị, -1 nếu không có trong cột"""
+        return self._code_by_value.get(value, -1)
+
+    def map(self, func):
+        """Cột mới với func áp dụng một lần cho mỗi giá trị duy nhất (không phải mỗi hàng)"""
+        mapped = CategoricalColumn()
+        remap = array("I")
+        for value in self.categories:
+            new_value = func(value)
+            code = mapped._code_by_value.get(new_value)
+            if code is None:
+                code = mapped._code_by_value[new_value] = len(mapped.categories)
+                mapped.categories.append(new_value)
+            remap.append(code)
+        mapped.codes = array("I", (remap[code] for code in self.codes))
+        return mapped
+
+
+def _compact_column(values):
+    """Cột ít giá trị khác nhau được lưu dạng categorical, ngược lại giữ list"""
+    column = CategoricalColumn.from_values(values)
+    if len(column.categories) * 2 > len(column.codes):
+        return values
+    return column
+
+
+def _strip(value):
+    return "" if value is None else str(value).strip()
+
+
+class EquityIndex:
+    """Vị trí hàng sắp xếp sẵn theo End Equity giảm dần; truy vấn theo khoảng equity bằng bisect"""
+
+    __slots__ = ("rows", "_neg_equity")
+
+    def __init__(self, rows, equity):
+        # Sắp xếp ổn định: các tài khoản cùng equity giữ thứ tự trong sheet
+        rows = sorted(rows, key=lambda index: -equity[index])
+        self.rows = array("I", rows)
+        self._neg_equity = array("d", (-equity[index] for index in rows))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _bounds(self, low, high):
+        start = 0 if high is None else bisect_right(self._neg_equity, -high)
+        end = len(self.rows) if low is None else bisect_right(self._neg_equity, -low)
+        return start, max(start, end)
+
+    def above(self, min_equity):
+        """Vị trí các hàng có equity > min_equity (một lần bisect, không duyệt lại)"""
+        return self.rows[:bisect_left(self._neg_equity, -min_equity)]
+
+    def range(self, low=None, high=None):
+        """Vị trí các hàng có low <= equity < high (None = không giới hạn), theo equity giảm dần"""
+        start, end = self._bounds(low, high)
+        return self.rows[start:end]
+
+    def count(self, low=None, high=None):
+        """Số hàng có low <= equity < high"""
+        start, end = self._bounds(low, high)
+        return end - start
+
+
+class BranchBucket(EquityIndex):
+    """Các tài khoản hợp lệ của một nhánh, sắp xếp sẵn theo End Equity giảm dần"""
+
+    __slots__ = ("name",)
+
+    def __init__(self, name, rows, equity):
+        super().__init__(rows, equity)
+        self.name = name
+
+
+class AccountTable:
+    """Toàn bộ dữ liệu tài khoản của sheet dưới dạng cột, được phân tích một lần khi tải
+
+    Vị trí hàng (0, 1, 2...) tính từ hàng ngay sau hàng tiêu đề, trùng với vị trí
+    trong snapshot đồng bộ tăng dần và vị trí lưu trong checkbox của bảng hiển thị.
+    """
+
+    def __init__(self, header_rows, header_row, config, row_lengths, columns, row_sources=None,
+                 branch_extractor=None):
+        self.header_rows = header_rows          # Các hàng từ đầu sheet tới hàng tiêu đề
+        self.header_row = header_row            # Hàng tiêu đề (tính từ 1)
+        self.headers = header_rows[header_row - 1] if len(header_rows) >= header_row else []
+        self.config = config
+        self.row_lengths = row_lengths          # Độ dài gốc của từng hàng
+        self._columns = columns                 # index cột -> list hoặc CategoricalColumn
+        self.row_sources = row_sources or []
+
+        # Vùng hiển thị (C..P, giới hạn theo số cột của header)
+        self.display_start = config.display_start
+        self.display_headers, self.display_columns = display_layout(self.headers, config)
+        # Các hàng có dữ liệu trong vùng hiển thị (hàng quá ngắn không hiển thị)
+        self.display_rows = [i for i, length in enumerate(row_lengths) if length > self.display_start]
+
+        # Các cột đã phân tích kiểu một lần
+        self.login_ids = [_strip(value) for value in self.column(config.login)]
+        # End Equity của cả cột được đọc một lần; equity_valid[i] = 0 khi ô trống/không đọc được
+        self.equity, self.equity_valid, self.equity_decimal = parse_equity_column(self.column(config.equity))
+        # Mọi hàng sắp xếp theo equity để truy vấn theo ngưỡng/khoảng mà không duyệt lại
+        self.equity_index = EquityIndex(range(len(row_lengths)), self.equity)
+        self.broker = CategoricalColumn.from_values(_strip(value) for value in self.column(config.broker))
+        self.server = CategoricalColumn.from_values(_strip(value) for value in self.column(config.server))
+        self.note = CategoricalColumn.from_values(_strip(value) for value in self.column(config.branch))
+        # Khóa so khớp đã chuẩn hóa, tính một lần cho mỗi giá trị khác nhau
+        self.server_base = self.server.map(server_base)
+        self.broker_key = self.broker.map(broker_key)
+        self._suggestion_indexes = {}
+        self._search_indexes = {}
+        # Trích xuất tên nhánh một lần cho mỗi ghi chú khác nhau, rồi dựng chỉ mục nhánh
+        self.set_branches(self.note if branch_extractor is None else self.note.map(branch_extractor))
+
+        # Chỉ mục Login ID -> vị trí hàng, dựng một lần cho mỗi lần tải
+        self.login_index = {}          # Login ID -> vị trí hàng đầu tiên
+        self._login_duplicates = {}    # Login ID xuất hiện nhiều lần -> mọi vị trí
+        for index, login_id in enumerate(self.login_ids):
+            if not login_id:
+                continue
+            first = self.login_index.setdefault(login_id, index)
+            if first != index:
+                self._login_duplicates.setdefault(login_id, [first]).append(index)
+
+    def set_branches(self, branch):
+        """Gán cột tên nhánh (đã trích xuất từ ghi chú) và dựng lại chỉ mục nhánh"""
+        self.branch = branch
+        self._build_branch_index()
+
+    def _build_branch_index(self):
+        """Tên nhánh (chữ thường) -> BranchBucket các tài khoản đủ thông tin để đăng nhập"""
+        config = self.config
+        self.branch_names = sorted(set(name for name in self.branch.categories if name))
+        self.branch_index = {}
+        cols = (config.login, config.broker, config.server, config.password, config.branch, config.equity)
+        if min(cols) < 0:
+            return
+        buckets = {}
+        display_names = {}
+        for index, login_id in enumerate(self.login_ids):
+            if not login_id or not self.note[index] or not self.has_columns(index, *cols):
+                continue
+            if not self.broker[index] or not self.text(index, config.password):
+                continue
+            name = self.branch[index]
+            key = name.lower()
+            buckets.setdefault(key, []).append(index)
+            display_names.setdefault(key, name)
+        for key, rows in buckets.items():
+            self.branch_index[key] = BranchBucket(display_names[key], rows, self.equity)
+
+    def branch_rows(self, branch, min_equity=MIN_BRANCH_EQUITY):
+        """Vị trí các tài khoản của nhánh có equity > min_equity, theo equity giảm dần"""
+        bucket = self.branch_index.get(branch.lower())
+        if bucket is None:
+            return array("I")
+        return bucket.above(min_equity)
+
+    def rows_in_range(self, low=None, high=None, branch=None):
+        """Vị trí các hàng có low <= End Equity < high (của cả sheet hoặc của một nhánh), theo equity giảm dần"""
+        if branch is None:
+            return self.equity_index.range(low, high)
+        bucket = self.branch_index.get(branch.lower())
+        if bucket is None:
+            return array("I")
+        return bucket.range(low, high)
+
+    def suggestion_index(self, min_equity=MIN_BRANCH_EQUITY):
+        """Chỉ mục các tài khoản có thể gợi ý thay thế (đủ cột, End Equity > min_equity)
+
+        Trả về (rows, server_index, broker_index): rows là vị trí hàng sắp xếp theo equity
+        giảm dần, các chỉ mục trả về vị trí trong rows. Dựng một lần cho mỗi ngưỡng trong mỗi lần tải.
+        """
+        suggestion_index = self._suggestion_indexes.get(min_equity)
+        if suggestion_index is None:
+            config = self.config
+            cols = (config.login, config.broker, config.server, config.name, config.equity, config.password)
+            rows = [index for index in self.equity_index.above(min_equity) if self.has_columns(index, *cols)]
+            suggestion_index = self._suggestion_indexes[min_equity] = (
+                rows,
+                SubstringIndex((position, self.server_base[index]) for position, index in enumerate(rows)),
+                SubstringIndex((position, self.broker_key[index]) for position, index in enumerate(rows)),
+            )
+        return suggestion_index
+
+    def search_index(self, cols):
+        """Chỉ mục tìm kiếm theo chuỗi con (chữ thường) trên các cột cols cho ô tìm kiếm
+
+        Vị trí trả về là vị trí trong display_rows (trùng với hàng trên bảng hiển thị khi
+        mọi hàng hiển thị đều có mặt). Dựng một lần cho mỗi bộ cột trong mỗi lần tải.
+        """
+        cols = tuple(cols)
+        index = self._search_indexes.get(cols)
+        if index is None:
+            index = self._search_indexes[cols] = NgramIndex(
+                (position, str(self.cell(row, col)).lower())
+                for col in cols for position, row in enumerate(self.display_rows))
+        return index
+
+    @classmethod
+    def from_values(cls, all_values, header_row, config, branch_extractor=None, row_sources=None):
+        """Dựng bảng từ dữ liệu thô (list các hàng, header_row tính từ 1)"""
+        header_rows = [list(row) for row in all_values[:header_row]]
+        data_values = all_values[header_row:]
+        row_lengths = array("I", (len(row) for row in data_values))
+        columns = {}
+        for col in config.stored_columns():
+            values = [row[col] if col < len(row) else "" for row in data_values]
+            columns[col] = _compact_column(values)
+        return cls(header_rows, header_row, config, row_lengths, columns, row_sources, branch_extractor)
+
+    @classmethod
+    def from_columns(cls, row_lengths, columns, header_row, config, branch_extractor=None, row_sources=None):
+        """Dựng bảng thẳng từ dữ liệu dạng cột (snapshot lưu tạm): columns[index cột] là mọi giá
+        trị của cột kể cả các hàng tiêu đề, row_lengths là độ dài gốc của từng hàng"""
+        header_rows = [[columns[col][r] if col in columns else "" for col in range(row_lengths[r])]
+                       for r in range(min(header_row, len(row_lengths)))]
+        data_lengths = array("I", row_lengths[header_row:])
+        stored = {}
+        for col in config.stored_columns():
+            values = columns.get(col)
+            stored[col] = _compact_column(values[header_row:] if values is not None else [""] * len(data_lengths))
+        return cls(header_rows, header_row, config, data_lengths, stored, row_sources, branch_extractor)
+
+    def __len__(self):
+        return len(self.row_lengths)
+
+    def rows_for_login(self, login_id):
+        """Mọi vị trí hàng có Login ID đã cho (theo thứ tự trong sheet)"""
+        if login_id in self._login_duplicates:
+            return self._login_duplicates[login_id]
+        index = self.login_index.get(login_id)
+        return [] if index is None else [index]
+
+    def find_login(self, login_id, *cols):
+        """Vị trí hàng đầu tiên có Login ID đã cho và đủ độ dài chứa các cột cols, None nếu không có"""
+        for index in self.rows_for_login(login_id):
+            if not cols or self.has_columns(index, *cols):
+                return index
+        return None
+
+    def column(self, col):
+        """Toàn bộ giá trị của một cột đã lưu (rỗng nếu cột không được lưu)"""
+        if col is None or col < 0 or col not in self._columns:
+            return [""] * len(self)
+        return self._columns[col]
+
+    def cell(self, index, col):
+        """Giá trị gốc của một ô ("" nếu hàng ngắn hơn hoặc cột không được lưu)"""
+        if col is None or col < 0 or col >= self.row_lengths[index]:
+            return ""
+        column = self._columns.get(col)
+        return "" if column is None else column[index]
+
+    def text(self, index, col):
+        """Giá trị của một ô dưới dạng chuỗi đã bỏ khoảng trắng"""
+        return _strip(self.cell(index, col))
+
+    def has_columns(self, index, *cols):
+        """Hàng có đủ độ dài để chứa tất cả các cột đã cho không"""
+        return self.row_lengths[index] > max(cols)
+
+    def row(self, index):
+        """Dựng lại một hàng (chỉ các cột đã lưu) để in ra console/debug"""
+        return [self.cell(index, col) for col in range(self.row_lengths[index])]
+
+    def display_values(self, index):
+        """Các giá trị hiển thị (C..P) của một hàng"""
+        return [self.cell(index, col) for col in self.display_columns]
+
+    def display_column(self, header):
+        """Giá trị của một cột hiển thị theo tên header, theo thứ tự các hàng hiển thị"""
+        col = self.display_columns[self.display_headers.index(header)]
+        return [self.cell(index, col) for index in self.display_rows]
+
+    def display_column_index(self, col):
+        """Vị trí của cột trong vùng hiển thị, None nếu cột nằm ngoài vùng"""
+        if col in self.display_columns:
+            return self.display_columns.index(col)
+        return None
+
+    def raw_row_lengths(self):
+        """Độ dài gốc của mọi hàng kể cả các hàng tiêu đề (dùng khi lưu tạm)"""
+        return [len(row) for row in self.header_rows] + list(self.row_lengths)
+
+    def raw_columns(self):
+        """Từng cột gồm cả các hàng tiêu đề để lưu tạm theo cột; cột không được lưu để trống"""
+        width = max(self.raw_row_lengths(), default=0)
+        for col in range(width):
+            values = [row[col] if col < len(row) else "" for row in self.header_rows]
+            column = self._columns.get(col)
+            values.extend([""] * len(self) if column is None else column)
+            yield values
+
+    def source(self, index, default=""):
+        """Worksheet nguồn của hàng"""
+        if 0 <= index < len(self.row_sources):
+            return self.row_sources[index]
+        return default
+
+
+class AccountTableBuilder:
+    """Dựng AccountTable dần dần từ từng trang hàng dữ liệu (tải theo trang)
+
+    Mỗi trang chỉ được chép các cột cần lưu vào các list cột rồi bỏ đi, nên bộ nhớ
+    tạm trong lúc tải chỉ phụ thuộc kích thước trang chứ không phụ thuộc cả sheet.
+    """
+
+    def __init__(self, header_rows, header_row, config, branch_extractor=None):
+        self.header_rows = [list(row) for row in header_rows[:header_row]]
+        self.header_row = header_row
+        self.config = config
+        self.branch_extractor = branch_extractor
+        headers = self.header_rows[header_row - 1] if len(self.header_rows) >= header_row else []
+        self.display_headers, self.display_columns = display_layout(headers, config)
+        self.row_lengths = array("I")
+        self.row_sources = []
+        self._stored = config.stored_columns()
+        self._columns = {col: [] for col in self._stored}
+
+    def __len__(self):
+        return len(self.row_lengths)
+
+    def append(self, rows, source=""):
+        """Thêm một trang hàng dữ liệu, trả về list (vị trí, giá trị hiển thị) của các hàng hiển thị được"""
+        start = len(self.row_lengths)
+        for col in self._stored:
+            self._columns[col].extend(row[col] if col < len(row) else "" for row in rows)
+        self.row_lengths.extend(len(row) for row in rows)
+        self.row_sources.extend([source] * len(rows))
+        display_start = self.config.display_start
+        display_columns = self.display_columns
+        return [(start + offset, [row[col] if col < len(row) else "" for col in display_columns])
+                for offset, row in enumerate(rows) if len(row) > display_start]
+
+    def build(self):
+        """Tạo AccountTable từ các trang đã thêm"""
+        columns = {col: _compact_column(values) for col, values in self._columns.items()}
+        return AccountTable(self.header_rows, self.header_row, self.config, self.row_lengths, columns,
+                            self.row_sources, self.branch_extractor)
@@ -0,0 +1,90 @@
+"""
+Mô-đun trích xuất tên nhánh từ ghi chú (Note1): một biểu thức chính quy gộp
+tất cả tên nhánh đã cấu hình, kết quả được nhớ theo từng giá trị ghi chú
+"""
+
+import re
+
+# Danh sách nhánh mặc định (thứ tự = độ ưu tiên khi ghi chú chứa nhiều nhánh)
+DEFAULT_BRANCH_NAMES = [
+    "nhánh a khang", "nhánh phát", "nhánh hoàng", "nhánh anh khang",
+    "nhánh phú", "nhánh đạt", "nhánh đức", "nhánh tuấn", "nhánh tân",
+    "nhánh hải", "nhánh hùng", "nhánh long", "nhánh quân", "nhánh minh",
+    "nhánh thái", "nhánh thành", "nhánh son", "nhánh khánh", "nhánh khoa"
+]
+
+# Từ khóa dự phòng khi ghi chú không chứa nhánh nào trong danh sách
+BRANCH_KEYWORDS = ("nhánh",)
+# Từ khóa dùng khi quét tài khoản và kiểm tra thông tin nhánh trong sheet
+SCAN_BRANCH_KEYWORDS = ("nhánh", "branch", "chi nhánh")
+
+# Giới hạn số ghi chú được nhớ (tránh phình bộ nhớ khi dữ liệu thay đổi nhiều lần)
+MAX_CACHED_NOTES = 50000
+
+
+def parse_branch_names(entries):
+    """Chuẩn hóa danh sách nhánh từ cấu hình (list hoặc chuỗi nhiều dòng), bỏ trùng, giữ thứ tự"""
+    if isinstance(entries, str):
+        entries = entries.splitlines()
+    names = []
+    for entry in entries or []:
+        name = str(entry).strip().lower()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+class BranchMatcher:
+    """Trích xuất tên nhánh: tìm nhánh cụ thể bằng một regex gộp, nếu không có thì
+    lấy phần sau từ khóa, cuối cùng dùng nguyên ghi chú
+
+    Nhánh đứng trước trong danh sách được ưu tiên khi ghi chú chứa nhiều nhánh.
+    Regex dùng lookahead nên tìm được cả các tên nhánh chồng lên nhau.
+    """
+
+    def __init__(self, branch_names=None, keywords=BRANCH_KEYWORDS):
+        self.branch_names = parse_branch_names(DEFAULT_BRANCH_NAMES if branch_names is None else branch_names)
+        self.keywords = tuple(keywords)
+        self._priority = {}
+        for priority, name in enumerate(self.branch_names):
+            self._priority.setdefault(name, priority)
+        self._pattern = None
+        if self.branch_names:
+            self._pattern = re.compile("(?=(" + "|".join(re.escape(name) for name in self.branch_names) + "))")
+        self._cache = {}
+
+    def find_specific(self, note_lower):
+        """Nhánh cụ thể có độ ưu tiên cao nhất xuất hiện trong ghi chú (chữ thường), "" nếu không có"""
+        if self._pattern is None:
+            return ""
+        best = None
+        for match in self._pattern.finditer(note_lower):
+            priority = self._priority[match.group(1)]
+            if best is None or priority < best:
+                best = priority
+                if best == 0:
+                    break
+        return "" if best is None else self.branch_names[best]
+
+    def _extract(self, note_value):
+        note_value_lower = note_value.lower()
+        branch_name = self.find_specific(note_value_lower)
+        # Nếu không tìm thấy trong danh sách cụ thể, thử tìm theo từ khóa
+        if not branch_name:
+            for keyword in self.keywords:
+                if keyword in note_value_lower:
+                    branch_name = keyword + note_value_lower.split(keyword, 2)[1].strip()
+                    break
+        # Nếu vẫn không tìm thấy từ khóa nhánh, sử dụng toàn bộ giá trị note
+        return branch_name or note_value
+
+    def extract(self, note_value):
+        """Tên nhánh của một ghi chú (nhớ kết quả theo giá trị ghi chú)"""
+        if not note_value:
+            return ""
+        branch_name = self._cache.get(note_value)
+        if branch_name is None:
+            if len(self._cache) >= MAX_CACHED_NOTES:
+                self._cache.clear()
+            branch_name = self._cache[note_value] = self._extract(note_value)
+        return branch_name
@@ -0,0 +1,276 @@
+"""
+Mô-đun nguồn dữ liệu tài khoản: Google Sheets và các nguồn cục bộ (CSV, XLSX, SQLite)
+cùng trả về dữ liệu dạng hàng giống get_all_values() để nạp vào AccountTable
+
+Mỗi nguồn có các bước connect() -> open() -> probe_revision() -> fetch_values()
+(hoặc iter_pages() khi tải theo trang), được SheetLoadWorker gọi trên luồng nền.
+"""
+
+import os
+import csv
+import sqlite3
+
+from sheet_client import (EQUITY_COL, cell_text, fetch_projected_values, fetch_values_paged,
+                          probe_revision, source_key)
+
+SOURCE_GOOGLE = "google"
+SOURCE_CSV = "csv"
+SOURCE_XLSX = "xlsx"
+SOURCE_SQLITE = "sqlite"
+
+# Tên hiển thị của từng loại nguồn (theo thứ tự trong hộp chọn)
+SOURCE_TYPES = {
+    SOURCE_GOOGLE: "Google Sheets",
+    SOURCE_CSV: "Tệp CSV",
+    SOURCE_XLSX: "Tệp Excel (XLSX)",
+    SOURCE_SQLITE: "Cơ sở dữ liệu SQLite",
+}
+
+LOCAL_SOURCE_TYPES = (SOURCE_CSV, SOURCE_XLSX, SOURCE_SQLITE)
+
+# Số hàng mỗi trang khi tải theo trang
+DEFAULT_PAGE_SIZE = 2000
+
+
+def normalize_row(row, numeric_columns=(EQUITY_COL,)):
+    """Chuẩn hóa một hàng: ô là chuỗi, cột equity giữ giá trị số, bỏ các ô trống cuối hàng"""
+    values = []
+    for col, value in enumerate(row):
+        if col in numeric_columns and isinstance(value, (int, float)) and not isinstance(value, bool):
+            values.append(value)
+        else:
+            values.append(cell_text(value))
+    while values and values[-1] == "":
+        values.pop()
+    return values
+
+
+def normalize_rows(rows, numeric_columns=(EQUITY_COL,)):
+    """Chuẩn hóa dữ liệu cục bộ giống Google Sheets: ô là chuỗi, cột equity giữ giá trị số,
+    các hàng được đệm cho đủ độ rộng của hàng dài nhất"""
+    normalized = []
+    width = 0
+    for row in rows:
+        values = normalize_row(row, numeric_columns)
+        width = max(width, len(values))
+        normalized.append(values)
+    while normalized and not normalized[-1]:
+        normalized.pop()
+    for values in normalized:
+        if len(values) < width:
+            values.extend([""] * (width - len(values)))
+    return normalized
+
+
+def paged_rows(rows, page_size=DEFAULT_PAGE_SIZE, numeric_columns=(EQUITY_COL,)):
+    """Chia luồng hàng thành các trang page_size hàng đã chuẩn hóa
+
+    Hàng được đệm theo độ rộng lớn nhất đã gặp (thường là hàng tiêu đề) vì chưa
+    biết độ rộng của cả sheet. Các hàng trống được giữ lại cho tới khi gặp hàng có
+    dữ liệu phía sau, nhờ vậy hàng trống ở cuối sheet bị bỏ như get_all_values().
+    """
+    page = []
+    blank_rows = 0
+    width = 0
+    for row in rows:
+        values = normalize_row(row, numeric_columns)
+        if not values:
+            blank_rows += 1
+            continue
+        width = max(width, len(values))
+        for _ in range(blank_rows):
+            page.append([""] * width)
+            if len(page) >= page_size:
+                yield page
+                page = []
+        blank_rows = 0
+        if len(values) < width:
+            values.extend([""] * (width - len(values)))
+        page.append(values)
+        if len(page) >= page_size:
+            yield page
+            page = []
+    if page:
+        yield page
+
+
+def file_revision(path):
+    """Dấu hiệu phiên bản của tệp cục bộ: thời điểm sửa + kích thước"""
+    stat = os.stat(path)
+    return f"file:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+class DataSource:
+    """Giao diện chung của một nguồn dữ liệu tài khoản"""
+
+    kind = ""
+
+    def __init__(self, location, name=""):
+        self.location = location    # URL sheet hoặc đường dẫn tệp
+        self.name = name            # Tên worksheet / sheet Excel / bảng SQLite
+        self.handle = None          # Worksheet gspread (chỉ với Google Sheets)
+
+    @property
+    def key(self):
+        """Khóa duy nhất của nguồn (dùng cho lưu tạm và so sánh phiên bản)"""
+        return source_key(self.location, self.name)
+
+    def label(self, primary_location=None):
+        """Nhãn ngắn gọn để gắn vào từng hàng khi gộp nhiều nguồn"""
+        if self.name and (primary_location is None or self.location == primary_location):
+            return self.name
+        if self.name:
+            return f"{self.name} @ {self.location}"
+        return os.path.basename(self.location) or self.location
+
+    def connect(self):
+        """Xác thực / kiểm tra nguồn có truy cập được không"""
+
+    def open(self):
+        """Mở nguồn trước khi kiểm tra phiên bản và tải"""
+
+    def probe_revision(self):
+        """Dấu hiệu phiên bản rẻ (None nếu không xác định được)"""
+        return None
+
+    def fetch_values(self, column_indexes=None, header_row=1):
+        """Toàn bộ dữ liệu dạng list các hàng (gồm các hàng tiêu đề)"""
+        raise NotImplementedError
+
+    def iter_rows(self, column_indexes=None, header_row=1, page_size=DEFAULT_PAGE_SIZE):
+        """Luồng hàng thô từ đầu nguồn; mặc định đọc toàn bộ qua fetch_values()"""
+        return iter(self.fetch_values(column_indexes, header_row))
+
+    def iter_pages(self, column_indexes=None, header_row=1, page_size=DEFAULT_PAGE_SIZE):
+        """Dữ liệu theo từng trang page_size hàng (gồm các hàng tiêu đề ở trang đầu)"""
+        return paged_rows(self.iter_rows(column_indexes, header_row, page_size), page_size)
+
+
+class GoogleSheetSource(DataSource):
+    """Worksheet Google Sheets, dùng chung GoogleClientManager giữa các lần tải"""
+
+    kind = SOURCE_GOOGLE
+
+    def __init__(self, client_manager, sheet_url, worksheet_name, sentinel_range=None):
+        super().__init__(sheet_url, worksheet_name)
+        self.client_manager = client_manager
+        self.sentinel_range = sentinel_range
+
+    def connect(self):
+        self.client_manager.client()
+
+    def open(self):
+        self.handle = self.client_manager.worksheet(self.location, self.name)
+
+    def probe_revision(self):
+        return probe_revision(self.client_manager.spreadsheet(self.location), self.handle, self.sentinel_range)
+
+    def fetch_values(self, column_indexes=None, header_row=1):
+        try:
+            if column_indexes:
+                return fetch_projected_values(self.handle, column_indexes)
+            return self.handle.get_all_values()
+        except Exception:
+            # Handle có thể đã hỏng (sheet bị đổi tên/xóa), mở lại ở lần tải sau
+            self.client_manager.invalidate(self.location)
+            raise
+
+    def iter_rows(self, column_indexes=None, header_row=1, page_size=DEFAULT_PAGE_SIZE):
+        try:
+            for page in fetch_values_paged(self.handle, column_indexes, page_size):
+                yield from page
+        except Exception:
+            self.client_manager.invalidate(self.location)
+            raise
+
+
+class LocalFileSource(DataSource):
+    """Nguồn là tệp cục bộ; phiên bản được xác định theo thời điểm sửa và kích thước tệp"""
+
+    def connect(self):
+        if not os.path.exists(self.location):
+            raise FileNotFoundError(f"Không tìm thấy tệp dữ liệu: {self.location}")
+
+    def probe_revision(self):
+        return file_revision(self.location)
+
+    def fetch_values(self, column_indexes=None, header_row=1):
+        return normalize_rows(self.iter_rows(column_indexes, header_row))
+
+
+class CsvSource(LocalFileSource):
+    """Tệp CSV xuất từ sheet (giữ nguyên vị trí cột và các hàng trước hàng tiêu đề)"""
+
+    kind = SOURCE_CSV
+
+    def iter_rows(self, column_indexes=None, header_row=1, page_size=DEFAULT_PAGE_SIZE):
+        with open(self.location, "r", encoding="utf-8-sig", newline="") as f:
+            sample = f.read(4096)
+            f.seek(0)
+            try:
+                dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+            except csv.Error:
+                dialect = csv.excel
+            yield from csv.reader(f, dialect)
+
+
+class XlsxSource(LocalFileSource):
+    """Tệp Excel (XLSX) xuất từ sheet, đọc ở chế độ read-only; name là tên sheet (trống = sheet đầu)"""
+
+    kind = SOURCE_XLSX
+
+    def iter_rows(self, column_indexes=None, header_row=1, page_size=DEFAULT_PAGE_SIZE):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise RuntimeError("Cần cài đặt thư viện openpyxl để đọc tệp Excel (pip install openpyxl)")
+        workbook = load_workbook(self.location, read_only=True, data_only=True)
+        try:
+            sheet = workbook[self.name] if self.name else workbook.worksheets[0]
+            yield from sheet.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+
+
+class SqliteSource(LocalFileSource):
+    """Bảng trong tệp SQLite; name là tên bảng (trống = bảng đầu tiên)
+
+    Thứ tự cột của bảng tương ứng với các cột A, B, C... của sheet. Tên cột được dùng
+    làm hàng tiêu đề, đặt đúng vị trí header_row đã cấu hình.
+    """
+
+    kind = SOURCE_SQLITE
+
+    def _table_name(self, connection):
+        if self.name:
+            return self.name
+        row = connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY rowid LIMIT 1").fetchone()
+        if row is None:
+            raise ValueError(f"Không có bảng nào trong {self.location}")
+        return row[0]
+
+    def iter_rows(self, column_indexes=None, header_row=1, page_size=DEFAULT_PAGE_SIZE):
+        connection = sqlite3.connect(f"file:{self.location}?mode=ro", uri=True)
+        try:
+            table = self._table_name(connection)
+            cursor = connection.execute('SELECT * FROM "{}"'.format(table.replace('"', '""')))
+            # Các hàng trống phía trước để hàng tiêu đề nằm đúng vị trí cấu hình
+            for _ in range(max(0, header_row - 1)):
+                yield []
+            yield [description[0] for description in cursor.description]
+            while True:
+                rows = cursor.fetchmany(page_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            connection.close()
+
+
+def create_local_source(kind, path, name=""):
+    """Tạo nguồn cục bộ theo loại (csv/xlsx/sqlite)"""
+    classes = {SOURCE_CSV: CsvSource, SOURCE_XLSX: XlsxSource, SOURCE_SQLITE: SqliteSource}
+    if kind not in classes:
+        raise ValueError(f"Loại nguồn dữ liệu không hợp lệ: {kind}")
+    return classes[kind](path, name)
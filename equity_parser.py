@@ -0,0 +1,136 @@
+"""
+Mô-đun chuyển cột End Equity sang số: phân tích cả cột một lần khi tải, tự
+nhận dạng dấu thập phân của cột (3.482,67 / 3,482.67 / 3.482.67) và trả về
+mảng số thực kèm mặt nạ hợp lệ cho từng hàng
+"""
+
+import math
+from array import array
+
+DECIMAL_DOT = "."
+DECIMAL_COMMA = ","
+
+# Số giá trị tối đa được xem xét khi đoán dấu thập phân của cột
+LOCALE_SAMPLE_SIZE = 2000
+
+# Ký tự bị bỏ qua khi đọc số (khoảng trắng, khoảng trắng không ngắt, ký hiệu tiền tệ)
+_IGNORED_CHARS = str.maketrans("", "", " \u00a0$€")
+
+
+def _vote_decimal(text):
+    """Dấu thập phân mà một chuỗi số gợi ý rõ ràng, None nếu không rõ"""
+    has_dot = "." in text
+    has_comma = "," in text
+    if has_dot and has_comma:
+        # Dấu xuất hiện sau cùng là dấu thập phân: 3.482,67 -> ',' ; 3,482.67 -> '.'
+        return DECIMAL_COMMA if text.rfind(",") > text.rfind(".") else DECIMAL_DOT
+    if has_comma and text.count(",") > 1:
+        return DECIMAL_DOT      # 1,234,567 -> phẩy phân cách hàng nghìn
+    if has_comma and len(text) - text.rfind(",") - 1 != 3:
+        return DECIMAL_COMMA    # 3482,67 -> phẩy không thể là dấu hàng nghìn
+    if has_dot and text.count(".") > 1 and len(text) - text.rfind(".") - 1 == 3:
+        return DECIMAL_COMMA    # 1.234.567 -> chấm phân cách hàng nghìn
+    if has_dot and text.count(".") == 1 and len(text) - text.rfind(".") - 1 != 3:
+        return DECIMAL_DOT      # 3482.67 -> chấm không thể là dấu hàng nghìn
+    return None
+
+
+def detect_decimal_separator(values, sample_size=LOCALE_SAMPLE_SIZE):
+    """Đoán dấu thập phân của cả cột từ các giá trị không mơ hồ
+
+    Mặc định là dấu phẩy (định dạng Việt Nam) khi không có giá trị nào gợi ý rõ ràng,
+    giống cách đọc "3482,67" trước đây.
+    """
+    votes = {DECIMAL_DOT: 0, DECIMAL_COMMA: 0}
+    checked = 0
+    for value in values:
+        if not isinstance(value, str):
+            continue
+        vote = _vote_decimal(value.translate(_IGNORED_CHARS))
+        if vote is None:
+            continue
+        votes[vote] += 1
+        checked += 1
+        if checked >= sample_size:
+            break
+    return DECIMAL_DOT if votes[DECIMAL_DOT] > votes[DECIMAL_COMMA] else DECIMAL_COMMA
+
+
+def parse_localized(text, decimal=DECIMAL_COMMA):
+    """Đọc chuỗi số có dấu phân cách hàng nghìn, None nếu không đọc được
+
+    decimal là dấu thập phân của cột, chỉ dùng cho trường hợp mơ hồ (một dấu phẩy hoặc một
+    dấu chấm duy nhất theo sau là đúng 3 chữ số, ví dụ 3,482 hay 1.000).
+    """
+    text = text.translate(_IGNORED_CHARS)
+    if not text:
+        return None
+    has_dot = "." in text
+    has_comma = "," in text
+    if has_dot and has_comma:
+        if text.rfind(",") > text.rfind("."):
+            text = text.replace(".", "").replace(",", ".")
+        else:
+            text = text.replace(",", "")
+    elif has_comma:
+        tail = len(text) - text.rfind(",") - 1
+        if text.count(",") == 1 and (tail != 3 or decimal == DECIMAL_COMMA):
+            text = text.replace(",", ".")
+        else:
+            text = text.replace(",", "")
+    elif has_dot and text.count(".") > 1:
+        # 3.482.67: dấu chấm cuối là thập phân; 3.482.670: mọi dấu chấm là hàng nghìn
+        head, _, tail = text.rpartition(".")
+        text = head.replace(".", "") + ("" if len(tail) == 3 else ".") + tail
+    elif has_dot and decimal == DECIMAL_COMMA and len(text) - text.rfind(".") - 1 == 3:
+        text = text.replace(".", "")    # 1.000 trong cột dùng dấu phẩy thập phân
+    try:
+        number = float(text)
+    except ValueError:
+        return None
+    return number if math.isfinite(number) else None
+
+
+def parse_equity_column(values):
+    """Chuyển cả cột End Equity sang số một lần
+
+    Trả về (equity, valid, decimal): equity là array('d') (0 với ô trống/không hợp lệ),
+    valid là bytearray (1 = đọc được số), decimal là dấu thập phân đã nhận dạng.
+    Dấu thập phân của cột được đoán trước; chuỗi có dấu phân cách hàng nghìn của cột
+    (ví dụ "1.000" trong cột dấu phẩy) luôn đi qua parse_localized, các chuỗi còn lại
+    float() đọc được đi theo đường nhanh.
+    """
+    count = len(values)
+    equity = array("d", bytes(8 * count))
+    valid = bytearray(count)
+    decimal = detect_decimal_separator(values)
+    thousands = DECIMAL_DOT if decimal == DECIMAL_COMMA else DECIMAL_COMMA
+    for index, value in enumerate(values):
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            if math.isfinite(value):
+                equity[index] = value
+                valid[index] = 1
+            continue
+        if value is None or value == "":
+            continue
+        text = str(value)
+        number = None
+        if thousands not in text:
+            try:
+                number = float(text)
+            except ValueError:
+                number = None
+        if number is None:
+            number = parse_localized(text, decimal)
+        if number is not None and math.isfinite(number):
+            equity[index] = number
+            valid[index] = 1
+    return equity, valid, decimal
+
+
+def parse_equity(value, decimal=DECIMAL_COMMA):
+    """Chuyển một giá trị End Equity sang số thực, 0 nếu trống hoặc không hợp lệ"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value) if math.isfinite(value) else 0.0
+    text = "" if value is None else str(value).strip()
+    return parse_localized(text, decimal) or 0.0
@@ -0,0 +1,192 @@
+"""
+Mô-đun giả lập Google Sheets API chạy hoàn toàn cục bộ (không cần mạng hay
+credentials) để thử quá trình tải, kiểm tra thay đổi và đồng bộ dữ liệu
+
+Cách dùng:
+    api = FakeSheetsAPI()
+    api.add_worksheet(URL, "Sheet1", rows)
+    manager = FakeClientManager(api)   # dùng thay cho GoogleClientManager
+
+Hoặc đặt biến môi trường MT_LOGIN_FAKE_SHEETS trỏ tới tệp JSON dạng
+{"<URL sheet>": {"<tên worksheet>": [[...], [...]]}} để ứng dụng đọc dữ liệu từ tệp này.
+"""
+
+import os
+import re
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+
+FAKE_SHEETS_ENV = "MT_LOGIN_FAKE_SHEETS"
+
+_A1_RANGE = re.compile(r"^([A-Z]+)(\d*)(?::([A-Z]+)(\d*))?$")
+
+
+def _column_index(letters):
+    index = 0
+    for char in letters:
+        index = index * 26 + (ord(char) - 64)
+    return index - 1
+
+
+def _trim(rows):
+    """Bỏ ô trống cuối hàng và hàng trống cuối vùng giống Sheets API"""
+    trimmed = []
+    for row in rows:
+        row = list(row)
+        while row and row[-1] in ("", None):
+            row.pop()
+        trimmed.append(row)
+    while trimmed and not trimmed[-1]:
+        trimmed.pop()
+    return trimmed
+
+
+class FakeWorksheet:
+    """Worksheet giả: giữ dữ liệu trong bộ nhớ, hỗ trợ get_all_values và batch_get"""
+
+    def __init__(self, spreadsheet, title, rows):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self._rows = [list(row) for row in rows]
+
+    @property
+    def row_count(self):
+        return len(self._rows)
+
+    @property
+    def col_count(self):
+        return max([26] + [len(row) for row in self._rows])
+
+    def get_all_values(self):
+        self.spreadsheet.api.count("get_all_values")
+        width = max((len(row) for row in self._rows), default=0)
+        return [["" if v is None else str(v) for v in row] + [""] * (width - len(row))
+                for row in _trim(self._rows)]
+
+    def _read_range(self, a1_range):
+        match = _A1_RANGE.match(a1_range.replace("$", "").upper())
+        if not match:
+            raise ValueError(f"Vùng không hợp lệ: {a1_range}")
+        start_col, start_row, end_col, end_row = match.groups()
+        end_col = end_col or start_col
+        end_row = end_row or (start_row if not match.group(3) else "")
+        first_col, last_col = _column_index(start_col), _column_index(end_col)
+        first_row = int(start_row) - 1 if start_row else 0
+        last_row = int(end_row) if end_row else len(self._rows)
+        return _trim(row[first_col:last_col + 1] for row in self._rows[first_row:last_row])
+
+    def batch_get(self, ranges, value_render_option=None):
+        self.spreadsheet.api.count("batch_get")
+        return [self._read_range(a1_range) for a1_range in ranges]
+
+    def set_values(self, rows):
+        """Thay toàn bộ dữ liệu (đánh dấu spreadsheet đã thay đổi)"""
+        self._rows = [list(row) for row in rows]
+        self.spreadsheet.touch()
+
+    def update_cell(self, row, col, value):
+        """Sửa một ô (row, col tính từ 1) như gspread"""
+        while len(self._rows) < row:
+            self._rows.append([])
+        target = self._rows[row - 1]
+        while len(target) < col:
+            target.append("")
+        target[col - 1] = value
+        self.spreadsheet.touch()
+
+
+class FakeSpreadsheet:
+    """Spreadsheet giả có modifiedTime tăng dần mỗi khi dữ liệu thay đổi"""
+
+    def __init__(self, api, url):
+        self.api = api
+        self.url = url
+        self.id = url
+        self._worksheets = {}
+        self._modified = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    def touch(self):
+        self._modified += timedelta(seconds=1)
+
+    def add_worksheet(self, title, rows):
+        self._worksheets[title] = FakeWorksheet(self, title, rows)
+        self.touch()
+        return self._worksheets[title]
+
+    def worksheet(self, title):
+        if title not in self._worksheets:
+            raise KeyError(f"Không tìm thấy worksheet '{title}'")
+        return self._worksheets[title]
+
+    def get_lastUpdateTime(self):
+        self.api.count("metadata")
+        return self._modified.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+class FakeSheetsAPI:
+    """Tập hợp các spreadsheet giả, đếm số request để kiểm tra lượng dữ liệu tải"""
+
+    def __init__(self):
+        self._spreadsheets = {}
+        self._lock = threading.Lock()
+        self.requests = {"open": 0, "metadata": 0, "get_all_values": 0, "batch_get": 0}
+
+    def count(self, kind):
+        with self._lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+
+    def add_worksheet(self, sheet_url, title, rows):
+        spreadsheet = self._spreadsheets.get(sheet_url)
+        if spreadsheet is None:
+            spreadsheet = self._spreadsheets[sheet_url] = FakeSpreadsheet(self, sheet_url)
+        return spreadsheet.add_worksheet(title, rows)
+
+    def open_by_url(self, sheet_url):
+        self.count("open")
+        if sheet_url not in self._spreadsheets:
+            raise KeyError(f"Không tìm thấy spreadsheet {sheet_url}")
+        return self._spreadsheets[sheet_url]
+
+    @classmethod
+    def from_file(cls, path):
+        """Tạo API giả từ tệp JSON {URL: {worksheet: rows}}"""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        api = cls()
+        for sheet_url, worksheets in data.items():
+            for title, rows in worksheets.items():
+                api.add_worksheet(sheet_url, title, rows)
+        return api
+
+
+class FakeClientManager:
+    """Thay thế GoogleClientManager (cùng giao diện) nhưng đọc từ FakeSheetsAPI"""
+
+    def __init__(self, api, creds_path=None):
+        self.api = api
+        self.creds_path = creds_path
+        self.stats = {"authorize": 0, "token_refresh": 0, "open_spreadsheet": 0, "open_worksheet": 0}
+
+    def client(self):
+        return self.api
+
+    def spreadsheet(self, sheet_url):
+        self.stats["open_spreadsheet"] += 1
+        return self.api.open_by_url(sheet_url)
+
+    def worksheet(self, sheet_url, worksheet_name):
+        self.stats["open_worksheet"] += 1
+        return self.spreadsheet(sheet_url).worksheet(worksheet_name)
+
+    def invalidate(self, sheet_url=None):
+        pass
+
+
+def fake_manager_from_env(creds_path=None):
+    """FakeClientManager nếu biến môi trường MT_LOGIN_FAKE_SHEETS được đặt, ngược lại None"""
+    path = os.environ.get(FAKE_SHEETS_ENV)
+    if not path:
+        return None
+    print(f"Đang dùng Google Sheets giả lập từ {path}")
+    return FakeClientManager(FakeSheetsAPI.from_file(path), creds_path)
@@ -0,0 +1,124 @@
+"""
+Mô-đun giả lập cửa sổ terminal MT4/MT5 và sự kiện cửa sổ (không cần Windows) để
+chạy thử TerminalRegistry và các chức năng quét
+
+Cách dùng:
+    source = FakeWindowEventSource()
+    source.add_process(1200, "terminal64.exe")
+    registry = TerminalRegistry(source, parse_title)
+    registry.start()
+    source.open_window(1, "12345678 - ICMarketsSC-Live: Demo Account", 1200)
+
+Hoặc đặt biến môi trường MT_LOGIN_FAKE_TERMINALS trỏ tới tệp JSON dạng
+{"processes": {"<pid>": "<tên tiến trình>"}, "windows": [{"hwnd": 1, "title": "...", "pid": 1200}],
+ "data_dirs": {"<pid>": "<thư mục dữ liệu chứa logs/>"}}
+"""
+
+import os
+import json
+import threading
+
+from terminal_registry import WINDOW_CREATED, WINDOW_DESTROYED, WINDOW_CHANGED
+
+FAKE_TERMINALS_ENV = "MT_LOGIN_FAKE_TERMINALS"
+
+
+class FakeWindowEventSource:
+    """Nguồn sự kiện giả lập: các hàm open/rename/hide/close phát sự kiện ngay lập tức"""
+
+    def __init__(self):
+        self._windows = {}      # hwnd -> {"title", "pid", "visible"}
+        self._processes = {}    # pid -> (create_time, tên tiến trình)
+        self._data_dirs = {}    # pid -> thư mục dữ liệu (nhật ký mẫu)
+        self._callback = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        source = cls()
+        for pid, name in data.get("processes", {}).items():
+            source.add_process(int(pid), name)
+        for pid, data_dir in data.get("data_dirs", {}).items():
+            source.set_data_dir(int(pid), data_dir)
+        for window in data.get("windows", []):
+            source.open_window(int(window["hwnd"]), window.get("title", ""), int(window["pid"]))
+        return source
+
+    def start(self, callback):
+        self._callback = callback
+
+    def stop(self):
+        self._callback = None
+
+    def _emit(self, event, hwnd):
+        if self._callback is not None:
+            self._callback(event, hwnd)
+
+    def add_process(self, pid, name, create_time=None):
+        """Thêm (hoặc thay thế khi PID được cấp lại) một tiến trình"""
+        with self._lock:
+            if create_time is None:
+                create_time = float(len(self._processes) + 1)
+            self._processes[pid] = (create_time, name)
+
+    def set_data_dir(self, pid, data_dir):
+        """Thư mục dữ liệu (chứa logs/) của tiến trình, để đọc nhật ký mẫu"""
+        with self._lock:
+            self._data_dirs[pid] = data_dir
+
+    def end_process(self, pid):
+        """Kết thúc tiến trình cùng mọi cửa sổ của nó"""
+        for hwnd in [hwnd for hwnd, window in self._windows.items() if window["pid"] == pid]:
+            self.close_window(hwnd)
+        with self._lock:
+            self._processes.pop(pid, None)
+
+    def open_window(self, hwnd, title, pid, visible=True):
+        with self._lock:
+            self._windows[hwnd] = {"title": title, "pid": pid, "visible": visible}
+        self._emit(WINDOW_CREATED, hwnd)
+
+    def rename_window(self, hwnd, title):
+        with self._lock:
+            self._windows[hwnd]["title"] = title
+        self._emit(WINDOW_CHANGED, hwnd)
+
+    def set_visible(self, hwnd, visible):
+        with self._lock:
+            self._windows[hwnd]["visible"] = visible
+        self._emit(WINDOW_CHANGED, hwnd)
+
+    def close_window(self, hwnd):
+        with self._lock:
+            self._windows.pop(hwnd, None)
+        self._emit(WINDOW_DESTROYED, hwnd)
+
+    def windows(self):
+        with self._lock:
+            return list(self._windows)
+
+    def window_info(self, hwnd):
+        with self._lock:
+            window = self._windows.get(hwnd)
+            if window is None or not window["visible"]:
+                return None
+            return window["title"], window["pid"]
+
+    def process_info(self, pid):
+        with self._lock:
+            return self._processes.get(pid)
+
+    def data_dir(self, pid):
+        with self._lock:
+            return self._data_dirs.get(pid)
+
+
+def fake_event_source_from_env():
+    """FakeWindowEventSource nếu biến môi trường MT_LOGIN_FAKE_TERMINALS được đặt, ngược lại None"""
+    path = os.environ.get(FAKE_TERMINALS_ENV)
+    if not path:
+        return None
+    print(f"Đang dùng cửa sổ terminal giả lập từ {path}")
+    return FakeWindowEventSource.from_file(path)
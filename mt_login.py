@@ -1,11 +1,12 @@
 import pyperclip
-from pywinauto import Desktop, Application
+from pywinauto import Application
 import pyautogui
 import time
 import re
 import os
 import json
-import psutil
+from process_snapshot import ProcessSnapshot
+from window_snapshot import WindowSnapshot
 
 # Config để lưu trữ các tùy chỉnh
 CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mt_login_config.json")
@@ -48,11 +49,13 @@ def save_config(config):
 def clear_clipboard():
     pyperclip.copy('')
 
-def detect_platform_type(window_obj):
+def detect_platform_type(window_obj, process_snapshot=None):
     """Xác định loại nền tảng (MT4 hoặc MT5) dựa vào quy trình thực thi và tiêu đề cửa sổ
     
     MT4 sử dụng: terminal.exe
     MT5 sử dụng: terminal64.exe
+    
+    process_snapshot là ảnh chụp tiến trình dùng chung cho cả lần quét; nếu không có thì chụp mới.
     """
     try:
         # Lấy process ID của cửa sổ
@@ -63,13 +66,14 @@ def detect_platform_type(window_obj):
             print(f"Không thể lấy process_id: {str(e)}")
             return "MT4"  # Mặc định là MT4 nếu không lấy được process ID
         
-        # Sử dụng danh sách process hiện tại để xác định
+        # Sử dụng ảnh chụp danh sách process để xác định
         try:
-            all_processes = {proc.pid: proc.name() for proc in psutil.process_iter(['pid', 'name'])}
+            if process_snapshot is None:
+                process_snapshot = ProcessSnapshot.capture()
             
-            # Lấy tên process dựa vào process_id
-            if process_id in all_processes:
-                process_name = all_processes[process_id].lower()
+            # Lấy tên process dựa vào process_id (đối chiếu cả thời điểm khởi động của process)
+            process_name = process_snapshot.name_of(process_id).lower()
+            if process_name:
                 
                 # Kiểm tra tên process
                 if "terminal64" in process_name:
@@ -109,15 +113,19 @@ def detect_platform_type(window_obj):
         print(f"Lỗi khi xác định loại nền tảng: {str(e)}")
         return "MT4"  # Mặc định là MT4 nếu xảy ra lỗi
 
-def get_all_running_mt_terminals():
-    """Tìm tất cả các cửa sổ MT4/MT5 đang chạy và xác định nền tảng"""
-    windows = Desktop(backend="win32").windows()
+def get_all_running_mt_terminals(window_snapshot=None):
+    """Tìm tất cả các cửa sổ MT4/MT5 đang chạy và xác định nền tảng
+    
+    window_snapshot là ảnh chụp cửa sổ dùng chung cho cả lần đăng nhập; nếu không có thì chụp mới.
+    """
+    if window_snapshot is None:
+        window_snapshot = WindowSnapshot.capture()
     mt_terminals = []
     
     print("🧭 Đang tìm tất cả các cửa sổ MT4/MT5 đang chạy:")
-    for win in windows:
+    for window in window_snapshot:
         try:
-            title = win.window_text()
+            title = window.title
             if not title:
                 continue
                 
@@ -126,7 +134,8 @@ def get_all_running_mt_terminals():
             
             # Chỉ xem xét các cửa sổ MetaTrader
             if any(keyword in title_lower for keyword in mt_keywords):
-                platform_type = detect_platform_type(win)
+                win = window_snapshot.window_object(window.hwnd)
+                platform_type = detect_platform_type(win, window_snapshot.processes)
                 mt_terminals.append({
                     "window": win,
                     "title": title,
@@ -339,7 +348,9 @@ try:
     # ====== BƯỚC 1.5: KIỂM TRA TÍNH TƯƠNG THÍCH PLATFORM ======
     print("\n🔍 ĐANG KIỂM TRA TÍNH TƯƠNG THÍCH NỀN TẢNG:")
     print("------------------------")
-    mt_terminals = get_all_running_mt_terminals()
+    # Chụp cửa sổ một lần, dùng cho cả kiểm tra nền tảng và tìm cửa sổ đăng nhập
+    window_snapshot = WindowSnapshot.capture()
+    mt_terminals = get_all_running_mt_terminals(window_snapshot)
     compatible, error_message = check_platform_compatibility(mt_terminals, platform_type)
     
     if not compatible:
@@ -366,15 +377,14 @@ try:
     print(f"🔍 Đang tìm cửa sổ MT4/5 có chứa tên sàn: {broker_keyword}")
 
     # ====== BƯỚC 2: TÌM CỬA SỔ MT4/5 ======
-    windows = Desktop(backend="win32").windows()
     target_win = None
 
     print("🧭 Danh sách cửa sổ đang mở:")
-    for win in windows:
-        title = win.window_text()
+    for window in window_snapshot:
+        title = window.title
         print("-", title)
         if broker_keyword.lower() in title.lower():
-            target_win = win
+            target_win = window_snapshot.window_object(window.hwnd)
             break
 
     if not target_win:
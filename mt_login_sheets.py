@@ -1,27 +1,47 @@
 import sys
 import json
 import os
-import pandas as pd
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QLineEdit, QPushButton, QComboBox, QTextEdit, QFileDialog,
     QMessageBox, QGroupBox, QTableWidget, QTableWidgetItem, QHeaderView,
-    QDialog, QDialogButtonBox, QInputDialog, QCheckBox, QTabWidget
+    QDialog, QDialogButtonBox, QInputDialog, QCheckBox, QTabWidget, QProgressBar
 )
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import Qt, QTimer, QThread
 from PyQt5.QtGui import QFont, QColor, QIcon
 import pyperclip
 import time
 import re
 import pyautogui
 import subprocess
-import psutil
-import win32process
-import win32gui
 import win32con
 from functools import partial
+from sheet_sync import SheetSnapshot, snapshot_from_values, diff_snapshots
+from snapshot_cache import cache_path, save_snapshot, save_snapshot_columns, load_snapshot_columns
+from sheet_client import GoogleClientManager, DISPLAY_START_COL, DISPLAY_END_COL, EQUITY_COL
+from account_table import (
+    AccountTable, ColumnConfig, SubstringIndex, MIN_BRANCH_EQUITY, LOW_EQUITY_THRESHOLD, server_base, broker_key
+)
+from sheet_loader import SheetLoadWorker, STAGE_RENDER, STAGE_PROGRESS
+from fake_sheets import FakeClientManager, fake_manager_from_env
+from replacement_allocator import allocate_replacements
+from process_snapshot import ProcessSnapshot, MT4_PROCESS_NAMES, MT5_PROCESS_NAMES, platform_from_process_name
+from terminal_registry import TerminalRegistry, create_event_source
+from window_snapshot import WindowSnapshot, Win32Windows, focus_window, verify_window, window_object
+from terminal_journal import JournalWatcher, JOURNAL_INVALID_ACCOUNT, JOURNAL_TIMEOUT, describe_event
+from title_parser import (
+    TitleCache, parse_title, FORMAT_MT4, FORMAT_MT5, EXCLUDED_TITLE_PATTERN, SCAN_EXCLUDED_TITLE_PATTERN,
+    MT_KEYWORD_PATTERN, GENERAL_MT_PATTERN, SERVER_HINT_PATTERN, LOGIN_DIGITS_PATTERN
+)
+from branch_matcher import (
+    BranchMatcher, DEFAULT_BRANCH_NAMES, SCAN_BRANCH_KEYWORDS, parse_branch_names
+)
+from data_sources import (
+    GoogleSheetSource, create_local_source, SOURCE_GOOGLE, SOURCE_TYPES, LOCAL_SOURCE_TYPES, DEFAULT_PAGE_SIZE
+)
+
+# Thời gian chờ sau lần gõ phím cuối trước khi tìm kiếm (ms)
+SEARCH_DEBOUNCE_MS = 200
 
 # Khởi tạo COM ở đầu chương trình
 try:
@@ -35,7 +55,7 @@ except Exception as com_err:
 
 # Import pywinauto sau khi khởi tạo COM
 try:
-    from pywinauto import Desktop, Application
+    from pywinauto import Application
 except ImportError as e:
     print(f"Warning: Không thể import pywinauto: {str(e)}")
 except Exception as e:
@@ -57,13 +77,41 @@ class GoogleSheetMT4Login(QMainWindow):
             app_dir = os.path.dirname(sys.executable)
         else:
             app_dir = os.path.dirname(os.path.abspath(__file__))
+        self.app_dir = app_dir
         self.config_path = os.path.join(app_dir, "config.json")
         self.sheet_data = None
         self.worksheet = None
-        self.df = None
-        self.all_data = None  # Lưu toàn bộ dữ liệu
+        self.account_table = None  # Toàn bộ dữ liệu tài khoản dạng cột (AccountTable)
+        self.extra_worksheets = []  # Các worksheet bổ sung: [{"sheet_url": ..., "worksheet": ...}]
+        self.data_source_type = SOURCE_GOOGLE  # Nguồn dữ liệu: google, csv, xlsx, sqlite
+        self.data_source_path = ""  # Đường dẫn tệp với nguồn cục bộ
+        self.data_source_name = ""  # Tên sheet Excel / bảng SQLite (trống = đầu tiên)
         self.column_map = {}  # Ánh xạ các cột Excel (A, B, C...) sang index (0, 1, 2...)
-        self.original_df = None  # Lưu DataFrame gốc trước khi lọc
+        self.sheet_snapshot = None  # Snapshot (khóa + mã băm hàng) của lần tải trước
+        self.incremental_sync = True  # Đồng bộ tăng dần thay vì dựng lại toàn bộ
+        self.projected_fetch = True  # Chỉ tải các cột cần thiết thay vì toàn bộ worksheet
+        self.freshness_check = True  # Kiểm tra sheet có thay đổi không trước khi tải toàn bộ
+        self.freshness_sentinel_range = ""  # Vùng sentinel (ví dụ "A1:B2") khi không dùng được Drive API
+        self.streaming_ingest = False  # Tải theo trang và hiển thị dần (dành cho sheet rất lớn)
+        self.ingest_page_size = DEFAULT_PAGE_SIZE  # Số hàng mỗi trang khi tải theo trang
+        self.low_equity_threshold = LOW_EQUITY_THRESHOLD  # End Equity dưới mức này: hết tiền, cần thay
+        self.warn_equity_threshold = LOW_EQUITY_THRESHOLD  # Dưới mức này (và từ mức hết tiền trở lên): cảnh báo sắp hết tiền
+        self.replacement_min_equity = MIN_BRANCH_EQUITY  # Tài khoản thay thế phải có End Equity lớn hơn mức này
+        self.streamed_rows = 0  # Số hàng đã hiển thị dần trong lần tải theo trang hiện tại
+        self.search_matches = None  # Các hàng bảng đang hiện theo tìm kiếm (None = hiện tất cả)
+        self.branch_names = list(DEFAULT_BRANCH_NAMES)  # Danh sách nhánh (thứ tự = độ ưu tiên)
+        self.branch_matcher = BranchMatcher(self.branch_names)
+        self.scan_branch_matcher = BranchMatcher(self.branch_names, SCAN_BRANCH_KEYWORDS)
+        self.sheet_revisions = {}  # Phiên bản của từng worksheet ứng với dữ liệu đang hiển thị
+        self.sheet_load_signature = None  # Cấu hình tải (nguồn, hàng tiêu đề, các cột) của dữ liệu đó
+        self.pending_load_signature = None
+        self.client_manager = None  # Client Google dùng lại giữa các lần làm mới
+        self.load_thread = None  # Luồng nền đang tải Google Sheet (nếu có)
+        self.load_worker = None
+        self.terminal_registry = None  # Danh sách terminal cập nhật theo sự kiện cửa sổ (nếu hệ thống hỗ trợ)
+        self.title_cache = TitleCache(self.parse_account_info_from_title)  # Kết quả phân tích tiêu đề cửa sổ
+        self.window_source = None      # Nguồn cửa sổ cho ảnh chụp cửa sổ (None: win32gui)
+        self.terminal_journals = JournalWatcher()  # Nhật ký (Journal) của các terminal đang chạy, theo pid
         
         # Tạo ánh xạ các cột
         for i in range(26):  # A-Z
@@ -72,6 +120,12 @@ class GoogleSheetMT4Login(QMainWindow):
         # Setup UI
         self.setup_ui()
         
+        # Theo dõi cửa sổ terminal MT4/MT5 thay vì duyệt lại mọi cửa sổ ở mỗi lần quét
+        self.start_terminal_registry()
+        
+        # Đọc nhật ký terminal ở luồng nền để biết kết quả đăng nhập/kết nối
+        self.terminal_journals.start(self.on_journal_event)
+        
         # Tải cấu hình đã lưu nếu có
         self.load_config()
     
@@ -95,6 +149,18 @@ class GoogleSheetMT4Login(QMainWindow):
         connect_btn.clicked.connect(self.connect_to_sheet)
         connect_btn.setStyleSheet("font-weight: bold; font-size: 12px; padding: 8px;")
         top_bar.addWidget(connect_btn)
+        # Tiến độ tải dữ liệu trên luồng nền và nút hủy
+        self.load_progress = QProgressBar()
+        self.load_progress.setRange(0, 100)
+        self.load_progress.setFormat("%p%")
+        self.load_progress.setMaximumWidth(200)
+        self.load_progress.setVisible(False)
+        top_bar.addWidget(self.load_progress)
+        self.cancel_load_btn = QPushButton("Hủy tải")
+        self.cancel_load_btn.setStyleSheet("padding: 5px 10px;")
+        self.cancel_load_btn.clicked.connect(self.cancel_sheet_load)
+        self.cancel_load_btn.setVisible(False)
+        top_bar.addWidget(self.cancel_load_btn)
         branch_check_btn = QPushButton("Kiểm tra đúng nhánh")
         branch_check_btn.clicked.connect(self.check_branch_accounts)
         branch_check_btn.setStyleSheet("background-color: #2196F3; color: white; font-weight: bold; font-size: 12px; padding: 8px;")
@@ -119,7 +185,12 @@ class GoogleSheetMT4Login(QMainWindow):
         search_bar_layout = QHBoxLayout()
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Tìm kiếm theo Tên sàn hoặc Login ID...")
-        self.search_input.textChanged.connect(self.search_accounts)  # Tìm kiếm tự động khi gõ
+        # Tìm kiếm tự động khi gõ (chờ người dùng ngừng gõ một chút rồi mới tìm)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.search_accounts)
+        self.search_input.textChanged.connect(self.search_timer.start)
         search_btn = QPushButton("Tìm kiếm")
         search_btn.setStyleSheet("padding: 5px 10px;")
         search_btn.clicked.connect(self.search_accounts)
@@ -203,12 +274,26 @@ class GoogleSheetMT4Login(QMainWindow):
             config = {
                 "sheet_url": self.sheet_url_input.text(),
                 "worksheet": self.worksheet_input.text(),
+                "worksheets": self.extra_worksheets,
+                "data_source": self.data_source_type,
+                "data_source_path": self.data_source_path,
+                "data_source_name": self.data_source_name,
                 "header_row": self.header_row_input.text(),
                 "broker_col": self.broker_col_input.text(),
                 "server_col": self.server_col_input.text(),
                 "login_col": self.login_col_input.text(),
                 "pass_col": self.pass_col_input.text(),
-                "branch_col": self.branch_col_input.text()
+                "branch_col": self.branch_col_input.text(),
+                "incremental_sync": self.incremental_sync,
+                "projected_fetch": self.projected_fetch,
+                "freshness_check": self.freshness_check,
+                "freshness_sentinel_range": self.freshness_sentinel_range,
+                "streaming_ingest": self.streaming_ingest,
+                "ingest_page_size": self.ingest_page_size,
+                "low_equity_threshold": self.low_equity_threshold,
+                "warn_equity_threshold": self.warn_equity_threshold,
+                "replacement_min_equity": self.replacement_min_equity,
+                "branch_names": self.branch_names
             }
             
             with open(self.config_path, 'w', encoding='utf-8') as f:
@@ -233,6 +318,18 @@ class GoogleSheetMT4Login(QMainWindow):
                 if "worksheet" in config and config["worksheet"]:
                     self.worksheet_input.setText(config["worksheet"])
                     
+                if "worksheets" in config and config["worksheets"]:
+                    self.extra_worksheets = self.parse_worksheet_entries(config["worksheets"])
+                
+                if config.get("data_source") in SOURCE_TYPES:
+                    self.data_source_type = config["data_source"]
+                
+                if "data_source_path" in config:
+                    self.data_source_path = str(config["data_source_path"] or "")
+                
+                if "data_source_name" in config:
+                    self.data_source_name = str(config["data_source_name"] or "")
+                    
                 if "header_row" in config and config["header_row"]:
                     self.header_row_input.setText(config["header_row"])
                     
@@ -251,10 +348,39 @@ class GoogleSheetMT4Login(QMainWindow):
                 if "branch_col" in config and config["branch_col"]:
                     self.branch_col_input.setText(config["branch_col"])
                 
+                if "incremental_sync" in config:
+                    self.incremental_sync = bool(config["incremental_sync"])
+                
+                if "projected_fetch" in config:
+                    self.projected_fetch = bool(config["projected_fetch"])
+                
+                if "freshness_check" in config:
+                    self.freshness_check = bool(config["freshness_check"])
+                
+                if "freshness_sentinel_range" in config:
+                    self.freshness_sentinel_range = str(config["freshness_sentinel_range"] or "").strip()
+                
+                if "streaming_ingest" in config:
+                    self.streaming_ingest = bool(config["streaming_ingest"])
+                
+                if config.get("branch_names"):
+                    self.set_branch_names(config["branch_names"])
+                
+                if "ingest_page_size" in config:
+                    try:
+                        self.ingest_page_size = max(100, int(config["ingest_page_size"]))
+                    except (TypeError, ValueError):
+                        self.ingest_page_size = DEFAULT_PAGE_SIZE
+                
+                self.set_equity_thresholds(config.get("low_equity_threshold"), config.get("warn_equity_threshold"),
+                                           config.get("replacement_min_equity"))
+                
                 self.data_display.setText("✅ Đã tải cấu hình từ file config.json")
                 
-                # Tự động kết nối nếu có URL nhưng không hiển thị MessageBox
-                if "sheet_url" in config and config["sheet_url"]:
+                # Tự động kết nối nếu có URL (hoặc tệp nguồn cục bộ) nhưng không hiển thị MessageBox
+                if self.has_data_source():
+                    # Hiển thị ngay dữ liệu lưu tạm, sau đó làm mới từ Google Sheet
+                    self.load_sheet_cache()
                     # Đặt một timer để kết nối sau khi giao diện đã được khởi tạo
                     QTimer.singleShot(500, self.connect_to_sheet)
                 
@@ -268,10 +394,54 @@ class GoogleSheetMT4Login(QMainWindow):
             return self.column_map[column_letter]
         return -1  # Không hợp lệ
     
+    def parse_worksheet_entries(self, entries):
+        """Chuẩn hóa danh sách worksheet bổ sung trong cấu hình
+        
+        Mỗi phần tử có thể là tên worksheet (cùng sheet chính), chuỗi "URL | Tên worksheet"
+        hoặc dict {"sheet_url": ..., "worksheet": ...}. sheet_url rỗng = sheet chính.
+        """
+        parsed = []
+        for entry in entries or []:
+            if isinstance(entry, dict):
+                sheet_url = str(entry.get("sheet_url", "") or "").strip()
+                worksheet = str(entry.get("worksheet", "") or "").strip()
+            else:
+                text = str(entry).strip()
+                if "|" in text:
+                    sheet_url, worksheet = [part.strip() for part in text.rsplit("|", 1)]
+                else:
+                    sheet_url, worksheet = "", text
+            if worksheet:
+                parsed.append({"sheet_url": sheet_url, "worksheet": worksheet})
+        return parsed
+    
+    def get_sheet_sources(self):
+        """Danh sách (URL sheet, tên worksheet) cần tải; nguồn đầu tiên là worksheet chính"""
+        primary_url = self.sheet_url_input.text()
+        sources = [(primary_url, self.worksheet_input.text())]
+        for entry in self.extra_worksheets:
+            source = (entry.get("sheet_url") or primary_url, entry["worksheet"])
+            if source not in sources:
+                sources.append(source)
+        return sources
+    
+    def has_data_source(self):
+        """Đã cấu hình đủ thông tin nguồn dữ liệu để kết nối chưa"""
+        if self.data_source_type in LOCAL_SOURCE_TYPES:
+            return bool(self.data_source_path)
+        return bool(self.sheet_url_input.text())
+    
+    def build_data_sources(self):
+        """Tạo các DataSource theo cấu hình: các worksheet Google Sheets hoặc một nguồn cục bộ"""
+        if self.data_source_type in LOCAL_SOURCE_TYPES:
+            return [create_local_source(self.data_source_type, self.data_source_path, self.data_source_name)]
+        sentinel_range = self.freshness_sentinel_range or None
+        return [GoogleSheetSource(self.client_manager, sheet_url, worksheet, sentinel_range)
+                for sheet_url, worksheet in self.get_sheet_sources()]
+    
     def connect_to_sheet(self):
         creds_path = self.credentials_path
-        sheet_url = self.sheet_url_input.text()
-        worksheet_name = self.worksheet_input.text()
+        use_google = self.data_source_type not in LOCAL_SOURCE_TYPES
         
         try:
             header_row = int(self.header_row_input.text())
@@ -280,152 +450,571 @@ class GoogleSheetMT4Login(QMainWindow):
         except ValueError:
             header_row = 1
         
-        if not os.path.exists(creds_path):
-            QMessageBox.warning(self, "Lỗi", f"Không tìm thấy file credentials.json tại {creds_path}!")
+        if self.load_thread is not None and self.load_thread.isRunning():
+            self.data_display.append("⏳ Đang tải dữ liệu, vui lòng đợi hoặc bấm 'Hủy tải'.")
             return
         
-        if not sheet_url:
-            QMessageBox.warning(self, "Lỗi", "Vui lòng nhập URL Google Sheet!")
-            return
-        
-        try:
-            # Kết nối đến Google Sheets API
-            scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-            credentials = ServiceAccountCredentials.from_json_keyfile_name(creds_path, scope)
-            client = gspread.authorize(credentials)
-            
-            # Mở Google Sheet
-            sheet = client.open_by_url(sheet_url)
+        if use_google:
+            # Biến môi trường MT_LOGIN_FAKE_SHEETS: đọc dữ liệu từ API giả lập cục bộ (không cần mạng)
+            if self.client_manager is None:
+                self.client_manager = fake_manager_from_env(creds_path)
+            using_fake_api = isinstance(self.client_manager, FakeClientManager)
             
-            # Lấy worksheet theo tên
-            self.worksheet = sheet.worksheet(worksheet_name)
-            
-            # Lấy tất cả dữ liệu (bao gồm header row)
-            all_values = self.worksheet.get_all_values()
-            self.all_data = all_values  # Lưu toàn bộ dữ liệu
-            
-            if not all_values or len(all_values) <= header_row:
-                QMessageBox.warning(self, "Lỗi", "Không đủ dữ liệu trong Sheet hoặc hàng tiêu đề không tồn tại!")
+            if not using_fake_api and not os.path.exists(creds_path):
+                QMessageBox.warning(self, "Lỗi", f"Không tìm thấy file credentials.json tại {creds_path}!")
                 return
             
-            # Lấy header từ hàng được chỉ định
-            headers = all_values[header_row - 1]
-            
-            # Chỉ lấy dữ liệu từ cột C đến cột P (index 2 đến 15)
-            start_col = 2  # Cột C (index bắt đầu từ 0)
-            end_col = 15   # Cột P
-            
-            # Đảm bảo không vượt quá số cột có sẵn
-            end_col = min(end_col, len(headers) - 1)
-            
-            if start_col > end_col or start_col >= len(headers):
-                QMessageBox.warning(self, "Lỗi", "Không có đủ cột trong Google Sheet để hiển thị từ cột C đến cột P!")
+            if not self.sheet_url_input.text():
+                QMessageBox.warning(self, "Lỗi", "Vui lòng nhập URL Google Sheet!")
                 return
             
-            # Lấy headers từ vùng cần thiết
-            selected_headers = headers[start_col:end_col + 1]
-            
-            # Kiểm tra và sửa các headers trùng lặp
-            unique_headers = []
-            header_count = {}
-            
-            for header in selected_headers:
-                if not header:
-                    header = "Column"  # Đặt tên mặc định cho cột trống
-                
-                if header in header_count:
-                    header_count[header] += 1
-                    unique_headers.append(f"{header}_{header_count[header]}")
-                else:
-                    header_count[header] = 0
-                    unique_headers.append(header)
-            
-            # Lấy dữ liệu từ hàng sau header
-            data_values = all_values[header_row:]
-            
-            # Tạo danh sách các bản ghi
-            records = []
-            for row in data_values:
-                # Đảm bảo row có đủ cột cho vùng cần lấy
-                if len(row) <= start_col:
-                    # Bỏ qua hàng nếu không có đủ dữ liệu
-                    continue
-                
-                # Lấy dữ liệu từ cột C tới cột O
-                selected_values = row[start_col:end_col + 1]
-                
-                # Đảm bảo dữ liệu có đủ số cột
-                while len(selected_values) < len(unique_headers):
-                    selected_values.append("")
-                
-                # Cắt bớt nếu có quá nhiều dữ liệu
-                if len(selected_values) > len(unique_headers):
-                    selected_values = selected_values[:len(unique_headers)]
-                
-                record = dict(zip(unique_headers, selected_values))
-                records.append(record)
-            
-            if not records:
-                QMessageBox.warning(self, "Lỗi", "Không có dữ liệu trong vùng được chọn!")
+            if not using_fake_api and (self.client_manager is None or self.client_manager.creds_path != creds_path):
+                self.client_manager = GoogleClientManager(creds_path)
+        elif not os.path.exists(self.data_source_path):
+            QMessageBox.warning(self, "Lỗi", f"Không tìm thấy tệp dữ liệu: {self.data_source_path}")
+            return
+        
+        sources = self.build_data_sources()
+        # Chỉ tải các cột đã cấu hình và vùng hiển thị C..P trong một lần gọi
+        column_indexes = self.get_required_column_indexes() if self.projected_fetch else None
+        self.pending_load_signature = self.get_load_signature(sources, header_row, column_indexes)
+        # Chỉ bỏ qua tải khi dữ liệu đang có được tải với đúng cấu hình hiện tại
+        known_revisions = None
+        if self.account_table is not None and self.sheet_load_signature == self.pending_load_signature:
+            known_revisions = self.sheet_revisions
+        
+        # Xác thực, mở sheet và tải dữ liệu trên luồng nền để giao diện không bị treo
+        self.load_worker = SheetLoadWorker(
+            sources, header_row,
+            self.get_column_index(self.login_col_input.text()),
+            column_indexes=column_indexes,
+            probe=self.freshness_check,
+            known_revisions=known_revisions,
+            page_size=self.ingest_page_size if self.streaming_ingest else 0,
+            table_config=self.get_column_config(),
+            branch_extractor=self.extract_branch_name
+        )
+        self.streamed_rows = 0
+        self.load_thread = QThread(self)
+        self.load_worker.moveToThread(self.load_thread)
+        self.load_thread.started.connect(self.load_worker.run)
+        self.load_worker.progress.connect(self.on_sheet_load_progress)
+        self.load_worker.rows_ready.connect(self.on_sheet_rows_ready)
+        self.load_worker.finished.connect(self.on_sheet_load_finished)
+        self.load_worker.failed.connect(self.on_sheet_load_failed)
+        self.load_worker.cancelled.connect(self.on_sheet_load_cancelled)
+        for signal in (self.load_worker.finished, self.load_worker.failed, self.load_worker.cancelled):
+            signal.connect(self.load_thread.quit)
+        self.load_thread.finished.connect(self.load_worker.deleteLater)
+        self.load_thread.finished.connect(self.load_thread.deleteLater)
+        self.load_thread.finished.connect(self.on_sheet_load_thread_done)
+        
+        self.load_progress.setValue(0)
+        self.load_progress.setVisible(True)
+        self.cancel_load_btn.setVisible(True)
+        self.cancel_load_btn.setEnabled(True)
+        self.load_thread.start()
+    
+    def get_load_signature(self, sources, header_row, column_indexes):
+        """Cấu hình tải dưới dạng list (lưu được ra JSON) để so sánh giữa các lần tải"""
+        return [[[source.kind, source.location, source.name] for source in sources], header_row,
+                list(column_indexes) if column_indexes else None]
+    
+    def cancel_sheet_load(self):
+        """Hủy quá trình tải Google Sheet đang chạy"""
+        if self.load_worker is not None:
+            self.load_worker.cancel()
+            self.cancel_load_btn.setEnabled(False)
+            self.data_display.append("⏹️ Đang hủy tải dữ liệu...")
+    
+    def on_sheet_load_progress(self, stage, percent, message):
+        """Cập nhật tiến độ tải từ luồng nền"""
+        self.load_progress.setValue(percent)
+        self.data_display.append(message)
+    
+    def on_sheet_rows_ready(self, display_headers, rows, source):
+        """Hiển thị dần các hàng của một trang khi tải theo trang
+        
+        Chỉ hiển thị dần khi chưa có dữ liệu nào trên bảng; nếu đang có dữ liệu thì giữ
+        nguyên cho tới khi tải xong rồi đồng bộ một lần như bình thường.
+        """
+        if self.load_worker is None or self.load_worker.is_cancelled() or self.account_table is not None:
+            return
+        if self.streamed_rows == 0:
+            self.data_table.setRowCount(0)
+            self.search_matches = None
+            self.data_table.setColumnCount(len(display_headers) + 1)
+            self.data_table.setHorizontalHeaderLabels(["Chọn"] + display_headers)
+            self.data_table.setColumnWidth(0, 50)
+            header = self.data_table.horizontalHeader()
+            for col in range(1, len(display_headers) + 1):
+                header.setSectionResizeMode(col, QHeaderView.Stretch)
+        first_row = self.data_table.rowCount()
+        self.data_table.setRowCount(first_row + len(rows))
+        for offset, (orig_index, values) in enumerate(rows):
+            self.fill_table_cells(first_row + offset, orig_index, display_headers, values, source)
+        self.streamed_rows += len(rows)
+    
+    def on_sheet_load_finished(self, result):
+        """Nhận dữ liệu đã tải xong từ luồng nền và áp dụng một lần lên giao diện"""
+        if self.load_worker is None or self.load_worker.is_cancelled():
+            return
+        try:
+            percent, message = STAGE_PROGRESS[STAGE_RENDER]
+            self.on_sheet_load_progress(STAGE_RENDER, percent, message)
+            self.worksheet = result.worksheet
+            if result.unchanged:
+                self.data_display.append(
+                    f"✅ Google Sheet không thay đổi kể từ lần tải trước, dùng lại {len(self.account_table.display_rows)} bản ghi hiện có "
+                    f"(không tải lại dữ liệu)."
+                )
+                self.load_progress.setValue(100)
                 return
-                
-            # Chuyển sang DataFrame để dễ xử lý
-            self.df = pd.DataFrame(records)
-            self.original_df = self.df.copy()  # Lưu bản sao của DataFrame gốc
-            
-            # Cập nhật combo box với tên các cột
-            self.column_combo.clear()
-            self.column_combo.addItems(self.df.columns)
-            # Cập nhật combobox lọc nhánh
-            
-            # Cập nhật bảng dữ liệu
+            # Ghi nhận phiên bản trước khi nạp để lưu tạm kèm theo dữ liệu
+            self.sheet_revisions = result.revisions
+            self.sheet_load_signature = self.pending_load_signature
+            if self.load_sheet_values(result.all_values, result.header_row, snapshot=result.snapshot,
+                                      row_sources=result.row_sources, table=result.table):
+                self.report_merge_result(result.merge_report)
+            else:
+                self.sheet_revisions = {}
+                self.sheet_load_signature = None
+            self.load_progress.setValue(100)
+        except Exception as e:
+            self.on_sheet_load_failed(str(e), type(e).__name__)
+    
+    def report_merge_result(self, merge_report):
+        """Hiển thị số bản ghi theo từng worksheet khi tải từ nhiều nguồn"""
+        counts = merge_report.get("counts") if merge_report else None
+        if not counts:
+            return
+        lines = [f"   • {label}: {count} bản ghi" for label, count in counts.items()]
+        if merge_report.get("duplicates"):
+            lines.append(f"   • Bỏ qua {merge_report['duplicates']} hàng trùng Login ID")
+        for label in merge_report.get("header_mismatch", []):
+            lines.append(f"   ⚠️ Hàng tiêu đề của '{label}' khác worksheet chính")
+        self.data_display.append(f"📚 Đã gộp {len(counts)} worksheet:\n" + "\n".join(lines))
+    
+    def get_row_source(self, data_index):
+        """Worksheet nguồn của hàng dữ liệu thứ data_index (tính từ sau hàng tiêu đề)"""
+        if self.account_table is None:
+            return self.worksheet_input.text()
+        return self.account_table.source(data_index, self.worksheet_input.text())
+    
+    def on_sheet_load_failed(self, message, error_type):
+        """Hiển thị lỗi khi tải Google Sheet thất bại"""
+        if self.data_source_type in LOCAL_SOURCE_TYPES:
+            QMessageBox.critical(self, "Lỗi", f"Không thể đọc nguồn dữ liệu {self.data_source_path}: {message}")
+        else:
+            QMessageBox.critical(self, "Lỗi", f"Không thể kết nối đến Google Sheet: {message}")
+        # In thêm chi tiết lỗi vào data_display để debug
+        self.data_display.setText(f"Chi tiết lỗi:\n{message}\n\nLoẠI: {error_type}")
+    
+    def on_sheet_load_cancelled(self):
+        self.data_display.append("⏹️ Đã hủy tải dữ liệu Google Sheet.")
+    
+    def on_sheet_load_thread_done(self):
+        """Dọn dẹp sau khi luồng tải kết thúc"""
+        # Bỏ các hàng đã hiển thị dần nếu lần tải theo trang bị hủy hoặc lỗi
+        if self.streamed_rows and self.account_table is None:
+            self.data_table.setRowCount(0)
+        self.streamed_rows = 0
+        self.load_thread = None
+        self.load_worker = None
+        self.load_progress.setVisible(False)
+        self.cancel_load_btn.setVisible(False)
+    
+    def closeEvent(self, event):
+        """Dừng luồng tải (nếu có) và bỏ theo dõi cửa sổ trước khi đóng ứng dụng"""
+        if self.load_thread is not None and self.load_thread.isRunning():
+            self.load_worker.cancel()
+            self.load_thread.quit()
+            self.load_thread.wait(3000)
+        if self.terminal_registry is not None:
+            self.terminal_registry.stop()
+        self.terminal_journals.stop()
+        super().closeEvent(event)
+    
+    def start_terminal_registry(self):
+        """Bật danh sách terminal cập nhật theo sự kiện cửa sổ (tạo/đóng/đổi tiêu đề)"""
+        try:
+            source = create_event_source()
+            if source is None:
+                print("Không hỗ trợ theo dõi sự kiện cửa sổ, sẽ quét cửa sổ mỗi lần kiểm tra")
+                return
+            # Ảnh chụp cửa sổ đọc cùng nguồn với danh sách terminal (kể cả nguồn giả lập)
+            self.window_source = source
+            registry = TerminalRegistry(source, self.extract_account_info_from_title)
+            registry.start()
+            self.terminal_registry = registry
+            print(f"Đang theo dõi sự kiện cửa sổ: {len(registry)} terminal MT4/MT5 đang mở")
+        except Exception as e:
+            print(f"Không thể theo dõi sự kiện cửa sổ: {str(e)}")
+            self.terminal_registry = None
+    
+    def capture_windows(self):
+        """Chụp các cửa sổ đang hiển thị một lần cho cả thao tác (quét, kiểm tra, đăng nhập)"""
+        window_snapshot = WindowSnapshot.capture(self.window_source)
+        print(f"Đã chụp {len(window_snapshot)} cửa sổ đang hiển thị")
+        return window_snapshot
+    
+    def get_terminal_window(self, terminal):
+        """Cửa sổ của terminal đã quét, lấy thẳng theo hwnd (không duyệt lại desktop)
+
+        terminal là bản ghi từ find_running_terminals (hoặc danh sách tài khoản sai nhánh/hết tiền)
+        mang hwnd, process_id, create_time. Trả về None nếu cửa sổ đã đóng hoặc hwnd/pid đã
+        thuộc về cửa sổ/tiến trình khác, để không đăng nhập nhầm vào cửa sổ có tiêu đề trùng.
+        """
+        hwnd = terminal.get("hwnd")
+        title = terminal.get("title") or terminal.get("window_title", "")
+        if not hwnd:
+            print(f"Không có hwnd cho cửa sổ: {title}")
+            return None
+        source = self.window_source if self.window_source is not None else Win32Windows()
+        current_title = verify_window(source, hwnd, terminal.get("process_id"), terminal.get("create_time"))
+        if current_title is None:
+            print(f"Cửa sổ {hwnd} ({title}) không còn hợp lệ, cần quét lại")
+            return None
+        if current_title != title:
+            print(f"Cửa sổ {hwnd} đã đổi tiêu đề: {title} -> {current_title}")
+        return window_object(hwnd)
+    
+    def on_journal_event(self, event):
+        """Sự kiện đăng nhập/kết nối mới trong nhật ký terminal (gọi từ luồng đọc nhật ký)"""
+        print(describe_event(event))
+    
+    def watch_terminal_journal(self, pid):
+        """Theo dõi nhật ký của terminal tiến trình pid; trả về pid nếu theo dõi được, None nếu không"""
+        if not pid:
+            return None
+        try:
+            source = self.window_source if self.window_source is not None else Win32Windows()
+            data_dir = source.data_dir(pid)
+            if data_dir and self.terminal_journals.watch(pid, data_dir):
+                return pid
+        except Exception as e:
+            print(f"Không thể theo dõi nhật ký terminal {pid}: {str(e)}")
+        return None
+    
+    def watch_terminal_journals(self, terminals):
+        """Theo dõi nhật ký của mọi terminal vừa quét được"""
+        for pid in dict.fromkeys(terminal.get("process_id") for terminal in terminals):
+            self.watch_terminal_journal(pid)
+    
+    def wait_login_result(self, journal_key, login_id, since, timeout=JOURNAL_TIMEOUT, deadline=None):
+        """Kết quả đăng nhập login_id theo nhật ký terminal sau khi nhấn Enter
+
+        Trả về (True/False/None, thông báo): True khi terminal ghi authorized, False khi ghi
+        invalid account, None khi không theo dõi được nhật ký hoặc hết thời gian chờ.
+        deadline (time.monotonic) là hạn chờ chung của cả loạt, khi có thì chỉ chờ phần còn lại.
+        """
+        if journal_key is None:
+            return None, "⚠️ Không đọc được nhật ký terminal, chưa xác nhận được kết quả đăng nhập"
+        wait = timeout if deadline is None else max(0.0, deadline - time.monotonic())
+        event = self.terminal_journals.wait_for_login(journal_key, login_id, wait, since)
+        if event is None:
+            return None, f"⚠️ Sau {timeout:g} giây nhật ký terminal chưa ghi kết quả đăng nhập {login_id}"
+        if event.event == JOURNAL_INVALID_ACCOUNT:
+            return False, f"❌ Terminal từ chối tài khoản {login_id}: sai tài khoản/mật khẩu/server (invalid account)"
+        return True, f"✅ Terminal xác nhận tài khoản {login_id} đã đăng nhập trên {event.server}"
+    
+    def confirm_login_results(self, login_results, timeout=JOURNAL_TIMEOUT):
+        """Xác nhận cả loạt đăng nhập vừa gửi phím theo nhật ký terminal, trả về số đăng nhập thành công
+
+        Kết quả có status "sent" mang "journal" = (journal_key, login_id, mark) ghi lúc gửi phím;
+        status được đổi thành success/failed/unconfirmed kèm message. Mọi cửa sổ đã nhận phím
+        trước khi chờ nên cả loạt chờ chung tối đa timeout giây, không phải timeout cho từng cửa sổ.
+        """
+        deadline = time.monotonic() + timeout
+        success_count = 0
+        for login_result in login_results:
+            if login_result.get("status") != "sent":
+                continue
+            journal_key, login_id, since = login_result.pop("journal")
+            confirmed, journal_message = self.wait_login_result(journal_key, login_id, since, timeout, deadline)
+            print(journal_message)
+            if confirmed is False:
+                login_result["status"] = "failed"
+                login_result["message"] = journal_message
+            elif confirmed is None and journal_key is not None:
+                login_result["status"] = "unconfirmed"
+                login_result["message"] = journal_message
+            else:
+                login_result["status"] = "success"
+                login_result["message"] = f"✅ Đăng nhập thành công tài khoản: {login_id}"
+                success_count += 1
+        return success_count
+    
+    def get_journal_timeout(self):
+        """Thời gian chờ nhật ký terminal (speed_settings.journal_timeout trong mt_login_config.json)"""
+        try:
+            config_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mt_login_config.json")
+            if os.path.exists(config_file):
+                with open(config_file, 'r', encoding='utf-8') as f:
+                    config = json.load(f)
+                    return config.get("speed_settings", {}).get("journal_timeout", JOURNAL_TIMEOUT)
+        except Exception as config_err:
+            print(f"Không thể tải cấu hình tốc độ: {str(config_err)}")
+        return JOURNAL_TIMEOUT
+    
+    def get_required_column_indexes(self):
+        """Các cột cần tải: vùng hiển thị C..P, cột equity và các cột đã cấu hình"""
+        indexes = set(range(DISPLAY_START_COL, DISPLAY_END_COL + 1))
+        indexes.add(EQUITY_COL)
+        for col_input in (self.broker_col_input, self.server_col_input, self.login_col_input,
+                          self.pass_col_input, self.branch_col_input):
+            index = self.get_column_index(col_input.text())
+            if index >= 0:
+                indexes.add(index)
+        return sorted(indexes)
+    
+    def get_column_config(self):
+        """Vị trí các cột đã cấu hình dùng để dựng AccountTable"""
+        return ColumnConfig(
+            login=self.get_column_index(self.login_col_input.text()),
+            broker=self.get_column_index(self.broker_col_input.text()),
+            server=self.get_column_index(self.server_col_input.text()),
+            password=self.get_column_index(self.pass_col_input.text()),
+            branch=self.get_column_index(self.branch_col_input.text())
+        )
+    
+    def load_sheet_values(self, all_values, header_row, from_cache=False, snapshot=None, row_sources=None, table=None):
+        """Nạp dữ liệu đã tải về vào bảng tài khoản (AccountTable) và bảng hiển thị
+        
+        Nếu bật đồng bộ tăng dần và đã có snapshot trước đó, chỉ cập nhật
+        các hàng thêm mới/thay đổi/bị xóa trên bảng hiển thị thay vì dựng lại toàn bộ.
+        Dữ liệu tải từ mạng (from_cache=False) được lưu tạm ra đĩa cho lần khởi động sau.
+        snapshot có thể được tính sẵn trên luồng nền để tránh băm lại trên luồng giao diện.
+        row_sources là worksheet nguồn của từng hàng dữ liệu khi gộp nhiều worksheet.
+        table là AccountTable đã dựng sẵn trên luồng nền khi tải theo trang (all_values=None).
+        """
+        if table is None and (not all_values or len(all_values) <= header_row):
+            if not from_cache:
+                QMessageBox.warning(self, "Lỗi", "Không đủ dữ liệu trong Sheet hoặc hàng tiêu đề không tồn tại!")
+            return False
+        
+        # Phân tích toàn bộ dữ liệu một lần: Login ID, equity, sàn/server/nhánh
+        if table is None:
+            table = AccountTable.from_values(all_values, header_row, self.get_column_config(),
+                                             branch_extractor=self.extract_branch_name,
+                                             row_sources=row_sources)
+        
+        # Chỉ hiển thị dữ liệu từ cột C đến cột P (index 2 đến 15)
+        if not table.display_headers:
+            if not from_cache:
+                QMessageBox.warning(self, "Lỗi", "Không có đủ cột trong Google Sheet để hiển thị từ cột C đến cột P!")
+            return False
+        
+        if not table.display_rows:
+            if not from_cache:
+                QMessageBox.warning(self, "Lỗi", "Không có dữ liệu trong vùng được chọn!")
+            return False
+        
+        # Snapshot mới (chỉ gồm khóa + mã băm) để so sánh ở lần tải sau
+        new_snapshot = snapshot
+        if all_values is not None and (new_snapshot is None or new_snapshot.key_index != table.config.login):
+            new_snapshot = snapshot_from_values(all_values, header_row, table.config.login)
+        
+        # Thử đồng bộ tăng dần nếu bảng hiện tại khớp 1-1 với snapshot trước đó
+        old_table = self.account_table
+        if (self.incremental_sync and self.sheet_snapshot is not None and new_snapshot is not None
+                and old_table is not None and len(old_table) == len(self.sheet_snapshot)
+                and old_table.config == table.config):
+            diff = diff_snapshots(self.sheet_snapshot, new_snapshot)
+            if not diff.requires_full_reload:
+                self.account_table = table
+                self.sheet_snapshot = new_snapshot
+                if diff.has_changes():
+                    self.apply_sheet_diff(diff, old_table)
+                report = f"✅ Đồng bộ tăng dần thành công! Số bản ghi: {len(table.display_rows)} ({diff.summary()})"
+                details = diff.details()
+                if details:
+                    report += "\n" + "\n".join(details)
+                self.data_display.setText(report)
+                print(report)
+                if not from_cache:
+                    self.save_sheet_cache(all_values)
+                return True
+            print(f"Đồng bộ tăng dần không áp dụng được: {diff.reason}")
+        
+        self.account_table = table
+        self.sheet_snapshot = new_snapshot
+        
+        # Cập nhật combo box với tên các cột
+        self.column_combo.clear()
+        self.column_combo.addItems(table.display_headers)
+        
+        # Cập nhật bảng dữ liệu (bỏ qua nếu các hàng đã được hiển thị dần khi tải theo trang)
+        if not (self.streamed_rows and self.streamed_rows == len(table.display_rows) == self.data_table.rowCount()):
             self.apply_filters()
-            
-            # Cập nhật thông tin vào data_display thay vì hiển thị MessageBox
-            self.data_display.setText(f"✅ Đã kết nối và tải dữ liệu thành công! Số bản ghi: {len(records)}")
-                
+        
+        # Cập nhật thông tin vào data_display thay vì hiển thị MessageBox
+        self.data_display.setText(f"✅ Đã kết nối và tải dữ liệu thành công! Số bản ghi: {len(table.display_rows)}")
+        if not from_cache:
+            self.save_sheet_cache(all_values)
+        return True
+    
+    def get_sheet_cache_key(self):
+        """Khóa lưu tạm: URL sheet chính và danh sách worksheet (hoặc tệp nguồn cục bộ) đang cấu hình"""
+        if self.data_source_type in LOCAL_SOURCE_TYPES:
+            return f"{self.data_source_type}:{self.data_source_path}", self.data_source_name
+        sources = self.get_sheet_sources()
+        if len(sources) == 1:
+            return sources[0]
+        return sources[0][0], "\n".join(f"{url} | {name}" for url, name in sources)
+    
+    def get_sheet_cache_path(self):
+        """Đường dẫn tệp lưu tạm dữ liệu của sheet/worksheet đang cấu hình"""
+        return cache_path(self.app_dir, *self.get_sheet_cache_key())
+    
+    def save_sheet_cache(self, all_values):
+        """Lưu dữ liệu thô của lần tải thành công gần nhất ra đĩa (snapshot theo cột)
+        
+        Khi tải theo trang (all_values=None) dữ liệu được ghi thẳng từ các cột của AccountTable.
+        """
+        if not all_values and self.account_table is None:
+            return
+        try:
+            sheet_url, worksheet = self.get_sheet_cache_key()
+            extra = {"row_sources": self.account_table.row_sources if self.account_table else [],
+                     "revisions": self.sheet_revisions,
+                     "load_signature": self.sheet_load_signature,
+                     # Khóa + mã băm từng hàng để đồng bộ tăng dần ngay sau khi khởi động
+                     "sync": self.sheet_snapshot.to_state() if self.sheet_snapshot is not None else None}
+            if all_values:
+                save_snapshot(self.get_sheet_cache_path(), sheet_url, worksheet, all_values, extra=extra)
+            else:
+                save_snapshot_columns(self.get_sheet_cache_path(), sheet_url, worksheet,
+                                      self.account_table.raw_columns(), self.account_table.raw_row_lengths(),
+                                      extra=extra)
         except Exception as e:
-            QMessageBox.critical(self, "Lỗi", f"Không thể kết nối đến Google Sheet: {str(e)}")
-            # In thêm chi tiết lỗi vào data_display để debug
-            self.data_display.setText(f"Chi tiết lỗi:\n{str(e)}\n\nLoẠI: {type(e).__name__}")
+            print(f"Không thể lưu dữ liệu tạm: {str(e)}")
+    
+    def load_sheet_cache(self):
+        """Hiển thị ngay dữ liệu đã lưu tạm của lần tải trước (nếu có) khi khởi động"""
+        try:
+            header_row = int(self.header_row_input.text())
+            if header_row < 1:
+                header_row = 1
+        except ValueError:
+            header_row = 1
+        try:
+            started = time.perf_counter()
+            sheet_url, worksheet = self.get_sheet_cache_key()
+            config = self.get_column_config()
+            # Chỉ giải mã các cột cần lưu, dựng AccountTable thẳng từ các cột (không dựng lại từng hàng)
+            cached = load_snapshot_columns(self.get_sheet_cache_path(), sheet_url, worksheet,
+                                           config.stored_columns())
+            if not cached:
+                return False
+            row_lengths, columns, saved_at, extra = cached
+            if len(row_lengths) <= header_row:
+                return False
+            table = AccountTable.from_columns(row_lengths, columns, header_row, config,
+                                              branch_extractor=self.extract_branch_name,
+                                              row_sources=extra.get("row_sources"))
+            snapshot = SheetSnapshot.from_state(extra.get("sync"), header_row, config.login)
+            if not self.load_sheet_values(None, header_row, from_cache=True, snapshot=snapshot, table=table):
+                return False
+            # Phiên bản lúc lưu tạm: nếu sheet chưa đổi thì lần kết nối tới không cần tải lại
+            self.sheet_revisions = extra.get("revisions") or {}
+            self.sheet_load_signature = extra.get("load_signature")
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            saved_text = time.strftime("%H:%M:%S %d/%m/%Y", time.localtime(saved_at))
+            self.data_display.setText(
+                f"⚡ Đã hiển thị {len(self.account_table.display_rows)} bản ghi từ dữ liệu lưu tạm (lưu lúc {saved_text}, "
+                f"{elapsed_ms:.0f} ms). Đang làm mới từ Google Sheet..."
+            )
+            return True
+        except Exception as e:
+            print(f"Không thể đọc dữ liệu lưu tạm: {str(e)}")
+            return False
+    
+    def apply_sheet_diff(self, diff, old_table):
+        """Áp dụng các hàng thêm/sửa/xóa lên bảng hiển thị mà không dựng lại toàn bộ"""
+        table = self.account_table
+        
+        # Nếu đang tìm kiếm thì hiển thị lại toàn bộ rồi chạy lại bộ lọc
+        if self.search_input.text().strip() or self.search_matches is not None:
+            self.apply_filters()
+            self.search_accounts()
+            return
+        # Vị trí hàng trên bảng chỉ trùng vị trí dữ liệu khi mọi hàng đều được hiển thị
+        if (len(old_table.display_rows) != len(old_table) or len(table.display_rows) != len(table)
+                or self.data_table.rowCount() != len(old_table)):
+            self.apply_filters()
+            return
+        
+        self.data_table.setUpdatesEnabled(False)
+        try:
+            for old_pos in sorted(diff.deleted, reverse=True):
+                self.data_table.removeRow(old_pos)
+            for new_pos in sorted(diff.inserted):
+                self.data_table.insertRow(new_pos)
+                self.fill_table_row(new_pos, new_pos)
+            for _, new_pos in diff.changed:
+                self.fill_table_row(new_pos, new_pos, keep_check_state=True)
+            # Cập nhật lại index gốc lưu trong checkbox vì vị trí hàng đã dịch chuyển
+            if diff.inserted or diff.deleted:
+                for row in range(self.data_table.rowCount()):
+                    checkbox_item = self.data_table.item(row, 0)
+                    if checkbox_item:
+                        checkbox_item.setData(Qt.UserRole, row)
+        finally:
+            self.data_table.setUpdatesEnabled(True)
     
     def apply_filters(self):
         """Chỉ hiển thị toàn bộ dữ liệu, không lọc theo nhánh hay tìm kiếm sàn nữa"""
-        if self.df is None:
+        if self.account_table is None:
             return
-        filtered_df = self.df.copy()
-        self.display_filtered_data(filtered_df)
+        self.display_filtered_data(self.account_table.display_rows)
     
-    def display_filtered_data(self, filtered_df):
-        if filtered_df is None:
+    def display_filtered_data(self, row_indexes):
+        """Hiển thị các hàng của AccountTable theo danh sách vị trí (không sao chép dữ liệu)"""
+        table = self.account_table
+        if table is None or row_indexes is None:
             return
-        self.data_table.setRowCount(len(filtered_df))
-        self.data_table.setColumnCount(len(filtered_df.columns) + 1)
-        headers = ["Chọn"] + list(filtered_df.columns)
+        self.reset_search_rows()
+        self.data_table.setRowCount(len(row_indexes))
+        self.data_table.setColumnCount(len(table.display_headers) + 1)
+        headers = ["Chọn"] + table.display_headers
         self.data_table.setHorizontalHeaderLabels(headers)
-        for row in range(len(filtered_df)):
-            checkbox_item = QTableWidgetItem()
-            checkbox_item.setFlags(Qt.ItemIsUserCheckable | Qt.ItemIsEnabled)
-            checkbox_item.setCheckState(Qt.Unchecked)
-            # Lưu index gốc của dòng vào item để dùng khi đăng nhập
-            orig_index = filtered_df.index[row]
-            checkbox_item.setData(Qt.UserRole, orig_index)
-            self.data_table.setItem(row, 0, checkbox_item)
-            for col in range(len(filtered_df.columns)):
-                value = str(filtered_df.iloc[row, col])
-                if filtered_df.columns[col].lower() in ["password", "pass", "mật khẩu", "mat khau"] or "pass" in filtered_df.columns[col].lower():
-                    if value:
-                        value = '*' * len(value)
-                item = QTableWidgetItem(value)
-                item.setFlags(item.flags() & ~Qt.ItemIsEditable)
-                self.data_table.setItem(row, col + 1, item)
+        for row, orig_index in enumerate(row_indexes):
+            # Lưu vị trí gốc của dòng vào item để dùng khi đăng nhập
+            self.fill_table_row(row, orig_index)
         self.data_table.setColumnWidth(0, 50)
         header = self.data_table.horizontalHeader()
         for col in range(1, len(headers)):
             header.setSectionResizeMode(col, QHeaderView.Stretch)
     
+    def fill_table_row(self, row, orig_index, keep_check_state=False):
+        """Điền một hàng vào bảng dữ liệu (checkbox + các ô giá trị, che mật khẩu)"""
+        table = self.account_table
+        self.fill_table_cells(row, orig_index, table.display_headers, table.display_values(orig_index),
+                              self.get_row_source(orig_index), keep_check_state)
+    
+    def fill_table_cells(self, row, orig_index, columns, values, source="", keep_check_state=False):
+        """Điền checkbox (lưu vị trí gốc) và các ô giá trị của một hàng"""
+        checkbox_item = self.data_table.item(row, 0)
+        if checkbox_item is None or not keep_check_state:
+            checkbox_item = QTableWidgetItem()
+            checkbox_item.setFlags(Qt.ItemIsUserCheckable | Qt.ItemIsEnabled)
+            checkbox_item.setCheckState(Qt.Unchecked)
+            self.data_table.setItem(row, 0, checkbox_item)
+        checkbox_item.setData(Qt.UserRole, orig_index)
+        if self.extra_worksheets:
+            checkbox_item.setToolTip(f"Worksheet: {source}")
+        for col in range(len(columns)):
+            value = str(values[col])
+            if columns[col].lower() in ["password", "pass", "mật khẩu", "mat khau"] or "pass" in columns[col].lower():
+                if value:
+                    value = '*' * len(value)
+            item = QTableWidgetItem(value)
+            item.setFlags(item.flags() & ~Qt.ItemIsEditable)
+            self.data_table.setItem(row, col + 1, item)
+    
     def display_column_data(self):
-        if self.df is None:
+        if self.account_table is None:
             QMessageBox.warning(self, "Lỗi", "Vui lòng kết nối đến Google Sheet trước!")
             return
         
@@ -438,19 +1027,23 @@ class GoogleSheetMT4Login(QMainWindow):
         # Hiển thị dữ liệu từ cột đã chọn
         data_text = f"Dữ liệu trong cột '{selected_column}':\n\n"
         
-        for i, value in enumerate(self.df[selected_column]):
+        for i, value in enumerate(self.account_table.display_column(selected_column)):
             data_text += f"{i+1}. {value}\n"
         
         self.data_display.setText(data_text)
     
     def login_to_mt(self):
         """Đăng nhập vào MT4/MT5 với tài khoản đã chọn"""
-        if self.all_data is None:
+        table = self.account_table
+        if table is None:
             QMessageBox.warning(self, "Lỗi", "Vui lòng kết nối đến Google Sheet trước!")
             return
         # Tìm tất cả các hàng được chọn (có checkbox được tích)
         selected_orig_indexes = []
         for row in range(self.data_table.rowCount()):
+            # Hàng bị ẩn bởi tìm kiếm không được tính là đã chọn
+            if self.data_table.isRowHidden(row):
+                continue
             checkbox_item = self.data_table.item(row, 0)
             if checkbox_item and checkbox_item.checkState() == Qt.Checked:
                 orig_index = checkbox_item.data(Qt.UserRole)
@@ -472,31 +1065,22 @@ class GoogleSheetMT4Login(QMainWindow):
         except Exception as e:
             QMessageBox.warning(self, "Lỗi", f"Lỗi khi xử lý cấu hình cột: {str(e)}")
             return
-        # Lấy header row từ cấu hình
-        try:
-            header_row = int(self.header_row_input.text()) - 1
-            if header_row < 0:
-                header_row = 0
-        except ValueError:
-            header_row = 0
         # Thông tin các tài khoản sẽ đăng nhập
         accounts_to_login = []
         # Lấy dữ liệu từ các index gốc đã chọn
         for orig_index in selected_orig_indexes:
             try:
-                sheet_row_index = header_row + 1 + orig_index
-                if sheet_row_index >= len(self.all_data):
+                if orig_index >= len(table):
                     self.data_display.append(f"⚠️ Không tìm thấy dữ liệu cho hàng gốc {orig_index + 1}!")
                     continue
-                row_data = self.all_data[sheet_row_index]
-                if len(row_data) <= max(broker_col, server_col, login_col, pass_col, branch_col):
+                if not table.has_columns(orig_index, broker_col, server_col, login_col, pass_col, branch_col):
                     self.data_display.append(f"⚠️ Hàng gốc {orig_index + 1} không có đủ cột theo cấu hình!")
                     continue
-                broker_name = row_data[broker_col]
-                server_name = row_data[server_col]
-                login_id = row_data[login_col]
-                password = row_data[pass_col]
-                branch_name = row_data[branch_col]
+                broker_name = table.cell(orig_index, broker_col)
+                server_name = table.cell(orig_index, server_col)
+                login_id = table.cell(orig_index, login_col)
+                password = table.cell(orig_index, pass_col)
+                branch_name = table.cell(orig_index, branch_col)
                 if not login_id or not password:
                     self.data_display.append(f"⚠️ Hàng gốc {orig_index + 1}: Login ID hoặc Password không được để trống!")
                     continue
@@ -539,6 +1123,7 @@ class GoogleSheetMT4Login(QMainWindow):
             # Tiến hành đăng nhập từng tài khoản
             success_count = 0
             failed_count = 0
+            account_results = []  # (tài khoản, các cửa sổ đã gửi phím đăng nhập)
             
             for acc in accounts_to_login:
                 try:
@@ -546,12 +1131,11 @@ class GoogleSheetMT4Login(QMainWindow):
                     self.data_display.append(f"🔄 Đang đăng nhập tài khoản {acc['login_id']}...")
                     QApplication.processEvents()  # Cập nhật giao diện
                     
-                    # Sử dụng hàm perform_login hiện có và lấy kết quả
-                    result = self.perform_login(acc['login_id'], acc['password'], acc['server'], acc['broker'])
+                    # Sử dụng hàm perform_login hiện có và lấy các cửa sổ đã gửi phím
+                    results = self.perform_login(acc['login_id'], acc['password'], acc['server'], acc['broker'])
                     
-                    # Kiểm tra kết quả đăng nhập
-                    if result > 0:
-                        success_count += result
+                    if results:
+                        account_results.append((acc, results))
                     else:
                         failed_count += 1
                     
@@ -562,6 +1146,22 @@ class GoogleSheetMT4Login(QMainWindow):
                     self.data_display.append(f"❌ Lỗi khi đăng nhập tài khoản {acc['login_id']}: {str(e)}")
                     failed_count += 1
             
+            # Chờ nhật ký terminal một lần cho cả loạt (không chờ sau từng cửa sổ)
+            if account_results:
+                self.data_display.append("⏳ Đang chờ nhật ký terminal xác nhận kết quả đăng nhập...")
+                QApplication.processEvents()
+                self.confirm_login_results([result for _, results in account_results for result in results],
+                                           self.get_journal_timeout())
+            for acc, results in account_results:
+                confirmed_count = 0
+                for result in results:
+                    self.data_display.append(f"{result['title']}: {result['message']}")
+                    if result["status"] == "success":
+                        confirmed_count += 1
+                success_count += confirmed_count
+                if confirmed_count == 0:
+                    failed_count += 1
+            
             # Hiển thị tóm tắt kết quả
             summary = f"\n✅ Đã gửi thông tin đăng nhập cho {success_count}/{len(accounts_to_login)} tài khoản."
             if failed_count > 0:
@@ -591,11 +1191,14 @@ class GoogleSheetMT4Login(QMainWindow):
                     return field
         return None
     
-    def detect_platform_type(self, window_obj):
+    def detect_platform_type(self, window_obj, process_snapshot=None):
         """Xác định loại nền tảng (MT4 hoặc MT5) dựa vào quy trình thực thi
         
         MT4 sử dụng: terminal.exe
         MT5 sử dụng: terminal64.exe
+        
+        process_snapshot là ảnh chụp tiến trình dùng chung cho cả lần quét/đăng nhập;
+        nếu không có thì chụp mới cho riêng cửa sổ này.
         """
         try:
             # Lấy process ID của cửa sổ
@@ -609,25 +1212,24 @@ class GoogleSheetMT4Login(QMainWindow):
             # Chuẩn bị biến để lưu trữ kết quả
             platform_log = f"Process ID: {process_id}\n"
             
-            # Sử dụng danh sách process hiện tại để xác định
+            # Sử dụng ảnh chụp danh sách process để xác định
             try:
-                all_processes = {proc.pid: proc.name() for proc in psutil.process_iter(['pid', 'name'])}
-                platform_log += f"Found processes: {len(all_processes)}\n"
+                if process_snapshot is None:
+                    process_snapshot = ProcessSnapshot.capture()
+                platform_log += f"Found processes: {len(process_snapshot)}\n"
                 print(platform_log)
                 
-                # Lấy tên process dựa vào process_id
-                if process_id in all_processes:
-                    process_name = all_processes[process_id].lower()
+                # Lấy tên process dựa vào process_id (đối chiếu cả thời điểm khởi động của process)
+                process_name = process_snapshot.name_of(process_id).lower()
+                if process_name:
                     platform_log += f"Process name: {process_name}\n"
                     print(platform_log)
                     
-                    # Kiểm tra tên process
-                    if "terminal64" in process_name:
-                        print(f"Phát hiện MT5 từ tên process: {process_name}")
-                        return "MT5"
-                    elif "terminal" in process_name and "64" not in process_name:
-                        print(f"Phát hiện MT4 từ tên process: {process_name}")
-                        return "MT4"
+                    # Kiểm tra tên process (cùng cách xác định với danh sách terminal theo sự kiện)
+                    platform_type = platform_from_process_name(process_name)
+                    if platform_type:
+                        print(f"Phát hiện {platform_type} từ tên process: {process_name}")
+                        return platform_type
             except Exception as process_err:
                 print(f"Lỗi khi xác định qua process: {str(process_err)}")
             
@@ -661,8 +1263,13 @@ class GoogleSheetMT4Login(QMainWindow):
             print(f"Lỗi khi xác định loại nền tảng: {str(e)}")
             return "MT4"  # Mặc định là MT4 nếu xảy ra lỗi
             
-    def perform_login(self, login_id, password, server_name, broker_name):
-        """Thực hiện đăng nhập vào tất cả các MT4/MT5 có cùng tên sàn"""
+    def perform_login(self, login_id, password, server_name, broker_name, window_snapshot=None):
+        """Thực hiện đăng nhập vào tất cả các MT4/MT5 có cùng tên sàn
+
+        window_snapshot là ảnh chụp cửa sổ của thao tác gọi hàm; nếu không có thì chụp mới.
+        Trả về kết quả (status "sent") của từng cửa sổ đã gửi phím đăng nhập, người gọi xác nhận
+        cả loạt bằng confirm_login_results; danh sách rỗng nếu không đăng nhập được cửa sổ nào.
+        """
         try:
             # Tải cấu hình từ file nếu có
             config_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mt_login_config.json")
@@ -691,12 +1298,11 @@ class GoogleSheetMT4Login(QMainWindow):
                 # Tiếp tục dù có lỗi COM
             
             # Tìm cửa sổ MT4/5
-            windows = []
             try:
-                # Sử dụng Desktop() với xử lý lỗi tốt hơn
-                desktop = Desktop(backend="win32")
-                windows = desktop.windows()
-                print(f"Found {len(windows)} windows")
+                # Duyệt desktop một lần; tiến trình của cửa sổ được đọc từ cùng ảnh chụp
+                if window_snapshot is None:
+                    window_snapshot = self.capture_windows()
+                print(f"Found {len(window_snapshot)} windows")
             except Exception as e:
                 error_msg = f"Lỗi khi lấy danh sách cửa sổ: {str(e)}"
                 print(error_msg)
@@ -772,15 +1378,10 @@ class GoogleSheetMT4Login(QMainWindow):
             # Hiển thị danh sách cửa sổ và tìm kiếm cửa sổ phù hợp
             matching_windows = []
             
-            for win in windows:
+            for window in window_snapshot:
                 try:
-                    # Lấy tiêu đề cửa sổ một cách an toàn
-                    window_text = ""
-                    try:
-                        window_text = win.window_text()
-                    except Exception as e:
-                        print(f"Không thể lấy tiêu đề cửa sổ: {str(e)}")
-                        continue
+                    # Tiêu đề cửa sổ đã đọc khi chụp
+                    window_text = window.title
                     
                     if not window_text:
                         continue
@@ -826,15 +1427,20 @@ class GoogleSheetMT4Login(QMainWindow):
                     
                     # Nếu có ít nhất một khớp, thêm vào danh sách cửa sổ phù hợp
                     if broker_match or server_match or (mt_match and priority > 0):
+                        # Chỉ tạo đối tượng pywinauto cho cửa sổ phù hợp
+                        win = window_snapshot.window_object(window.hwnd)
+                        
                         # Xác định loại nền tảng (MT4/MT5)
                         try:
-                            platform_type = self.detect_platform_type(win)
+                            platform_type = self.detect_platform_type(win, window_snapshot.processes)
                         except Exception as platform_err:
                             print(f"Lỗi khi xác định nền tảng: {str(platform_err)}")
                             platform_type = "MT4"  # Mặc định là MT4 nếu có lỗi
                             
                         matching_windows.append({
                             "window": win, 
+                            "hwnd": window.hwnd,
+                            "pid": window.pid,
                             "priority": priority, 
                             "title": window_text,
                             "platform": platform_type,
@@ -865,8 +1471,8 @@ class GoogleSheetMT4Login(QMainWindow):
                 self.data_display.append(log_text)
                 raise Exception("Không tìm thấy cửa sổ MetaTrader! Vui lòng mở MT4/MT5 trước.")
             
-            # Lưu số lượng cửa sổ đã đăng nhập thành công
-            successful_logins = 0
+            # Các cửa sổ đã gửi phím đăng nhập, chờ xác nhận theo nhật ký terminal
+            login_results = []
             
             # Thực hiện đăng nhập cho từng cửa sổ tìm thấy
             for win_info in matching_windows:
@@ -876,6 +1482,10 @@ class GoogleSheetMT4Login(QMainWindow):
                 
                 log_text += f"\n\n🔄 ĐANG ĐĂNG NHẬP VÀO: {window_title} ({platform_type})\n"
                 
+                # Theo dõi nhật ký terminal từ trước khi đăng nhập để nhận kết quả
+                journal_key = self.watch_terminal_journal(win_info["pid"])
+                journal_mark = self.terminal_journals.mark()
+                
                 try:
                     # Kết nối đến ứng dụng và focus vào cửa sổ
                     try:
@@ -887,13 +1497,12 @@ class GoogleSheetMT4Login(QMainWindow):
                             window_obj.set_foreground()
                         except Exception as e:
                             log_text += f"⚠️ Không thể set_foreground(): {str(e)}\n"
-                            # Thử phương pháp khác nữa - sử dụng tên cửa sổ để tìm kiếm
+                            # Đưa thẳng hwnd đã quét lên foreground, không tìm theo tiêu đề
                             try:
-                                # Sử dụng pyautogui để tìm và nhấp vào cửa sổ
-                                pyautogui.getWindowsWithTitle(window_title)[0].activate()
-                                log_text += "✓ Đã kích hoạt cửa sổ bằng pyautogui\n"
+                                focus_window(win_info["hwnd"])
+                                log_text += "✓ Đã kích hoạt cửa sổ bằng win32gui\n"
                             except Exception as e2:
-                                log_text += f"⚠️ Không thể kích hoạt cửa sổ: {str(e2)}\n"
+                                raise Exception(f"Không thể kích hoạt cửa sổ, bỏ qua đăng nhập: {str(e2)}")
                             
                     time.sleep(speed_settings["focus_delay"])  # Giảm thời gian chờ sau khi focus
                     
@@ -964,18 +1573,27 @@ class GoogleSheetMT4Login(QMainWindow):
                     pyautogui.press('enter')
                     
                     log_text += "✅ ĐÃ HOÀN THÀNH QUY TRÌNH ĐĂNG NHẬP!\n"
-                    successful_logins += 1
                     
-                    # Đợi một khoảng thời gian để form đăng nhập được xử lý xong
-                    # trước khi chuyển sang cửa sổ tiếp theo
-                    time.sleep(1)  # Giảm thời gian chờ giữa các lần đăng nhập
+                    # Kết quả theo nhật ký terminal được xác nhận một lần cho cả loạt
+                    # (confirm_login_results), không chờ ở từng cửa sổ
+                    login_results.append({
+                        "status": "sent",
+                        "message": "",
+                        "title": window_title,
+                        "journal": (journal_key, login_id, journal_mark)
+                    })
+                    
+                    if journal_key is None:
+                        # Đợi một khoảng thời gian để form đăng nhập được xử lý xong
+                        # trước khi chuyển sang cửa sổ tiếp theo
+                        time.sleep(1)  # Giảm thời gian chờ giữa các lần đăng nhập
                     
                 except Exception as e:
                     log_text += f"❌ LỖI KHI ĐĂNG NHẬP VÀO CỬA SỔ: {str(e)}\n"
             
             self.data_display.append(log_text)
             
-            return successful_logins  # Trả về số lượng đăng nhập thành công thay vì hiển thị thông báo
+            return login_results  # Trả về các cửa sổ đã gửi phím thay vì hiển thị thông báo
             
         except Exception as e:
             error_detail = f"LỖI KHI ĐĂNG NHẬP: {str(e)}\nLoại lỗi: {type(e).__name__}"
@@ -983,8 +1601,8 @@ class GoogleSheetMT4Login(QMainWindow):
             print(error_detail)
             import traceback
             traceback.print_exc()
-            # Trả về 0 (không có đăng nhập thành công) thay vì hiển thị popup
-            return 0
+            # Trả về danh sách rỗng (không có cửa sổ nào đăng nhập) thay vì hiển thị popup
+            return []
         finally:
             # Giải phóng COM
             try:
@@ -993,8 +1611,11 @@ class GoogleSheetMT4Login(QMainWindow):
             except:
                 pass
     
-    def find_mt_windows_alternative(self):
-        """Phương thức thay thế để tìm cửa sổ MT4/MT5 sử dụng win32gui trực tiếp"""
+    def find_mt_windows_alternative(self, window_snapshot=None):
+        """Phương thức thay thế để tìm cửa sổ MT4/MT5 theo tiêu đề cửa sổ
+
+        window_snapshot là ảnh chụp cửa sổ của lần quét; nếu không có thì chụp mới.
+        """
         found_windows = []
         
         print("===== PHƯƠNG PHÁP THAY THẾ =====")
@@ -1002,121 +1623,98 @@ class GoogleSheetMT4Login(QMainWindow):
         try:
             # Thử tìm quy trình MT4/MT5 bằng phương pháp khác
             try:
-                import win32process
-                import win32gui
-                import win32con
+                if window_snapshot is None:
+                    window_snapshot = self.capture_windows()
                 
-                def enum_windows_callback(hwnd, results):
-                    # Chỉ xử lý các cửa sổ hiển thị
-                    if win32gui.IsWindowVisible(hwnd):
-                        try:
-                            # Lấy tiêu đề cửa sổ
-                            window_title = win32gui.GetWindowText(hwnd)
-                            if not window_title:
-                                return True  # Tiếp tục đến cửa sổ tiếp theo
-                                
-                            # Bỏ qua cửa sổ của ứng dụng này
-                            if "MT4/MT5 Login - Google Sheets" in window_title:
-                                return True
-                                
-                            # Tiêu đề quá ngắn thường không phải MT4/MT5
-                            if len(window_title) < 15:
-                                return True
-                                
-                            # Kiểm tra xem có phải là cửa sổ MT4/MT5 không
-                            title_lower = window_title.lower()
-                            
-                            # Kiểm tra từ khóa loại trừ trước tiên (để nhanh chóng loại bỏ các cửa sổ không liên quan)
-                            exclude_keywords = [
-                                "notepad", "chrome", "edge", "firefox", "explorer", "microsoft", 
-                                "word", "excel", "powerpoint", "outlook", "access", "onenote",
-                                "calculator", "paint", "desktop", "document", "settings", "control panel",
-                                "visual studio", "vscode", "code", "cmd", "command", "powershell", "terminal",
-                                "settings", "task manager", "file explorer", "file browser", "sql", "database",
-                                "antivirus", "defender", "security", "mail", "messaging", "chat", "teams",
-                                "discord", "skype", "zoom", "video", "browser", "internet", "spotify",
-                                "player", "game", "nvidia", "amd", "intel", "update", "installer", "setup",
-                                "system", "config", "properties", "preferences", "options", "help", "about",
-                                "cursor", "python", "calculator", "camera", "photos", "gallery", "media",
-                                "store", "app", "windows", "adobe", "reader", "acrobat", "photoshop", "illustrator"
-                            ]
+                def classify_window(window, results):
+                    # Ảnh chụp chỉ gồm các cửa sổ hiển thị
+                    hwnd = window.hwnd
+                    try:
+                        # Tiêu đề cửa sổ đã đọc khi chụp
+                        window_title = window.title
+                        if not window_title:
+                            return True  # Tiếp tục đến cửa sổ tiếp theo
                             
-                            # Kiểm tra từ khóa loại trừ
-                            if any(keyword in title_lower for keyword in exclude_keywords):
-                                return True
+                        # Bỏ qua cửa sổ của ứng dụng này
+                        if "MT4/MT5 Login - Google Sheets" in window_title:
+                            return True
                             
-                            # Kiểm tra các pattern cụ thể cho MT4/MT5 
-                            # Pattern chính xác cho MT4: 12345678 : ServerName
-                            # Pattern chính xác cho MT5: 12345678 - ServerName
-                            is_mt4_format = bool(re.search(r'\d{5,10}\s*:\s*[\w\.-]+', window_title))
-                            is_mt5_format = bool(re.search(r'\d{5,10}\s*-\s*[\w\.-]+', window_title))
+                        # Tiêu đề quá ngắn thường không phải MT4/MT5
+                        if len(window_title) < 15:
+                            return True
                             
-                            # Từ khóa chính xác hơn để nhận diện MT4/MT5
-                            mt_keywords = [
-                                "metatrader 4", "metatrader 5", 
-                                "meta trader 4", "meta trader 5",
-                                "metatrader4", "metatrader5"
-                            ]
+                        # Kiểm tra xem có phải là cửa sổ MT4/MT5 không
+                        title_lower = window_title.lower()
+                        
+                        # Kiểm tra từ khóa loại trừ trước tiên (để nhanh chóng loại bỏ các cửa sổ không liên quan)
+                        if EXCLUDED_TITLE_PATTERN.search(title_lower):
+                            return True
+                        
+                        # Kiểm tra các pattern cụ thể cho MT4/MT5 (cùng lần phân tích tiêu đề)
+                        # Pattern chính xác cho MT4: 12345678 : ServerName
+                        # Pattern chính xác cho MT5: 12345678 - ServerName
+                        parsed_title = self.parse_window_title(window_title)
+                        is_mt4_format = parsed_title.title_format == FORMAT_MT4
+                        is_mt5_format = parsed_title.title_format == FORMAT_MT5
+                        
+                        # 1. Cửa sổ có định dạng MT4 hoặc MT5 rõ ràng sẽ được chấp nhận
+                        if is_mt4_format or is_mt5_format:
+                            print(f"Win32GUI: Tìm thấy cửa sổ MT với định dạng chuẩn: {window_title}")
+                            is_mt_window = True
+                        # 2. Nếu không có định dạng rõ ràng nhưng có từ khóa MT4/MT5 chính xác
+                        elif MT_KEYWORD_PATTERN.search(title_lower):
+                            print(f"Win32GUI: Tìm thấy cửa sổ MT với từ khóa: {window_title}")
+                            is_mt_window = True
+                        # 3. Kiểm tra các từ khóa MT chung hơn nếu không tìm thấy theo cách trên
+                        else:
+                            is_general_mt = GENERAL_MT_PATTERN.search(title_lower) is not None
                             
-                            # Kiểm tra từ khóa MT chính xác
-                            has_mt_keyword = any(keyword in title_lower for keyword in mt_keywords)
+                            # Kiểm tra xem tiêu đề có chứa cả ID đăng nhập và server không
+                            has_login_id = LOGIN_DIGITS_PATTERN.search(window_title) is not None
+                            has_server_info = SERVER_HINT_PATTERN.search(title_lower) is not None
                             
-                            # 1. Cửa sổ có định dạng MT4 hoặc MT5 rõ ràng sẽ được chấp nhận
-                            if is_mt4_format or is_mt5_format:
-                                print(f"Win32GUI: Tìm thấy cửa sổ MT với định dạng chuẩn: {window_title}")
-                                is_mt_window = True
-                            # 2. Nếu không có định dạng rõ ràng nhưng có từ khóa MT4/MT5 chính xác
-                            elif has_mt_keyword:
-                                print(f"Win32GUI: Tìm thấy cửa sổ MT với từ khóa: {window_title}")
-                                is_mt_window = True
-                            # 3. Kiểm tra các từ khóa MT chung hơn nếu không tìm thấy theo cách trên
-                            else:
-                                general_mt_keywords = ["mt4", "mt5", "mt4-", "mt5-", "-mt4", "-mt5"]
-                                is_general_mt = any(f" {keyword} " in f" {title_lower} " for keyword in general_mt_keywords)
-                                
-                                # Kiểm tra xem tiêu đề có chứa cả ID đăng nhập và server không
-                                has_login_id = bool(re.search(r'\d{5,10}', window_title))
-                                has_server_info = any(server_keyword in title_lower for server_keyword in ["server", "live", "demo", "real"])
-                                
-                                # Chấp nhận là cửa sổ MT nếu có từ khóa MT và có thông tin ID hoặc server
-                                is_mt_window = is_general_mt and (has_login_id or has_server_info)
-                                
-                                if is_mt_window:
-                                    print(f"Win32GUI: Tìm thấy cửa sổ MT với từ khóa chung: {window_title}")
+                            # Chấp nhận là cửa sổ MT nếu có từ khóa MT và có thông tin ID hoặc server
+                            is_mt_window = is_general_mt and (has_login_id or has_server_info)
                             
                             if is_mt_window:
-                                # Phân tích tiêu đề để lấy thông tin tài khoản
-                                account_info = self.extract_account_info_from_title(window_title)
-                                
-                                # Chỉ thêm vào kết quả nếu có login_id hoặc server
-                                if account_info.get("login_id") or account_info.get("server"):
-                                    # Xác định loại nền tảng
-                                    platform_type = ""
-                                    if is_mt4_format or "mt4" in title_lower:
-                                        platform_type = "MT4"
-                                    elif is_mt5_format or "mt5" in title_lower:
-                                        platform_type = "MT5"
-                                    else:
-                                        platform_type = "MT4"  # Mặc định
-                                        
-                                    # Thêm vào danh sách kết quả
-                                    window_info = {
-                                        "title": window_title,
-                                        "hwnd": hwnd,
-                                        "platform": platform_type,
-                                        "login_id": account_info.get("login_id", ""),
-                                        "broker": account_info.get("broker", ""),
-                                        "server": account_info.get("server", "")
-                                    }
-                                    results.append(window_info)
-                        except Exception as e:
-                            print(f"Lỗi khi xử lý cửa sổ: {str(e)}")
+                                print(f"Win32GUI: Tìm thấy cửa sổ MT với từ khóa chung: {window_title}")
+                        
+                        if is_mt_window:
+                            # Thông tin tài khoản từ tiêu đề đã phân tích
+                            account_info = parsed_title.account_info()
+                            
+                            # Chỉ thêm vào kết quả nếu có login_id hoặc server
+                            if account_info.get("login_id") or account_info.get("server"):
+                                # Xác định loại nền tảng
+                                platform_type = ""
+                                if is_mt4_format or "mt4" in title_lower:
+                                    platform_type = "MT4"
+                                elif is_mt5_format or "mt5" in title_lower:
+                                    platform_type = "MT5"
+                                else:
+                                    platform_type = "MT4"  # Mặc định
+                                    
+                                # Thêm vào danh sách kết quả
+                                window_info = {
+                                    "title": window_title,
+                                    "hwnd": hwnd,
+                                    "process_id": window.pid,
+                                    "create_time": window_snapshot.create_time(window.pid),
+                                    "platform": platform_type,
+                                    "login_id": account_info.get("login_id", ""),
+                                    "broker": account_info.get("broker", ""),
+                                    "server": account_info.get("server", "")
+                                }
+                                results.append(window_info)
+                    except Exception as e:
+                        print(f"Lỗi khi xử lý cửa sổ: {str(e)}")
                     
-                    return True  # Tiếp tục liệt kê
+                    return True  # Tiếp tục đến cửa sổ tiếp theo
                 
-                # Thực hiện liệt kê tất cả các cửa sổ
+                # Phân loại các cửa sổ trong ảnh chụp
                 windows = []
-                win32gui.EnumWindows(enum_windows_callback, windows)
+                for window in window_snapshot:
+                    classify_window(window, windows)
                 
                 print(f"Win32GUI: Tìm thấy {len(windows)} cửa sổ MT4/MT5")
                 
@@ -1124,6 +1722,9 @@ class GoogleSheetMT4Login(QMainWindow):
                 for win in windows:
                     terminal_info = {
                         "title": win["title"],
+                        "hwnd": win["hwnd"],
+                        "process_id": win["process_id"],
+                        "create_time": win["create_time"],
                         "platform": win["platform"],
                         "login_id": win["login_id"],
                         "broker": win["broker"],
@@ -1131,8 +1732,6 @@ class GoogleSheetMT4Login(QMainWindow):
                     }
                     found_windows.append(terminal_info)
                 
-            except ImportError as e:
-                print(f"Win32GUI: Không thể import thư viện cần thiết: {str(e)}")
             except Exception as e:
                 print(f"Win32GUI: Lỗi khi tìm cửa sổ: {str(e)}")
                 
@@ -1141,10 +1740,23 @@ class GoogleSheetMT4Login(QMainWindow):
             
         return found_windows
         
-    def find_running_terminals(self):
-        """Tìm tất cả các cửa sổ MT4/MT5 đang chạy và lấy thông tin tài khoản"""
+    def find_running_terminals(self, window_snapshot=None):
+        """Tìm tất cả các cửa sổ MT4/MT5 đang chạy và lấy thông tin tài khoản
+
+        Mọi cách nhận diện (theo tiến trình, theo tiêu đề, phương pháp thay thế) dùng chung
+        một ảnh chụp cửa sổ; nếu không truyền window_snapshot thì chụp mới một lần.
+        """
         running_terminals = []
         
+        # Danh sách terminal theo dõi theo sự kiện cửa sổ đã sẵn sàng: không cần quét lại
+        registry = self.terminal_registry
+        if registry is not None and registry.running:
+            running_terminals = registry.terminals()
+            if running_terminals:
+                print(f"Lấy {len(running_terminals)} terminal từ danh sách theo dõi sự kiện cửa sổ")
+                self.watch_terminal_journals(running_terminals)
+                return running_terminals
+        
         try:
             print("====== BẮT ĐẦU QUÉT ======")
             
@@ -1157,30 +1769,31 @@ class GoogleSheetMT4Login(QMainWindow):
             mt5_processes = []
             
             # Danh sách tên tiến trình MT4/MT5 có thể có
-            mt4_process_names = ["terminal.exe", "metatrader4.exe", "mt4.exe"]
-            mt5_process_names = ["terminal64.exe", "metatrader5.exe", "mt5.exe"]
+            mt4_process_names = MT4_PROCESS_NAMES
+            mt5_process_names = MT5_PROCESS_NAMES
+            
+            # Duyệt desktop một lần cho cả lần quét
+            if window_snapshot is None:
+                window_snapshot = self.capture_windows()
             
             # In thông tin debug về quy trình
             print("Đang quét các quy trình MT4/MT5...")
-            for proc in psutil.process_iter(['pid', 'name']):
-                try:
-                    proc_info = proc.info
-                    proc_name = proc_info['name'].lower() if 'name' in proc_info else ""
-                    if proc_name:
-                        if any(mt4_name in proc_name for mt4_name in mt4_process_names):
-                            mt4_processes.append(proc_info['pid'])
-                            print(f"Found MT4 process: {proc_name} (PID: {proc_info['pid']})")
-                        elif any(mt5_name in proc_name for mt5_name in mt5_process_names):
-                            mt5_processes.append(proc_info['pid'])
-                            print(f"Found MT5 process: {proc_name} (PID: {proc_info['pid']})")
-                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                    pass
+            # Chỉ đọc tiến trình sở hữu cửa sổ, mỗi pid một lần (PID được cấp lại cho
+            # process khác sau khi chụp sẽ không còn tên MT4/MT5)
+            process_snapshot = window_snapshot.processes
+            for pid in dict.fromkeys(window.pid for window in window_snapshot):
+                if process_snapshot.name_matches(pid, mt4_process_names):
+                    mt4_processes.append(pid)
+                    print(f"Found MT4 process: {process_snapshot.name_of(pid)} (PID: {pid})")
+                elif process_snapshot.name_matches(pid, mt5_process_names):
+                    mt5_processes.append(pid)
+                    print(f"Found MT5 process: {process_snapshot.name_of(pid)} (PID: {pid})")
             
             print(f"Found MT4 processes: {len(mt4_processes)}, PIDs: {mt4_processes}")
             print(f"Found MT5 processes: {len(mt5_processes)}, PIDs: {mt5_processes}")
             
             # Sử dụng thông tin PID để lọc cửa sổ
-            mt_process_ids = mt4_processes + mt5_processes
+            mt_process_ids = set(mt4_processes + mt5_processes)
             
             # Thử phương pháp Win32GUI để tìm cửa sổ của các process MT4/MT5
             if mt_process_ids:
@@ -1188,50 +1801,48 @@ class GoogleSheetMT4Login(QMainWindow):
                     # Tìm cửa sổ thuộc các process MT4/MT5 đã phát hiện
                     windows_from_processes = []
                     
-                    def enum_process_windows(hwnd, results):
-                        if win32gui.IsWindowVisible(hwnd):
-                            try:
-                                # Lấy ID process của cửa sổ
-                                _, pid = win32process.GetWindowThreadProcessId(hwnd)
-                                
-                                # Kiểm tra xem cửa sổ có thuộc MT4/MT5 process không
-                                if pid in mt_process_ids:
-                                    window_title = win32gui.GetWindowText(hwnd)
-                                    
-                                    # Bỏ qua cửa sổ con không có tiêu đề hoặc tiêu đề quá ngắn
-                                    if not window_title or len(window_title) < 10:
-                                        return True
-                                    
-                                    # Kiểm tra xem có phải cửa sổ chính không
-                                    platform_type = "MT4" if pid in mt4_processes else "MT5"
-                                    
-                                    # Phân tích thông tin tài khoản từ tiêu đề cửa sổ
-                                    account_info = self.extract_account_info_from_title(window_title)
-                                    
-                                    # Chỉ thêm vào danh sách kết quả nếu có ít nhất một trong login_id hoặc server
-                                    if account_info.get("login_id") or account_info.get("server"):
-                                        results.append({
-                                            "title": window_title,
-                                            "process_id": pid,
-                                            "hwnd": hwnd,
-                                            "platform": platform_type,
-                                            "login_id": account_info.get("login_id", ""),
-                                            "broker": account_info.get("broker", ""),
-                                            "server": account_info.get("server", "")
-                                        })
-                                        print(f"Found MT window from process: {window_title}")
-                            except Exception as e:
-                                print(f"Error handling window in process: {str(e)}")
+                    for window in window_snapshot:
+                        try:
+                            # Kiểm tra xem cửa sổ có thuộc MT4/MT5 process không
+                            pid = window.pid
+                            if pid not in mt_process_ids:
+                                continue
+                            window_title = window.title
                             
-                        return True
-                    
-                    win32gui.EnumWindows(enum_process_windows, windows_from_processes)
+                            # Bỏ qua cửa sổ con không có tiêu đề hoặc tiêu đề quá ngắn
+                            if not window_title or len(window_title) < 10:
+                                continue
+                            
+                            # Kiểm tra xem có phải cửa sổ chính không
+                            platform_type = "MT4" if pid in mt4_processes else "MT5"
+                            
+                            # Phân tích thông tin tài khoản từ tiêu đề cửa sổ
+                            account_info = self.extract_account_info_from_title(window_title)
+                            
+                            # Chỉ thêm vào danh sách kết quả nếu có ít nhất một trong login_id hoặc server
+                            if account_info.get("login_id") or account_info.get("server"):
+                                windows_from_processes.append({
+                                    "title": window_title,
+                                    "process_id": pid,
+                                    "hwnd": window.hwnd,
+                                    "create_time": window_snapshot.create_time(pid),
+                                    "platform": platform_type,
+                                    "login_id": account_info.get("login_id", ""),
+                                    "broker": account_info.get("broker", ""),
+                                    "server": account_info.get("server", "")
+                                })
+                                print(f"Found MT window from process: {window_title}")
+                        except Exception as e:
+                            print(f"Error handling window in process: {str(e)}")
                     
                     if windows_from_processes:
                         print(f"Found {len(windows_from_processes)} windows from MT processes")
                         for win in windows_from_processes:
                             terminal_info = {
                                 "title": win["title"],
+                                "hwnd": win["hwnd"],
+                                "process_id": win["process_id"],
+                                "create_time": win["create_time"],
                                 "platform": win["platform"],
                                 "login_id": win["login_id"],
                                 "broker": win["broker"],
@@ -1245,58 +1856,36 @@ class GoogleSheetMT4Login(QMainWindow):
                 except Exception as e:
                     print(f"Error when finding windows from processes: {str(e)}")
             
-            # Nếu không tìm thấy quy trình MT4/MT5 hoặc không tìm thấy cửa sổ, thử lấy tất cả các cửa sổ
+            # Nếu không tìm thấy quy trình MT4/MT5 hoặc không tìm thấy cửa sổ, thử nhận diện theo tiêu đề mọi cửa sổ
             print("Đang quét tất cả các cửa sổ...")
             
             try:
-                # Mã trước đây sử dụng pywinauto Desktop
-                desktop = Desktop(backend="win32")
-                windows = desktop.windows()
-                print(f"Tìm thấy {len(windows)} cửa sổ bằng pywinauto")
-                
-                # Từ khóa chính xác hơn để nhận diện MT4/MT5
-                mt_keywords = [
-                    "metatrader 4", "metatrader 5", 
-                    "meta trader 4", "meta trader 5",
-                    "metatrader4", "metatrader5"
-                ]
-                
-                # Từ khóa loại trừ (cửa sổ không phải MT4/MT5)
-                exclude_keywords = [
-                    "notepad", "chrome", "edge", "firefox", "explorer", 
-                    "word", "excel", "powerpoint", "outlook", 
-                    "calculator", "paint", "desktop", "document",
-                    "visual studio", "vscode", "cmd", "powershell", 
-                    "settings", "task manager", "file explorer"
-                ]
+                print(f"Xét tiêu đề {len(window_snapshot)} cửa sổ trong ảnh chụp")
                 
                 # Lọc cửa sổ
-                for win in windows:
+                for window in window_snapshot:
                     try:
-                        title = win.window_text()
+                        title = window.title
                         
                         # Bỏ qua cửa sổ không có tiêu đề hoặc tiêu đề quá ngắn
                         if not title or len(title) < 15:
                             continue
                             
-                        # Kiểm tra nếu trong từ khóa loại trừ
+                        # Kiểm tra nếu trong từ khóa loại trừ (cửa sổ không phải MT4/MT5)
                         title_lower = title.lower()
-                        if any(keyword in title_lower for keyword in exclude_keywords):
+                        if SCAN_EXCLUDED_TITLE_PATTERN.search(title_lower):
                             continue
                             
-                        # Kiểm tra định dạng chuẩn của MT4/MT5
-                        is_mt4_format = bool(re.search(r'\d{5,10}\s*:\s*[\w\.-]+', title))
-                        is_mt5_format = bool(re.search(r'\d{5,10}\s*-\s*[\w\.-]+', title))
-                        
-                        # Kiểm tra từ khóa MT chính xác
-                        has_mt_keyword = any(keyword in title_lower for keyword in mt_keywords)
+                        # Định dạng chuẩn của MT4/MT5 và thông tin tài khoản: một lần phân tích tiêu đề
+                        parsed_title = self.parse_window_title(title)
+                        is_mt4_format = parsed_title.title_format == FORMAT_MT4
+                        is_mt5_format = parsed_title.title_format == FORMAT_MT5
                         
-                        # Nếu không có định dạng chuẩn hoặc từ khóa chính xác, bỏ qua
-                        if not (is_mt4_format or is_mt5_format or has_mt_keyword):
+                        # Nếu không có định dạng chuẩn hoặc từ khóa MT chính xác, bỏ qua
+                        if not (is_mt4_format or is_mt5_format or MT_KEYWORD_PATTERN.search(title_lower)):
                             continue
                             
-                        # Phân tích thông tin tài khoản từ tiêu đề
-                        account_info = self.extract_account_info_from_title(title)
+                        account_info = parsed_title.account_info()
                         
                         # Chỉ thêm vào danh sách kết quả nếu có ít nhất một trong login_id hoặc server
                         if account_info.get("login_id") or account_info.get("server"):
@@ -1317,16 +1906,18 @@ class GoogleSheetMT4Login(QMainWindow):
                                 "broker": account_info.get("broker", ""),
                                 "server": account_info.get("server", "")
                             }
+                            # hwnd/pid/create_time để đăng nhập đúng cửa sổ này về sau
+                            terminal_info.update(window_snapshot.handle_info(window))
                             running_terminals.append(terminal_info)
-                            print(f"Pywinauto: Cửa sổ MT: {title}")
+                            print(f"Theo tiêu đề: Cửa sổ MT: {title}")
                     except Exception as e:
                         print(f"Lỗi khi xử lý cửa sổ: {str(e)}")
                         
             except Exception as e:
-                print(f"Lỗi khi sử dụng pywinauto Desktop: {str(e)}")
-                # Nếu pywinauto thất bại, thử phương pháp thay thế
+                print(f"Lỗi khi nhận diện cửa sổ theo tiêu đề: {str(e)}")
+                # Nếu thất bại, thử phương pháp thay thế
                 try:
-                    backup_terminals = self.find_mt_windows_alternative()
+                    backup_terminals = self.find_mt_windows_alternative(window_snapshot)
                     return backup_terminals
                 except Exception as e2:
                     print(f"Lỗi khi sử dụng phương pháp thay thế: {str(e2)}")
@@ -1338,15 +1929,17 @@ class GoogleSheetMT4Login(QMainWindow):
         if not running_terminals:
             # Thử phương pháp thay thế nếu không tìm thấy cửa sổ nào
             try:
-                running_terminals = self.find_mt_windows_alternative()
+                running_terminals = self.find_mt_windows_alternative(window_snapshot)
             except Exception as e:
                 print(f"Lỗi khi sử dụng phương pháp thay thế: {str(e)}")
-                
+        
+        self.watch_terminal_journals(running_terminals)
         return running_terminals
 
     def scan_all_accounts(self):
         """Quét tất cả các tài khoản MT4/MT5 đang chạy và tìm xem chúng thuộc nhánh nào"""
-        if self.df is None:
+        table = self.account_table
+        if table is None:
             QMessageBox.warning(self, "Lỗi", "Vui lòng kết nối đến Google Sheet trước!")
             return
         
@@ -1362,13 +1955,10 @@ class GoogleSheetMT4Login(QMainWindow):
             except Exception as com_err:
                 print(f"Warning: COM initialization error: {str(com_err)}")
             
-            # Tìm tất cả cửa sổ MT4/MT5 đang chạy
+            # Tìm tất cả cửa sổ MT4/MT5 đang chạy (phương pháp thay thế đã được thử bên trong,
+            # trên cùng ảnh chụp cửa sổ, nên không cần duyệt desktop thêm lần nữa)
             running_terminals = self.find_running_terminals()
-            
-            # Nếu không tìm thấy cửa sổ nào, thử phương pháp thay thế
-            if not running_terminals:
-                print("Không tìm thấy cửa sổ với phương pháp thông thường, thử phương pháp thay thế...")
-                running_terminals = self.find_mt_windows_alternative()
+            print(f"Phân tích tiêu đề: {self.title_cache.stats()}")
             
             if not running_terminals:
                 self.data_display.setText("❌ Không tìm thấy cửa sổ MT4/MT5 nào đang chạy!")
@@ -1395,106 +1985,23 @@ class GoogleSheetMT4Login(QMainWindow):
                 # Xử lý lỗi hoặc return
                 return
             
-            # Lấy header row từ cấu hình
-            try:
-                header_row = int(self.header_row_input.text()) - 1
-                if header_row < 0:
-                    header_row = 0
-            except ValueError:
-                header_row = 0
-            
             print(f"Bắt đầu quét tất cả tài khoản...")
             
             # In ra header để kiểm tra
-            if len(self.all_data) > header_row:
-                headers = self.all_data[header_row]
-                print(f"Headers: {headers}")
+            if table.headers:
+                print(f"Headers: {table.headers}")
                 
                 # In ra 10 hàng đầu tiên và toàn bộ dữ liệu của chúng để kiểm tra
                 print("\n==== DỮ LIỆU MẪU TOÀN BỘ HÀNG ĐẦU TIÊN ====")
-                for i, row in enumerate(self.all_data[header_row+1:header_row+11]):
-                    print(f"Hàng {i+1}: {row}")
+                for i in range(min(10, len(table))):
+                    print(f"Hàng {i+1}: {table.row(i)}")
                 print("\n==== KẾT THÚC DỮ LIỆU MẪU ====\n")
             
-            # Tạo một từ điển ánh xạ login_id -> thông tin từ bảng dữ liệu
-            accounts_map = {}
-            
-            # Danh sách các từ khóa nhánh phổ biến để tìm kiếm
-            branch_keywords = ["nhánh", "branch", "chi nhánh"]
-            
-            # Danh sách các nhánh cụ thể để tìm kiếm
-            specific_branches = [
-                "nhánh a khang", "nhánh phát", "nhánh hoàng", "nhánh anh khang",
-                "nhánh phú", "nhánh đạt", "nhánh đức", "nhánh tuấn", "nhánh tân",
-                "nhánh hải", "nhánh hùng", "nhánh long", "nhánh quân", "nhánh minh",
-                "nhánh thái", "nhánh thành", "nhánh son", "nhánh khánh", "nhánh khoa"
-            ]
-            
-            # Mục đích của hàm này là lấy tất cả tài khoản từ bảng dữ liệu
-            # và ánh xạ Login ID -> thông tin nhánh, broker, v.v.
-            for i, row_data in enumerate(self.all_data[header_row + 1:]):
-                # Bỏ qua nếu không đủ cột
-                if len(row_data) <= max(login_col_index, broker_col_index, note1_index):
-                    continue
-                
-                # Lấy login ID từ cột đã cấu hình
-                login_id = str(row_data[login_col_index]).strip()
-                
-                # Bỏ qua nếu login ID trống
-                if not login_id:
-                    continue
-                
-                # Lấy thông tin nhánh từ cột E (Note1)
-                note_value = str(row_data[note1_index]).strip() if note1_index < len(row_data) else ""
-                print(f"Login ID: {login_id}, Note1: {note_value}")
-                
-                # Tìm tên nhánh từ note_value
-                branch_name = ""
-                
-                # Tìm nhánh cụ thể trong note_value
-                note_value_lower = note_value.lower()
-                
-                # Kiểm tra xem note_value có chứa một trong các nhánh cụ thể không
-                for specific_branch in specific_branches:
-                    if specific_branch in note_value_lower:
-                        branch_name = specific_branch
-                        print(f"  -> Tìm thấy nhánh cụ thể: {branch_name}")
-                        break
-                
-                # Nếu không tìm thấy trong danh sách cụ thể, thử tìm theo từ khóa
-                if not branch_name:
-                    for keyword in branch_keywords:
-                        if keyword in note_value_lower:
-                            parts = note_value_lower.split(keyword)
-                            if len(parts) > 1:
-                                # Lấy phần sau từ khóa và làm sạch
-                                branch_name = keyword + parts[1].strip()
-                                print(f"  -> Tìm thấy nhánh từ từ khóa '{keyword}': {branch_name}")
-                                break
-                
-                # Nếu vẫn không tìm thấy từ khóa nhánh, sử dụng toàn bộ giá trị note
-                if not branch_name and note_value:
-                    branch_name = note_value
-                    print(f"  -> Không tìm thấy từ khóa nhánh, sử dụng toàn bộ note: {branch_name}")
-                
-                # Lấy thông tin sàn
-                broker_name = str(row_data[broker_col_index]).strip() if broker_col_index < len(row_data) else ""
-                
-                # Lưu thông tin vào từ điển
-                accounts_map[login_id] = {
-                    "broker": broker_name,
-                    "branch_name": branch_name,
-                    "note": note_value,
-                    "row_data": row_data
-                }
+            # Tên nhánh theo cách quét (một lần cho mỗi ghi chú khác nhau); tài khoản
+            # được tra qua chỉ mục Login ID của bảng thay vì duyệt lại toàn bộ sheet
+            scan_branches = table.note.map(self.scan_branch_matcher.extract)
             
-            print(f"Tìm thấy {len(accounts_map)} tài khoản trong bảng dữ liệu")
-            # In ra một vài mẫu để kiểm tra
-            sample_count = min(5, len(accounts_map))
-            if sample_count > 0:
-                print(f"Mẫu {sample_count} tài khoản đầu tiên:")
-                for i, (login_id, info) in enumerate(list(accounts_map.items())[:sample_count]):
-                    print(f"  {i+1}. Login ID: {login_id}, Nhánh: {info['branch_name']}, Note: {info['note']}")
+            print(f"Tìm thấy {len(table.login_index)} tài khoản trong bảng dữ liệu")
             
             # Kiểm tra các tài khoản đang chạy và tìm xem chúng thuộc nhánh nào
             scan_results = []
@@ -1513,10 +2020,10 @@ class GoogleSheetMT4Login(QMainWindow):
                 account_note = ""
                 
                 # Kiểm tra xem tài khoản này có trong bảng dữ liệu không
-                if login_id in accounts_map:
-                    account_info = accounts_map[login_id]
-                    found_branch = account_info["branch_name"] if account_info["branch_name"] else "Không rõ nhánh"
-                    account_note = account_info["note"]
+                row_index = table.find_login(login_id, login_col_index, broker_col_index, note1_index)
+                if row_index is not None:
+                    found_branch = scan_branches[row_index] if scan_branches[row_index] else "Không rõ nhánh"
+                    account_note = table.note[row_index]
                     print(f"Tài khoản {login_id}: Tìm thấy thuộc nhánh '{found_branch}'")
                 else:
                     print(f"Tài khoản {login_id}: Không tìm thấy trong bảng dữ liệu")
@@ -1528,7 +2035,7 @@ class GoogleSheetMT4Login(QMainWindow):
                     "server": server,
                     "platform": platform,
                     "title": terminal.get("title", ""),
-                    "is_correct_branch": True if login_id in accounts_map else False,
+                    "is_correct_branch": row_index is not None,
                     "belongs_to_branch": found_branch,
                     "note": account_note
                 })
@@ -1601,27 +2108,17 @@ class GoogleSheetMT4Login(QMainWindow):
             # Cột Equity
             equity_value = ""
             login_id = result["login_id"]
-            equity_col_index = 15  # Cột P - EndEquity (index 15)
-            if self.all_data:
-                try:
-                    header_row = int(self.header_row_input.text()) - 1
-                    if header_row < 0:
-                        header_row = 0
-                except Exception:
-                    header_row = 0
-                login_col_index = self.get_column_index(self.login_col_input.text())
-                for row_data in self.all_data[header_row + 1:]:
-                    if len(row_data) > max(login_col_index, equity_col_index):
-                        if str(row_data[login_col_index]).strip() == login_id:
-                            equity_value = str(row_data[equity_col_index]).strip()
-                            break
+            table = self.account_table
+            row_index = None
+            if table is not None:
+                equity_col_index = table.config.equity  # Cột P - EndEquity (index 15)
+                row_index = table.find_login(login_id, table.config.login, equity_col_index)
+                if row_index is not None:
+                    equity_value = table.text(row_index, equity_col_index)
             equity_item = QTableWidgetItem(equity_value)
-            # Nếu equity = 0 thì tô màu đỏ nhạt
-            try:
-                if equity_value and float(equity_value.replace(",", "").replace(" ", "")) == 0:
-                    equity_item.setBackground(QColor(255, 200, 200))
-            except:
-                pass
+            # Nếu equity = 0 thì tô màu đỏ nhạt (equity đã được đọc thành số khi tải)
+            if row_index is not None and table.equity_valid[row_index] and table.equity[row_index] == 0:
+                equity_item.setBackground(QColor(255, 200, 200))
             self.scan_result_table.setItem(row, 5, equity_item)
         # Tóm tắt kết quả
         summary = f"""
@@ -1658,232 +2155,48 @@ class GoogleSheetMT4Login(QMainWindow):
                 f"Tìm thấy tất cả {found_count} tài khoản trong bảng dữ liệu!"
             )
 
+    def parse_window_title(self, title):
+        """Kết quả phân tích tiêu đề cửa sổ MT4/MT5 (ParsedTitle: login_id/broker/server và
+        định dạng tiêu đề), nhớ theo tiêu đề"""
+        return self.title_cache.get(title)
+    
     def extract_account_info_from_title(self, title):
-        """Trích xuất thông tin tài khoản từ tiêu đề cửa sổ MT4/MT5"""
-        account_info = {
-            "login_id": "",
-            "broker": "",
-            "server": ""
-        }
-        
-        try:
-            print(f"Đang phân tích tiêu đề: {title}")
-            
-            # Phân tích tiêu đề theo định dạng chuẩn của MT4/MT5
-            # MT4 thường có định dạng: "ID: Tên sàn" hoặc "Tên sàn - ID"
-            # MT5 thường có định dạng: "ID - Tên sàn"
-            
-            # Mẫu chính xác cho MetaTrader
-            mt_patterns = [
-                # MT4 standard: 12345678 : Demo-Server
-                r'(\d{5,10})\s*:\s*([\w\.-]+)',
-                # MT5 standard: 12345678 - Demo-Server
-                r'(\d{5,10})\s*-\s*([\w\.-]+)',
-                # MT pattern with @ symbol: 12345678@Demo-Server
-                r'(\d{5,10})@([\w\.-]+)',
-                # MT pattern with space: 12345678 Demo-Server
-                r'(\d{5,10})\s+([\w\.-]+\b(?:\s+[\w\.-]+){0,2})\b',
-                # Broker name followed by ID: BrokerName - 12345678
-                r'([\w\.-]+)\s*-\s*(\d{5,10})'
-            ]
-            
-            # Kiểm tra các mẫu chính xác của MT
-            matched = False
-            for pattern in mt_patterns:
-                matches = re.search(pattern, title)
-                if matches:
-                    # Kiểm tra xem nhóm nào chứa login ID (dãy số)
-                    if matches.group(1).isdigit() and 5 <= len(matches.group(1)) <= 10:
-                        account_info["login_id"] = matches.group(1)
-                        account_info["server"] = matches.group(2)
-                    elif matches.group(2).isdigit() and 5 <= len(matches.group(2)) <= 10:
-                        account_info["server"] = matches.group(1)
-                        account_info["login_id"] = matches.group(2)
-                    else:
-                        continue
-                        
-                    print(f"  -> Đã tìm thấy Login ID: {account_info['login_id']} và Server: {account_info['server']}")
-                    matched = True
-                    break
-            
-            # Nếu không tìm thấy theo mẫu chuẩn, thử các phương pháp khác
-            if not matched:
-                # 1. Trích xuất login ID
-                login_patterns = [
-                    r'login\s*[:#-]?\s*(\d{5,10})',  # Login: 12345678
-                    r'account\s*[:#-]?\s*(\d{5,10})',  # Account: 12345678
-                    r'id\s*[:#-]?\s*(\d{5,10})',  # ID: 12345678
-                    r'no[.:]?\s*(\d{5,10})',  # No: 12345678
-                    r'acc[.:]?\s*(\d{5,10})',  # Acc: 12345678
-                    r'a/c[.:]?\s*(\d{5,10})',  # A/C: 12345678
-                    r'(\d{5,10})@',  # Dãy số theo sau là @ (phổ biến trong MT4/5)
-                    r':\s*(\d{5,10})',  # : 12345678
-                    r'-\s*(\d{5,10})',  # - 12345678
-                ]
-                
-                for pattern in login_patterns:
-                    matches = re.search(pattern, title)
-                    if matches:
-                        account_info["login_id"] = matches.group(1)
-                        print(f"  -> Tìm thấy login ID: {account_info['login_id']} với pattern: {pattern}")
-                        break
-            
-                # Nếu vẫn không tìm thấy login ID, tìm bất kỳ dãy số nào có độ dài phù hợp
-                if not account_info["login_id"]:
-                    numbers = re.findall(r'\d+', title)
-                    for num in numbers:
-                        if 5 <= len(num) <= 10:
-                            account_info["login_id"] = num
-                            print(f"  -> Tìm thấy login ID (backup): {account_info['login_id']}")
-                            break
-            
-                # Xử lý thông tin server nếu chưa có
-                if not account_info["server"]:
-                    # Thử trích xuất server từ phần sau dấu : hoặc - nếu có login_id
-                    if account_info["login_id"]:
-                        server_patterns = [
-                            rf'{account_info["login_id"]}\s*:\s*([\w\.-]+)',  # ID: server
-                            rf'{account_info["login_id"]}\s*-\s*([\w\.-]+)',  # ID - server
-                            r'server\s*[:#-]?\s*([\w\.-]+)',  # Server: abc-server
-                            r'@([\w\.-]+)',  # ID@server
-                        ]
-                        
-                        for pattern in server_patterns:
-                            matches = re.search(pattern, title)
-                            if matches:
-                                server = matches.group(1)
-                                account_info["server"] = server
-                                print(f"  -> Tìm thấy server: {account_info['server']} với pattern: {pattern}")
-                                break
-                    
-                    # Nếu vẫn không tìm thấy server, thử tìm các từ khóa liên quan
-                    if not account_info["server"]:
-                        server_keywords = ["server", "live", "demo", "real", "practice"]
-                        
-                        for keyword in server_keywords:
-                            pattern = rf'{keyword}\s*[:#-]?\s*([\w\.-]+)'
-                            matches = re.search(pattern, title.lower()) 
-                            if matches:
-                                server = matches.group(1)
-                                account_info["server"] = server
-                                print(f"  -> Tìm thấy server từ từ khóa: {account_info['server']}")
-                                break
-            
-            # 3. Trích xuất tên broker (thường là phần đầu của tiêu đề hoặc được bao gồm trong server)
-            # Các sàn phổ biến
-            common_brokers = [
-                "exness", "fbs", "fxtm", "forex4you", "admiral", 
-                "skilling", "tickmill", "instaforex", "hotforex", "fxpro",
-                "xtb", "oanda", "fxcm", "ig", "pepperstone", "axiory", "icmarkets",
-                "tradingpro", "tradersway", "dukascopy"
-            ]
-            
-            # Nếu server đã có thông tin, thử xác định broker từ server
-            if account_info["server"]:
-                server_lower = account_info["server"].lower()
-                for broker in common_brokers:
-                    if broker in server_lower:
-                        account_info["broker"] = broker
-                        print(f"  -> Tìm thấy broker từ server: {account_info['broker']}")
-                        break
-            
-            # Nếu chưa xác định được broker, thử từ tiêu đề
-            if not account_info["broker"]:
-                title_lower = title.lower()
-                for broker in common_brokers:
-                    if f" {broker} " in f" {title_lower} " or f"-{broker}" in title_lower or f"{broker}-" in title_lower:
-                        account_info["broker"] = broker
-                        print(f"  -> Tìm thấy broker từ tiêu đề: {account_info['broker']}")
-                        break
-            
-            # Nếu không tìm thấy tên sàn cụ thể, thử lấy phần đầu của tiêu đề
-            if not account_info["broker"] and "metatrader" in title.lower():
-                parts = title.lower().split("metatrader")
-                if parts and parts[0].strip():
-                    account_info["broker"] = parts[0].strip()
-                    print(f"  -> Tìm thấy broker (từ tiêu đề): {account_info['broker']}")
-            
-            # Dùng server làm broker nếu chưa có thông tin broker
-            if not account_info["broker"] and account_info["server"]:
-                account_info["broker"] = account_info["server"]
-                print(f"  -> Dùng server làm broker: {account_info['broker']}")
-            
-            # Post-processing: Kiểm tra và loại bỏ các giá trị không hợp lệ
-            
-            # 1. Xác thực login ID
-            if account_info["login_id"]:
-                # Kiểm tra xem login_id có phải là một số hợp lệ không
-                if not account_info["login_id"].isdigit() or len(account_info["login_id"]) < 5:
-                    print(f"  -> Login ID không hợp lệ: {account_info['login_id']}")
-                    account_info["login_id"] = ""
-                # Trường hợp đặc biệt: Một số giá trị số phổ biến không phải ID (như năm, trạng thái, v.v.)
-                invalid_ids = ["2023", "2024", "2022", "2021", "2020", "2019", "2018", "1234", "123456"]
-                if account_info["login_id"] in invalid_ids:
-                    print(f"  -> Login ID có vẻ là sai (từ khóa phổ biến): {account_info['login_id']}")
-                    account_info["login_id"] = ""
-            
-            # 2. Xác thực server
-            if account_info["server"]:
-                # Kiểm tra xem server có hợp lệ không
-                invalid_server_keywords = ["version", "v.", "preview", "windows", "microsoft", "update"]
-                if any(keyword in account_info["server"].lower() for keyword in invalid_server_keywords):
-                    print(f"  -> Server không hợp lệ: {account_info['server']}")
-                    account_info["server"] = ""
-            
-            # 3. Xác thực broker
-            if account_info["broker"]:
-                # Kiểm tra xem broker có hợp lệ không
-                invalid_broker_keywords = ["version", "v.", "preview", "windows", "microsoft", "update"]
-                if any(keyword in account_info["broker"].lower() for keyword in invalid_broker_keywords):
-                    print(f"  -> Broker không hợp lệ: {account_info['broker']}")
-                    account_info["broker"] = ""
-            
-            # Loại bỏ các tài khoản không hợp lệ (không có đủ thông tin)
-            if not account_info["login_id"] and not account_info["server"]:
-                print(f"  => Cửa sổ này không thể xác định là tài khoản MT4/MT5 hợp lệ!")
-                account_info = {"login_id": "", "broker": "", "server": ""}
-            else:
-                print(f"  => Kết quả phân tích: ID={account_info['login_id']}, Server={account_info['server']}, Broker={account_info['broker']}")
-            
-            return account_info
-            
-        except Exception as e:
-            print(f"Lỗi khi trích xuất thông tin tài khoản: {str(e)}")
-            return account_info
+        """Trích xuất thông tin tài khoản từ tiêu đề cửa sổ MT4/MT5 (nhớ kết quả theo tiêu đề)"""
+        return self.parse_window_title(title).account_info()
+    
+    def parse_account_info_from_title(self, title):
+        """Phân tích tiêu đề cửa sổ MT4/MT5 (chỉ gọi khi tiêu đề chưa có trong bộ nhớ)"""
+        parsed_title = parse_title(title)
+        if parsed_title.login_id or parsed_title.server:
+            print(f"Phân tích tiêu đề: {title} => ID={parsed_title.login_id}, Server={parsed_title.server}, Broker={parsed_title.broker}")
+        return parsed_title
 
     def check_branches_in_sheet(self):
         """Kiểm tra tất cả các cột để tìm thông tin về nhánh trong bảng sheet"""
-        if self.all_data is None:
+        table = self.account_table
+        if table is None:
             QMessageBox.warning(self, "Lỗi", "Vui lòng kết nối đến Google Sheet trước!")
             return
             
         try:
-            # Lấy header row từ cấu hình
-            try:
-                header_row = int(self.header_row_input.text()) - 1
-                if header_row < 0:
-                    header_row = 0
-            except ValueError:
-                header_row = 0
-                
             # In ra header để kiểm tra
-            if len(self.all_data) > header_row:
-                headers = self.all_data[header_row]
+            if table.headers:
+                headers = table.headers
                 print(f"Headers: {headers}")
                 
                 # In ra 5 hàng đầu tiên và toàn bộ dữ liệu của chúng để kiểm tra
                 print("\n==== DỮ LIỆU MẪU TOÀN BỘ HÀNG ĐẦU TIÊN ====")
-                for i, row in enumerate(self.all_data[header_row+1:header_row+6]):
-                    print(f"Hàng {i+1}: {row}")
+                for i in range(min(5, len(table))):
+                    print(f"Hàng {i+1}: {table.row(i)}")
                 print("\n==== KẾT THÚC DỮ LIỆU MẪU ====\n")
                 
                 # Tìm kiếm từ khóa "nhánh" trong tất cả các cột của mỗi hàng
                 print("\n==== TÌM KIẾM THÔNG TIN NHÁNH TRONG TẤT CẢ CÁC CỘT ====")
-                branch_keywords = ["nhánh", "branch", "chi nhánh"]
+                branch_keywords = SCAN_BRANCH_KEYWORDS
                 branches_found = []
                 
-                for i, row in enumerate(self.all_data[header_row+1:header_row+100]):  # Chỉ kiểm tra 100 hàng đầu
-                    for j, cell in enumerate(row):
+                for i in range(min(99, len(table))):  # Chỉ kiểm tra 100 hàng đầu
+                    for j, cell in enumerate(table.row(i)):
                         if isinstance(cell, str) and any(keyword in cell.lower() for keyword in branch_keywords):
                             print(f"Hàng {i+1}, Cột {j+1} ('{headers[j] if j < len(headers) else 'N/A'}'): {cell}")
                             branches_found.append(cell)
@@ -1909,7 +2222,7 @@ class GoogleSheetMT4Login(QMainWindow):
 
     def check_branch_accounts(self):
         """Kiểm tra xem các tài khoản đang đăng nhập có thuộc đúng nhánh không và đề xuất đổi nếu sai"""
-        if self.all_data is None:
+        if self.account_table is None:
             QMessageBox.warning(self, "Lỗi", "Vui lòng kết nối đến Google Sheet trước!")
             return
             
@@ -1982,7 +2295,10 @@ class GoogleSheetMT4Login(QMainWindow):
                         "platform": terminal.get("platform", ""),
                         "current_branch": account_branch,
                         "correct_branch": branch,
-                        "title": terminal.get("title", "")
+                        "title": terminal.get("title", ""),
+                        "hwnd": terminal.get("hwnd"),
+                        "process_id": terminal.get("process_id"),
+                        "create_time": terminal.get("create_time")
                     })
             
             # Hiển thị kết quả kiểm tra
@@ -2009,119 +2325,48 @@ class GoogleSheetMT4Login(QMainWindow):
     
     def get_available_branches(self):
         """Lấy danh sách các nhánh có trong dữ liệu"""
-        if self.all_data is None:
+        table = self.account_table
+        if table is None:
             return []
-        try:
-            header_row = int(self.header_row_input.text()) - 1
-            if header_row < 0:
-                header_row = 0
-        except Exception:
-            header_row = 0
-        note1_index = self.get_column_index(self.branch_col_input.text())
-        branches = set()
-        for row_data in self.all_data[header_row + 1:]:
-            if len(row_data) > note1_index:
-                note_value = str(row_data[note1_index]).strip()
-                if note_value:
-                    branch_name = self.extract_branch_name(note_value)
-                    if branch_name:
-                        branches.add(branch_name)
-        return sorted(branches)
+        # Danh sách nhánh được dựng sẵn cùng chỉ mục nhánh khi tải dữ liệu
+        return list(table.branch_names)
     
     def get_branch_accounts(self, branch):
-        """Lấy danh sách các tài khoản thuộc nhánh đã chọn với End Equity > 100"""
-        if self.all_data is None:
+        """Lấy danh sách các tài khoản thuộc nhánh đã chọn với End Equity > ngưỡng tài khoản thay thế"""
+        table = self.account_table
+        if table is None:
             return []
             
         branch_accounts = []
         
         try:
             # Lấy các thông số cấu hình
-            try:
-                header_row = int(self.header_row_input.text()) - 1
-                if header_row < 0:
-                    header_row = 0
-            except ValueError:
-                header_row = 0
-                
-            login_col_index = self.get_column_index(self.login_col_input.text())
-            broker_col_index = self.get_column_index(self.broker_col_input.text())
-            server_col_index = self.get_column_index(self.server_col_input.text())
-            pass_col_index = self.get_column_index(self.pass_col_input.text())
-            note1_index = self.get_column_index(self.branch_col_input.text())
-            equity_col_index = 15  # Cột P - EndEquity (index 15)
+            config = table.config
+            login_col_index = config.login
+            broker_col_index = config.broker
+            server_col_index = config.server
+            pass_col_index = config.password
+            note1_index = config.branch
             
             if login_col_index < 0 or broker_col_index < 0 or server_col_index < 0 or pass_col_index < 0 or note1_index < 0:
                 print("Lỗi: Cấu hình cột không hợp lệ")
                 return []
             
-            # Tìm các tài khoản thuộc nhánh đã chọn
-            for i, row_data in enumerate(self.all_data[header_row + 1:]):
-                if len(row_data) <= max(login_col_index, broker_col_index, server_col_index, pass_col_index, note1_index, equity_col_index):
-                    continue
-                
-                login_id = str(row_data[login_col_index]).strip()
-                if not login_id:
-                    continue
-                
-                # Lấy thông tin nhánh từ cột E (Note1)
-                note_value = str(row_data[note1_index]).strip() if note1_index < len(row_data) else ""
-                if not note_value:
-                    continue
-                
-                # Kiểm tra xem tài khoản có thuộc nhánh đã chọn không
-                account_branch = self.extract_branch_name(note_value)
-                if account_branch.lower() != branch.lower():
-                    continue
-                
-                # Lấy End Equity nếu có
-                equity_value = 0
-                try:
-                    equity_str = str(row_data[equity_col_index]).strip()
-                    if equity_str:
-                        # Xử lý định dạng số kiểu Việt Nam/Châu Âu: 3.482,67 hoặc 3,482.67 hoặc 3.482.67
-                        # Kiểm tra xem có phải dạng 3.482.67 không (dấu chấm phân cách hàng nghìn)
-                        if equity_str.count('.') > 1:
-                            # Loại bỏ tất cả dấu chấm trừ dấu chấm cuối cùng
-                            last_dot = equity_str.rfind('.')
-                            equity_str = equity_str.replace('.', '')
-                            equity_str = equity_str[:last_dot] + '.' + equity_str[last_dot:]
-                        else:
-                            # Xử lý định dạng thông thường
-                            equity_str = equity_str.replace(',', '.')
-                        
-                        # Chuyển thành số
-                        equity_value = float(equity_str)
-                except Exception as e:
-                    print(f"Lỗi khi chuyển đổi End Equity cho tài khoản {login_id}: {str(e)}")
-                    # Log để debug
-                    print(f"Giá trị gốc: '{str(row_data[equity_col_index])}'")
-                
-                # Chỉ lấy các tài khoản có End Equity > 100
-                if equity_value <= 100:
-                    continue
-                
-                # Lấy các thông tin cần thiết
-                broker_name = str(row_data[broker_col_index]).strip() if broker_col_index < len(row_data) else ""
-                server_name = str(row_data[server_col_index]).strip() if server_col_index < len(row_data) else ""
-                password = str(row_data[pass_col_index]).strip() if pass_col_index < len(row_data) else ""
-                
-                if not broker_name or not password:
-                    continue
-                
-                # Thêm vào danh sách
+            # Chỉ mục nhánh đã sắp xếp sẵn theo End Equity giảm dần, chỉ lấy các tài khoản trên ngưỡng
+            for i in table.branch_rows(branch, self.replacement_min_equity):
                 branch_accounts.append({
-                    "login_id": login_id,
-                    "broker": broker_name,
-                    "server": server_name,
-                    "password": password,
-                    "branch": account_branch,
-                    "equity": equity_value
+                    "login_id": table.login_ids[i],
+                    "broker": table.broker[i],
+                    "server": table.server[i],
+                    "password": table.text(i, pass_col_index),
+                    "branch": table.branch[i],
+                    "equity": table.equity[i],
+                    "source": self.get_row_source(i),
+                    "row_index": i,
+                    "server_base": table.server_base[i],
+                    "broker_key": table.broker_key[i]
                 })
             
-            # Sắp xếp theo End Equity giảm dần
-            branch_accounts.sort(key=lambda x: x.get("equity", 0), reverse=True)
-            
         except Exception as e:
             print(f"Lỗi khi lấy danh sách tài khoản theo nhánh: {str(e)}")
         
@@ -2129,47 +2374,29 @@ class GoogleSheetMT4Login(QMainWindow):
     
     def find_account_info(self, login_id):
         """Tìm thông tin tài khoản trong bảng dữ liệu"""
-        if self.all_data is None:
+        table = self.account_table
+        if table is None:
             return None
             
         try:
             # Lấy các thông số cấu hình
-            try:
-                header_row = int(self.header_row_input.text()) - 1
-                if header_row < 0:
-                    header_row = 0
-            except ValueError:
-                header_row = 0
-                
-            login_col_index = self.get_column_index(self.login_col_input.text())
-            broker_col_index = self.get_column_index(self.broker_col_input.text())
-            note1_index = self.get_column_index(self.branch_col_input.text())
+            login_col_index = table.config.login
+            broker_col_index = table.config.broker
+            note1_index = table.config.branch
             
             if login_col_index < 0 or broker_col_index < 0 or note1_index < 0:
                 return None
             
-            # Tìm tài khoản trong bảng dữ liệu
-            for i, row_data in enumerate(self.all_data[header_row + 1:]):
-                if len(row_data) <= max(login_col_index, broker_col_index, note1_index):
-                    continue
-                
-                current_login_id = str(row_data[login_col_index]).strip()
-                if current_login_id != login_id:
-                    continue
-                
-                # Lấy thông tin nhánh từ cột E (Note1)
-                note_value = str(row_data[note1_index]).strip() if note1_index < len(row_data) else ""
-                branch_name = self.extract_branch_name(note_value)
-                
-                # Lấy thông tin sàn
-                broker_name = str(row_data[broker_col_index]).strip() if broker_col_index < len(row_data) else ""
-                
+            # Tra tài khoản qua chỉ mục Login ID
+            i = table.find_login(login_id, login_col_index, broker_col_index, note1_index)
+            if i is not None:
                 return {
                     "login_id": login_id,
-                    "broker": broker_name,
-                    "branch_name": branch_name,
-                    "note": note_value,
-                    "row_data": row_data
+                    "broker": table.broker[i],
+                    "branch_name": table.branch[i],
+                    "note": table.note[i],
+                    "row_index": i,
+                    "source": self.get_row_source(i)
                 }
             
         except Exception as e:
@@ -2178,38 +2405,33 @@ class GoogleSheetMT4Login(QMainWindow):
         return None
     
     def extract_branch_name(self, note_value):
-        """Trích xuất tên nhánh từ giá trị Note1"""
-        if not note_value:
-            return ""
-            
-        branch_name = ""
-        note_value_lower = note_value.lower()
-        
-        # Danh sách các nhánh cụ thể để tìm kiếm
-        specific_branches = [
-            "nhánh a khang", "nhánh phát", "nhánh hoàng", "nhánh anh khang",
-            "nhánh phú", "nhánh đạt", "nhánh đức", "nhánh tuấn", "nhánh tân",
-            "nhánh hải", "nhánh hùng", "nhánh long", "nhánh quân", "nhánh minh",
-            "nhánh thái", "nhánh thành", "nhánh son", "nhánh khánh", "nhánh khoa"
-        ]
-        
-        # Kiểm tra xem note_value có chứa một trong các nhánh cụ thể không
-        for specific_branch in specific_branches:
-            if specific_branch in note_value_lower:
-                branch_name = specific_branch
-                break
-        
-        # Nếu không tìm thấy trong danh sách cụ thể, thử tìm theo từ khóa "nhánh"
-        if not branch_name and "nhánh" in note_value_lower:
-            parts = note_value_lower.split("nhánh")
-            if len(parts) > 1:
-                branch_name = "nhánh" + parts[1].strip()
-        
-        # Nếu vẫn không tìm thấy từ khóa nhánh, sử dụng toàn bộ giá trị note
-        if not branch_name:
-            branch_name = note_value
-        
-        return branch_name
+        """Trích xuất tên nhánh từ giá trị Note1 (kết quả được nhớ theo từng ghi chú)"""
+        return self.branch_matcher.extract(note_value)
+    
+    def set_branch_names(self, branch_names):
+        """Cập nhật danh sách nhánh và trích xuất lại tên nhánh cho dữ liệu đang có"""
+        names = parse_branch_names(branch_names)
+        if names == self.branch_names:
+            return
+        self.branch_names = names
+        self.branch_matcher = BranchMatcher(names)
+        self.scan_branch_matcher = BranchMatcher(names, SCAN_BRANCH_KEYWORDS)
+        if self.account_table is not None:
+            self.account_table.set_branches(self.account_table.note.map(self.extract_branch_name))
+    
+    def set_equity_thresholds(self, low=None, warn=None, replacement=None):
+        """Cập nhật các ngưỡng End Equity (giá trị trống/không hợp lệ dùng mặc định)
+
+        Ngưỡng cảnh báo nhỏ hơn ngưỡng hết tiền được nâng lên bằng ngưỡng hết tiền (tắt mức cảnh báo).
+        """
+        def threshold(value, default):
+            try:
+                return float(str(value).replace(",", "."))
+            except (TypeError, ValueError):
+                return default
+        self.low_equity_threshold = threshold(low, LOW_EQUITY_THRESHOLD)
+        self.warn_equity_threshold = max(self.low_equity_threshold, threshold(warn, self.low_equity_threshold))
+        self.replacement_min_equity = threshold(replacement, MIN_BRANCH_EQUITY)
     
     def process_mismatched_accounts(self, mismatched_accounts, target_branch, branch_accounts):
         """Xử lý các tài khoản không đúng nhánh"""
@@ -2219,7 +2441,7 @@ class GoogleSheetMT4Login(QMainWindow):
         # In thông tin debug để kiểm tra
         print(f"\n=== THÔNG TIN DEBUG KIỂM TRA NHÁNH ===")
         print(f"Số tài khoản không đúng nhánh: {len(mismatched_accounts)}")
-        print(f"Số tài khoản đúng nhánh với End Equity > 100: {len(branch_accounts)}")
+        print(f"Số tài khoản đúng nhánh với End Equity > {self.replacement_min_equity:g}: {len(branch_accounts)}")
         print("\nCác tài khoản đúng nhánh có thể thay thế:")
         for i, acc in enumerate(branch_accounts[:5]):  # Hiển thị tối đa 5 tài khoản
             print(f"  {i+1}. Login: {acc['login_id']}, Broker: {acc['broker']}, Server: {acc['server']}, Equity: {acc['equity']}")
@@ -2231,7 +2453,8 @@ class GoogleSheetMT4Login(QMainWindow):
         print("=====================================\n")
         
         # Hiển thị dialog chọn tài khoản để thay thế
-        verification_dialog = BranchVerificationDialog(mismatched_accounts, target_branch, branch_accounts, self)
+        verification_dialog = BranchVerificationDialog(mismatched_accounts, target_branch, branch_accounts, self,
+                                                       min_equity=self.replacement_min_equity)
         
         if verification_dialog.exec_() != QDialog.Accepted:
             return  # Người dùng đã hủy
@@ -2263,9 +2486,7 @@ class GoogleSheetMT4Login(QMainWindow):
             print(f"Không thể tải cấu hình tốc độ: {str(config_err)}")
             
         # Thực hiện đăng nhập cho các tài khoản đã chọn
-        login_count = 0
         login_results = []
-        
         for result in selected_accounts:
             if result["action"] == "login" and result["new_account"]:
                 login_id = result["new_account"]["login_id"]
@@ -2300,20 +2521,12 @@ class GoogleSheetMT4Login(QMainWindow):
                     except Exception as com_err:
                         print(f"Warning: COM re-initialization error: {str(com_err)}")
                     
-                    # Lấy danh sách cửa sổ
-                    desktop = Desktop(backend="win32")
-                    windows = desktop.windows()
-                    
-                    # Tìm cửa sổ tương ứng
-                    target_window = None
-                    for win in windows:
-                        try:
-                            if win.window_text() == target_title:
-                                target_window = win
-                                print(f"Tìm thấy cửa sổ: {target_title}")
-                                break
-                        except:
-                            continue
+                    # Lấy cửa sổ theo hwnd đã quét (kiểm tra hwnd vẫn thuộc đúng tiến trình)
+                    target_window = self.get_terminal_window(result["old_account"])
+                    if target_window:
+                        print(f"Tìm thấy cửa sổ: {target_title}")
+                        journal_key = self.watch_terminal_journal(result["old_account"].get("process_id"))
+                        journal_mark = self.terminal_journals.mark()
                     
                     if target_window:
                         # Focus vào cửa sổ
@@ -2327,14 +2540,12 @@ class GoogleSheetMT4Login(QMainWindow):
                                 print("Thử phương pháp set_foreground thay thế")
                             except Exception as e:
                                 print(f"Cũng không thể set_foreground: {str(e)}")
+                                # Đưa thẳng hwnd đã quét lên foreground, không tìm theo tiêu đề
                                 try:
-                                    # Thử phương pháp cuối cùng với pyautogui
-                                    windows_with_title = pyautogui.getWindowsWithTitle(target_title)
-                                    if windows_with_title:
-                                        windows_with_title[0].activate()
-                                        print("Đã kích hoạt cửa sổ bằng pyautogui")
+                                    focus_window(result["old_account"]["hwnd"])
+                                    print("Đã kích hoạt cửa sổ bằng win32gui")
                                 except Exception as e2:
-                                    print(f"Không thể kích hoạt cửa sổ: {str(e2)}")
+                                    raise Exception(f"Không thể kích hoạt cửa sổ, bỏ qua đăng nhập: {str(e2)}")
                         
                         time.sleep(speed_settings["focus_delay"])
                         
@@ -2402,12 +2613,13 @@ class GoogleSheetMT4Login(QMainWindow):
                         # Nhấn Enter để submit
                         print("Nhấn Enter để đăng nhập...")
                         pyautogui.press('enter')
-                        time.sleep(speed_settings["form_open_delay"]) # Đợi sau khi nhấn submit
                         
-                        login_result["status"] = "success"
-                        login_result["message"] = f"✅ Đăng nhập thành công tài khoản: {login_id}"
-                        login_count += 1
-                        print(login_result["message"])
+                        # Kết quả theo nhật ký terminal được xác nhận một lần sau khi đã
+                        # đăng nhập mọi tài khoản (confirm_login_results)
+                        login_result["status"] = "sent"
+                        login_result["journal"] = (journal_key, login_id, journal_mark)
+                        if journal_key is None:
+                            time.sleep(speed_settings["form_open_delay"]) # Đợi sau khi nhấn submit
                     else:
                         login_result["status"] = "failed"
                         login_result["message"] = f"❌ Không tìm thấy cửa sổ cho tài khoản {old_login_id}"
@@ -2417,6 +2629,9 @@ class GoogleSheetMT4Login(QMainWindow):
                     login_result["message"] = f"❌ Lỗi khi đăng nhập tài khoản {login_id}: {str(login_err)}"
                     print(login_result["message"])
                         
+        # Chờ nhật ký terminal một lần cho cả loạt thay vì sau từng cửa sổ
+        login_count = self.confirm_login_results(login_results, speed_settings.get("journal_timeout", JOURNAL_TIMEOUT))
+        
         # Hiển thị kết quả
         if login_count > 0:
             summary = f"Đã đăng nhập thành công {login_count}/{len(selected_accounts)} tài khoản.\n\n"
@@ -2427,8 +2642,10 @@ class GoogleSheetMT4Login(QMainWindow):
             self.data_display.setText("Không thể đăng nhập tài khoản nào. Vui lòng kiểm tra lại thông tin.")
 
     def check_low_equity_accounts(self):
-        """Kiểm tra các tài khoản đang mở trên máy có EndEquity < 100 và gợi ý tài khoản khác cùng sàn, hiển thị lên dialog riêng"""
-        if self.df is None:
+        """Kiểm tra các tài khoản đang mở trên máy có EndEquity dưới ngưỡng (hết tiền hoặc sắp hết tiền)
+        và gợi ý tài khoản khác cùng sàn, hiển thị lên dialog riêng"""
+        table = self.account_table
+        if table is None:
             QMessageBox.warning(self, "Lỗi", "Vui lòng kết nối đến Google Sheet trước!")
             return
         QApplication.processEvents()
@@ -2437,68 +2654,50 @@ class GoogleSheetMT4Login(QMainWindow):
                 pythoncom.CoInitialize()
             except Exception as com_err:
                 print(f"Warning: COM initialization error: {str(com_err)}")
+            # Phương pháp thay thế đã được thử bên trong trên cùng ảnh chụp cửa sổ
             running_terminals = self.find_running_terminals()
-            if not running_terminals:
-                running_terminals = self.find_mt_windows_alternative()
-            login_col_index = self.get_column_index(self.login_col_input.text())
-            broker_col_index = self.get_column_index(self.broker_col_input.text())
-            server_col_index = self.get_column_index(self.server_col_input.text())
-            name_col_index = 2  # Cột tên tài khoản (thường là C)
-            equity_col_index = 15  # Cột P - EndEquity (index 15)
-            header_row = 0
-            try:
-                header_row = int(self.header_row_input.text()) - 1
-                if header_row < 0:
-                    header_row = 0
-            except ValueError:
-                header_row = 0
+            login_col_index = table.config.login
+            broker_col_index = table.config.broker
+            server_col_index = table.config.server
+            name_col_index = table.config.name  # Cột tên tài khoản (thường là C)
+            equity_col_index = table.config.equity  # Cột P - EndEquity (index 15)
+            low_threshold = self.low_equity_threshold
+            warn_threshold = self.warn_equity_threshold
+            # Số tài khoản dưới ngưỡng trong cả sheet (đếm bằng bisect trên chỉ mục equity)
+            print(f"Trong sheet có {table.equity_index.count(high=low_threshold)} tài khoản có EndEquity < {low_threshold:g}"
+                  f" và {table.equity_index.count(low_threshold, warn_threshold)} tài khoản sắp hết tiền (< {warn_threshold:g})")
             low_equity_accounts = []
-            # Tạo set chứa tất cả login_id trong sheet để kiểm tra tồn tại
-            all_login_ids_in_sheet = set()
-            for row_data in self.all_data[header_row + 1:]:
-                if len(row_data) > login_col_index:
-                    all_login_ids_in_sheet.add(str(row_data[login_col_index]).strip())
             # Quét từng terminal đang mở
             for terminal in running_terminals:
                 login_id = terminal.get("login_id", "").strip()
                 if not login_id:
                     continue
-                found_in_sheet = False
-                for row_data in self.all_data[header_row + 1:]:
-                    if len(row_data) <= max(login_col_index, broker_col_index, server_col_index, name_col_index, equity_col_index):
-                        continue
-                    sheet_login_id = str(row_data[login_col_index]).strip()
-                    if sheet_login_id == login_id:
-                        found_in_sheet = True
-                        try:
-                            equity_str = str(row_data[equity_col_index]).strip()
-                            equity_value = 0
-                            if equity_str:
-                                if equity_str.count('.') > 1:
-                                    last_dot = equity_str.rfind('.')
-                                    equity_str = equity_str.replace('.', '')
-                                    equity_str = equity_str[:last_dot] + '.' + equity_str[last_dot:]
-                                else:
-                                    equity_str = equity_str.replace(',', '.')
-                                equity_value = float(equity_str)
-                        except Exception as e:
-                            equity_value = 0
-                        if equity_value < 100:
-                            broker = str(row_data[broker_col_index]).strip()
-                            server = str(row_data[server_col_index]).strip()
-                            name = str(row_data[name_col_index]).strip() if name_col_index < len(row_data) else ""
-                            low_equity_accounts.append({
-                                "login_id": login_id,
-                                "broker": broker,
-                                "server": server,
-                                "name": name,
-                                "equity": equity_value,
-                                "window_title": terminal.get("title", ""),
-                                "platform": terminal.get("platform", ""),
-                                "reason": "Hết tiền"
-                            })
-                        break
-                if not found_in_sheet:
+                i = table.find_login(login_id, login_col_index, broker_col_index, server_col_index,
+                                     name_col_index, equity_col_index)
+                if i is not None:
+                    # End Equity đã được chuyển sang số khi tải dữ liệu
+                    equity_value = table.equity[i]
+                    if equity_value < warn_threshold:
+                        if not table.equity_valid[i]:
+                            reason = "EndEquity trống/không hợp lệ"
+                        elif equity_value < low_threshold:
+                            reason = "Hết tiền"
+                        else:
+                            reason = "Sắp hết tiền"
+                        low_equity_accounts.append({
+                            "login_id": login_id,
+                            "broker": table.broker[i],
+                            "server": table.server[i],
+                            "name": table.text(i, name_col_index),
+                            "equity": equity_value,
+                            "window_title": terminal.get("title", ""),
+                            "hwnd": terminal.get("hwnd"),
+                            "process_id": terminal.get("process_id"),
+                            "create_time": terminal.get("create_time"),
+                            "platform": terminal.get("platform", ""),
+                            "reason": reason
+                        })
+                else:
                     # Tài khoản không tồn tại trong sheet
                     low_equity_accounts.append({
                         "login_id": login_id,
@@ -2507,11 +2706,14 @@ class GoogleSheetMT4Login(QMainWindow):
                         "name": "",
                         "equity": 0,
                         "window_title": terminal.get("title", ""),
+                        "hwnd": terminal.get("hwnd"),
+                        "process_id": terminal.get("process_id"),
+                        "create_time": terminal.get("create_time"),
                         "platform": terminal.get("platform", ""),
                         "reason": "Không tồn tại trong sheet"
                     })
             if not low_equity_accounts:
-                QMessageBox.information(self, "Kết quả", "Không có tài khoản nào hết tiền (EndEquity < 100) hoặc không tồn tại trong sheet trên các sàn đang mở!")
+                QMessageBox.information(self, "Kết quả", f"Không có tài khoản nào hết tiền (EndEquity < {warn_threshold:g}) hoặc không tồn tại trong sheet trên các sàn đang mở!")
                 return
             self.low_equity_accounts_data = low_equity_accounts
             dlg = LowEquityDialog(self)
@@ -2530,26 +2732,26 @@ class GoogleSheetMT4Login(QMainWindow):
                 pass
 
     def login_suggestion_to_window(self, acc, suggestion):
-        """Đăng nhập tài khoản suggestion vào cửa sổ acc (acc là tài khoản hết tiền) với tốc độ nhanh như các chức năng đăng nhập khác"""
+        """Đăng nhập tài khoản suggestion vào cửa sổ acc (acc là tài khoản hết tiền) với tốc độ nhanh như các chức năng đăng nhập khác
+
+        Trả về {"status", "message"}: status "sent" khi đã gửi phím đăng nhập (người gọi xác nhận
+        cả loạt bằng confirm_login_results), "failed" nếu không đăng nhập được vào cửa sổ.
+        """
+        login_id = str(suggestion['login_id']).strip()
+        login_result = {"status": "failed", "message": ""}
         try:
             pythoncom.CoInitialize()
         except:
             pass
         try:
-            # Tìm cửa sổ theo tiêu đề và nền tảng
-            desktop = Desktop(backend="win32")
-            windows = desktop.windows()
-            target_window = None
-            for win in windows:
-                try:
-                    if win.window_text() == acc["window_title"]:
-                        target_window = win
-                        break
-                except:
-                    continue
+            # Lấy cửa sổ theo hwnd đã quét
+            target_window = self.get_terminal_window(acc)
             if not target_window:
-                print(f"Không tìm thấy cửa sổ cho: {acc['window_title']}")
-                return
+                login_result["message"] = f"❌ Không tìm thấy cửa sổ cho: {acc['window_title']}"
+                print(login_result["message"])
+                return login_result
+            journal_key = self.watch_terminal_journal(acc.get("process_id"))
+            journal_mark = self.terminal_journals.mark()
             # Focus vào cửa sổ
             try:
                 target_window.set_focus()
@@ -2557,7 +2759,12 @@ class GoogleSheetMT4Login(QMainWindow):
                 try:
                     target_window.set_foreground()
                 except:
-                    pass
+                    try:
+                        focus_window(acc["hwnd"])
+                    except Exception as focus_err:
+                        login_result["message"] = f"❌ Không thể kích hoạt cửa sổ, bỏ qua đăng nhập: {str(focus_err)}"
+                        print(login_result["message"])
+                        return login_result
             # Tăng tốc độ đăng nhập (giảm delay)
             focus_delay = 0.1
             key_delay = 0.02
@@ -2605,93 +2812,94 @@ class GoogleSheetMT4Login(QMainWindow):
                 time.sleep(key_delay)
             # Nhấn Enter để đăng nhập
             pyautogui.press('enter')
-            time.sleep(form_open_delay)
+            if journal_key is None:
+                time.sleep(form_open_delay)
+            login_result["status"] = "sent"
+            login_result["journal"] = (journal_key, login_id, journal_mark)
         except Exception as e:
-            print(f"Lỗi khi đăng nhập tài khoản gợi ý: {str(e)}")
+            login_result["message"] = f"❌ Lỗi khi đăng nhập tài khoản gợi ý {login_id}: {str(e)}"
+            print(login_result["message"])
         finally:
             try:
                 pythoncom.CoUninitialize()
             except:
                 pass
+        return login_result
 
     def goto_home_tab(self):
         """Chuyển về tab Quản lý tài khoản"""
         self.tab_widget.setCurrentWidget(self.main_tab)
 
     def search_accounts(self):
-        """Tìm kiếm tài khoản theo Tên Sàn (cột cấu hình broker_col) hoặc Login ID (cột cấu hình login_col) và hiển thị kết quả trong bảng"""
-        if self.df is None:
+        """Tìm kiếm tài khoản theo Tên Sàn (cột cấu hình broker_col) hoặc Login ID (cột cấu hình login_col)
+
+        Dùng chỉ mục tìm kiếm của AccountTable và chỉ ẩn/hiện các hàng có trạng thái
+        thay đổi so với lần tìm trước, không dựng lại bảng.
+        """
+        self.search_timer.stop()
+        table = self.account_table
+        if table is None:
             return
         keyword = self.search_input.text().strip().lower()
         if not keyword:
-            self.apply_filters()
+            self.show_search_rows(None)
             return
-        # Xác định tên cột thực tế trong DataFrame dựa trên cấu hình
-        broker_col_letter = self.broker_col_input.text().strip().upper()
-        login_col_letter = self.login_col_input.text().strip().upper()
-        # Lấy header từ Google Sheet (sau khi đã xử lý trùng lặp)
-        headers = list(self.df.columns)
-        # Tìm tên cột tương ứng với broker_col và login_col
-        broker_col_name = None
-        login_col_name = None
-        # Lấy header row từ cấu hình
-        try:
-            header_row = int(self.header_row_input.text())
-            if header_row < 1:
-                header_row = 1
-        except ValueError:
-            header_row = 1
-        # Lấy lại header gốc từ all_data nếu có
-        if self.all_data and len(self.all_data) >= header_row:
-            sheet_headers = self.all_data[header_row - 1]
-            start_col = 2
-            end_col = 14
-            end_col = min(end_col, len(sheet_headers) - 1)
-            selected_headers = sheet_headers[start_col:end_col + 1]
-            unique_headers = []
-            header_count = {}
-            for header in selected_headers:
-                if not header:
-                    header = "Column"
-                if header in header_count:
-                    header_count[header] += 1
-                    unique_headers.append(f"{header}_{header_count[header]}")
-                else:
-                    header_count[header] = 0
-                    unique_headers.append(header)
-            # Ánh xạ vị trí cột cấu hình sang tên header thực tế
-            col_map = {chr(65 + i): i for i in range(len(sheet_headers))}
-            broker_idx = col_map.get(broker_col_letter, None)
-            login_idx = col_map.get(login_col_letter, None)
-            if broker_idx is not None and broker_idx >= start_col and broker_idx <= end_col:
-                broker_col_name = unique_headers[broker_idx - start_col]
-            if login_idx is not None and login_idx >= start_col and login_idx <= end_col:
-                login_col_name = unique_headers[login_idx - start_col]
-        # Nếu không tìm được thì fallback về tìm theo tên gần đúng
+        # Chỉ tìm trên các cột cấu hình nằm trong vùng hiển thị
         search_cols = []
-        if broker_col_name and broker_col_name in headers:
-            search_cols.append(broker_col_name)
-        if login_col_name and login_col_name in headers:
-            search_cols.append(login_col_name)
+        for col in (table.config.broker, table.config.login):
+            if col >= 0 and table.display_column_index(col) is not None:
+                search_cols.append(col)
         if not search_cols:
             self.data_display.setText("❌ Không tìm thấy cột Tên Sàn hoặc Login ID trong dữ liệu! Kiểm tra lại cấu hình cột và tiêu đề sheet.")
-            self.display_filtered_data(self.df.iloc[0:0])
+            self.show_search_rows(set())
             return
-        self.data_display.setText(f"Đang tìm kiếm trên các cột: {', '.join(search_cols)}")
-        def row_match(row):
-            for col in search_cols:
-                if keyword in str(row.get(col, "")).lower():
-                    return True
-            return False
-        filtered_df = self.df[self.df.apply(row_match, axis=1)]
-        if filtered_df.empty:
+        col_names = [table.display_headers[table.display_column_index(col)] for col in search_cols]
+        self.data_display.setText(f"Đang tìm kiếm trên các cột: {', '.join(col_names)}")
+        matched_rows = table.search_index(search_cols).lookup(keyword)
+        if not matched_rows:
             self.data_display.append("❌ Không tìm thấy tài khoản nào phù hợp với từ khóa bạn nhập!")
-        self.display_filtered_data(filtered_df)
+        self.show_search_rows(matched_rows)
+
+    def show_search_rows(self, matches):
+        """Chỉ hiện các hàng bảng trong matches (None = hiện tất cả), chỉ đổi các hàng thay đổi trạng thái"""
+        table = self.account_table
+        # Vị trí trả về từ chỉ mục tìm kiếm là vị trí trong display_rows
+        if self.data_table.rowCount() != len(table.display_rows):
+            self.apply_filters()
+        previous = self.search_matches
+        if previous is None and matches is None:
+            return
+        row_count = self.data_table.rowCount()
+        if matches is None:
+            to_show = range(row_count) if previous is None else set(range(row_count)) - previous
+            to_hide = ()
+        elif previous is None:
+            to_show = ()
+            to_hide = set(range(row_count)) - matches
+        else:
+            to_show = matches - previous
+            to_hide = previous - matches
+        self.data_table.setUpdatesEnabled(False)
+        try:
+            for row in to_hide:
+                self.data_table.setRowHidden(row, True)
+            for row in to_show:
+                self.data_table.setRowHidden(row, False)
+        finally:
+            self.data_table.setUpdatesEnabled(True)
+        self.search_matches = matches
+
+    def reset_search_rows(self):
+        """Hiện lại mọi hàng bị ẩn bởi tìm kiếm (trước khi dựng lại bảng)"""
+        if self.search_matches is not None:
+            for row in set(range(self.data_table.rowCount())) - self.search_matches:
+                self.data_table.setRowHidden(row, False)
+        self.search_matches = None
 
     def clear_search(self):
         """Xóa tìm kiếm và hiển thị lại toàn bộ dữ liệu"""
         self.search_input.clear()
-        self.apply_filters()
+        self.search_accounts()
 
 class SettingsDialog(QDialog):
     def __init__(self, parent=None):
@@ -2747,6 +2955,17 @@ class SettingsDialog(QDialog):
         worksheet_layout.addWidget(self.worksheet_input)
         creds_layout.addLayout(worksheet_layout)
         
+        # Các worksheet bổ sung, được tải song song và gộp chung với worksheet chính
+        creds_layout.addWidget(QLabel("Worksheet bổ sung (mỗi dòng một tên, hoặc 'URL | Tên worksheet' nếu ở sheet khác):"))
+        self.extra_worksheets_input = QTextEdit()
+        self.extra_worksheets_input.setAcceptRichText(False)
+        self.extra_worksheets_input.setMaximumHeight(80)
+        self.extra_worksheets_input.setPlainText("\n".join(
+            f"{entry['sheet_url']} | {entry['worksheet']}" if entry.get("sheet_url") else entry["worksheet"]
+            for entry in self.parent.extra_worksheets
+        ))
+        creds_layout.addWidget(self.extra_worksheets_input)
+        
         # Layout cho hàng tiêu đề (header row)
         header_row_layout = QHBoxLayout()
         self.header_row_input = QLineEdit()
@@ -2759,6 +2978,43 @@ class SettingsDialog(QDialog):
         
         layout.addWidget(creds_group)
         
+        # Group Box cho nguồn dữ liệu (Google Sheets hoặc tệp cục bộ)
+        source_group = QGroupBox("Nguồn dữ liệu")
+        source_layout = QVBoxLayout()
+        source_group.setLayout(source_layout)
+        
+        source_type_layout = QHBoxLayout()
+        self.source_type_combo = QComboBox()
+        for source_type, source_name in SOURCE_TYPES.items():
+            self.source_type_combo.addItem(source_name, source_type)
+        self.source_type_combo.setCurrentIndex(max(0, self.source_type_combo.findData(self.parent.data_source_type)))
+        source_type_layout.addWidget(QLabel("Loại nguồn:"))
+        source_type_layout.addWidget(self.source_type_combo)
+        source_layout.addLayout(source_type_layout)
+        
+        source_path_layout = QHBoxLayout()
+        self.source_path_input = QLineEdit()
+        self.source_path_input.setPlaceholderText("Đường dẫn tệp CSV / XLSX / SQLite (chỉ dùng với nguồn cục bộ)")
+        self.source_path_input.setText(self.parent.data_source_path)
+        browse_btn = QPushButton("Chọn tệp...")
+        browse_btn.clicked.connect(self.browse_source_file)
+        source_path_layout.addWidget(QLabel("Tệp dữ liệu:"))
+        source_path_layout.addWidget(self.source_path_input)
+        source_path_layout.addWidget(browse_btn)
+        source_layout.addLayout(source_path_layout)
+        
+        source_name_layout = QHBoxLayout()
+        self.source_name_input = QLineEdit()
+        self.source_name_input.setPlaceholderText("Tên sheet Excel hoặc bảng SQLite (để trống = đầu tiên)")
+        self.source_name_input.setText(self.parent.data_source_name)
+        source_name_layout.addWidget(QLabel("Sheet/Bảng:"))
+        source_name_layout.addWidget(self.source_name_input)
+        source_layout.addLayout(source_name_layout)
+        
+        self.source_type_combo.currentIndexChanged.connect(self.update_source_inputs)
+        self.update_source_inputs()
+        layout.addWidget(source_group)
+        
         # Group Box cho cấu hình cột dữ liệu
         column_config_group = QGroupBox("Cấu hình cột dữ liệu")
         column_config_layout = QVBoxLayout()
@@ -2813,8 +3069,87 @@ class SettingsDialog(QDialog):
         branch_col_layout.addWidget(self.branch_col_input)
         column_config_layout.addLayout(branch_col_layout)
         
+        # Danh sách nhánh dùng để trích xuất tên nhánh từ cột Nhánh (Note1)
+        branch_names_label = QLabel("Danh sách nhánh (mỗi dòng một nhánh, nhánh đứng trước được ưu tiên):")
+        column_config_layout.addWidget(branch_names_label)
+        self.branch_names_input = QTextEdit()
+        self.branch_names_input.setPlaceholderText("nhánh phát\nnhánh long")
+        self.branch_names_input.setPlainText("\n".join(self.parent.branch_names))
+        self.branch_names_input.setMaximumHeight(100)
+        column_config_layout.addWidget(self.branch_names_input)
+        
         layout.addWidget(column_config_group)
         
+        # Group Box cho tùy chọn đồng bộ dữ liệu
+        sync_group = QGroupBox("Đồng bộ dữ liệu")
+        sync_layout = QVBoxLayout()
+        sync_group.setLayout(sync_layout)
+        
+        self.incremental_sync_checkbox = QCheckBox("Đồng bộ tăng dần (chỉ cập nhật các hàng thêm/sửa/xóa)")
+        self.incremental_sync_checkbox.setChecked(self.parent.incremental_sync)
+        sync_layout.addWidget(self.incremental_sync_checkbox)
+        
+        self.projected_fetch_checkbox = QCheckBox("Chỉ tải các cột cần thiết (C..P và các cột đã cấu hình)")
+        self.projected_fetch_checkbox.setChecked(self.parent.projected_fetch)
+        sync_layout.addWidget(self.projected_fetch_checkbox)
+        
+        self.freshness_check_checkbox = QCheckBox("Kiểm tra thay đổi trước khi tải (bỏ qua tải nếu sheet không đổi)")
+        self.freshness_check_checkbox.setChecked(self.parent.freshness_check)
+        sync_layout.addWidget(self.freshness_check_checkbox)
+        
+        sentinel_layout = QHBoxLayout()
+        self.freshness_sentinel_input = QLineEdit()
+        self.freshness_sentinel_input.setPlaceholderText("Vùng ô dự phòng khi không đọc được Drive (ví dụ: A1:B2)")
+        self.freshness_sentinel_input.setText(self.parent.freshness_sentinel_range)
+        sentinel_layout.addWidget(QLabel("Vùng sentinel:"))
+        sentinel_layout.addWidget(self.freshness_sentinel_input)
+        sync_layout.addLayout(sentinel_layout)
+        
+        self.streaming_ingest_checkbox = QCheckBox("Tải theo trang và hiển thị dần (dành cho sheet rất lớn)")
+        self.streaming_ingest_checkbox.setChecked(self.parent.streaming_ingest)
+        sync_layout.addWidget(self.streaming_ingest_checkbox)
+        
+        page_size_layout = QHBoxLayout()
+        self.ingest_page_size_input = QLineEdit()
+        self.ingest_page_size_input.setPlaceholderText(f"Số hàng mỗi trang (mặc định {DEFAULT_PAGE_SIZE})")
+        self.ingest_page_size_input.setText(str(self.parent.ingest_page_size))
+        page_size_layout.addWidget(QLabel("Số hàng mỗi trang:"))
+        page_size_layout.addWidget(self.ingest_page_size_input)
+        sync_layout.addLayout(page_size_layout)
+        
+        layout.addWidget(sync_group)
+        
+        # Group Box cho các ngưỡng End Equity
+        threshold_group = QGroupBox("Ngưỡng End Equity")
+        threshold_layout = QVBoxLayout()
+        threshold_group.setLayout(threshold_layout)
+        
+        low_threshold_layout = QHBoxLayout()
+        self.low_equity_threshold_input = QLineEdit()
+        self.low_equity_threshold_input.setPlaceholderText(f"Mặc định {LOW_EQUITY_THRESHOLD}")
+        self.low_equity_threshold_input.setText(f"{self.parent.low_equity_threshold:g}")
+        low_threshold_layout.addWidget(QLabel("Hết tiền (cần thay) khi dưới:"))
+        low_threshold_layout.addWidget(self.low_equity_threshold_input)
+        threshold_layout.addLayout(low_threshold_layout)
+        
+        warn_threshold_layout = QHBoxLayout()
+        self.warn_equity_threshold_input = QLineEdit()
+        self.warn_equity_threshold_input.setPlaceholderText("Bằng ngưỡng hết tiền = không cảnh báo")
+        self.warn_equity_threshold_input.setText(f"{self.parent.warn_equity_threshold:g}")
+        warn_threshold_layout.addWidget(QLabel("Cảnh báo sắp hết tiền khi dưới:"))
+        warn_threshold_layout.addWidget(self.warn_equity_threshold_input)
+        threshold_layout.addLayout(warn_threshold_layout)
+        
+        replacement_threshold_layout = QHBoxLayout()
+        self.replacement_min_equity_input = QLineEdit()
+        self.replacement_min_equity_input.setPlaceholderText(f"Mặc định {MIN_BRANCH_EQUITY}")
+        self.replacement_min_equity_input.setText(f"{self.parent.replacement_min_equity:g}")
+        replacement_threshold_layout.addWidget(QLabel("Tài khoản thay thế phải lớn hơn:"))
+        replacement_threshold_layout.addWidget(self.replacement_min_equity_input)
+        threshold_layout.addLayout(replacement_threshold_layout)
+        
+        layout.addWidget(threshold_group)
+        
         # Nút lưu và hủy
         button_box = QDialogButtonBox(QDialogButtonBox.Save | QDialogButtonBox.Cancel)
         button_box.accepted.connect(self.accept)
@@ -2822,16 +3157,47 @@ class SettingsDialog(QDialog):
         
         layout.addWidget(button_box)
     
+    def update_source_inputs(self):
+        """Chỉ bật ô đường dẫn tệp và tên sheet/bảng khi chọn nguồn cục bộ"""
+        is_local = self.source_type_combo.currentData() in LOCAL_SOURCE_TYPES
+        self.source_path_input.setEnabled(is_local)
+        self.source_name_input.setEnabled(is_local)
+    
+    def browse_source_file(self):
+        """Chọn tệp dữ liệu cục bộ"""
+        file_filters = "Dữ liệu (*.csv *.xlsx *.db *.sqlite *.sqlite3);;Tất cả tệp (*)"
+        path, _ = QFileDialog.getOpenFileName(self, "Chọn tệp dữ liệu", self.source_path_input.text(), file_filters)
+        if path:
+            self.source_path_input.setText(path)
+    
     def accept(self):
         # Chuyển dữ liệu từ dialog sang main window
         self.parent.sheet_url_input.setText(self.sheet_url_input.text())
+        self.parent.data_source_type = self.source_type_combo.currentData()
+        self.parent.data_source_path = self.source_path_input.text().strip()
+        self.parent.data_source_name = self.source_name_input.text().strip()
         self.parent.worksheet_input.setText(self.worksheet_input.text())
+        self.parent.extra_worksheets = self.parent.parse_worksheet_entries(
+            self.extra_worksheets_input.toPlainText().splitlines())
         self.parent.header_row_input.setText(self.header_row_input.text())
         self.parent.broker_col_input.setText(self.broker_col_input.text())
         self.parent.server_col_input.setText(self.server_col_input.text())
         self.parent.login_col_input.setText(self.login_col_input.text())
         self.parent.pass_col_input.setText(self.pass_col_input.text())
         self.parent.branch_col_input.setText(self.branch_col_input.text())
+        self.parent.set_branch_names(self.branch_names_input.toPlainText() or DEFAULT_BRANCH_NAMES)
+        self.parent.incremental_sync = self.incremental_sync_checkbox.isChecked()
+        self.parent.projected_fetch = self.projected_fetch_checkbox.isChecked()
+        self.parent.freshness_check = self.freshness_check_checkbox.isChecked()
+        self.parent.freshness_sentinel_range = self.freshness_sentinel_input.text().strip()
+        self.parent.streaming_ingest = self.streaming_ingest_checkbox.isChecked()
+        try:
+            self.parent.ingest_page_size = max(100, int(self.ingest_page_size_input.text()))
+        except ValueError:
+            self.parent.ingest_page_size = DEFAULT_PAGE_SIZE
+        self.parent.set_equity_thresholds(self.low_equity_threshold_input.text().strip(),
+                                          self.warn_equity_threshold_input.text().strip(),
+                                          self.replacement_min_equity_input.text().strip())
         
         # Lưu cấu hình
         self.parent.save_config()
@@ -2840,9 +3206,10 @@ class SettingsDialog(QDialog):
 class BranchVerificationDialog(QDialog):
     """Dialog hiển thị kết quả kiểm tra nhánh và cho phép chọn tài khoản để thay thế"""
     
-    def __init__(self, mismatched_accounts, target_branch, branch_accounts, parent=None):
+    def __init__(self, mismatched_accounts, target_branch, branch_accounts, parent=None, min_equity=MIN_BRANCH_EQUITY):
         super().__init__(parent)
         self.mismatched_accounts = mismatched_accounts
+        self.min_equity = min_equity  # Tài khoản thay thế phải có End Equity lớn hơn mức này
         self.target_branch = target_branch
         self.branch_accounts = branch_accounts
         self.replacement_map = {}  # Lưu các tài khoản đã tìm thấy để thay thế
@@ -2881,7 +3248,7 @@ class BranchVerificationDialog(QDialog):
         info_label = QLabel(f"<b>Kết quả kiểm tra tài khoản theo nhánh: <span style='color:blue'>{self.target_branch}</span></b>")
         main_layout.addWidget(info_label)
         
-        stats_label = QLabel(f"Tìm thấy <b>{len(self.mismatched_accounts)}</b> tài khoản không đúng nhánh và <b>{len(self.branch_accounts)}</b> tài khoản thuộc nhánh {self.target_branch} với End Equity > 100")
+        stats_label = QLabel(f"Tìm thấy <b>{len(self.mismatched_accounts)}</b> tài khoản không đúng nhánh và <b>{len(self.branch_accounts)}</b> tài khoản thuộc nhánh {self.target_branch} với End Equity > {self.min_equity:g}")
         main_layout.addWidget(stats_label)
         
         # Thông tin về cách sử dụng ComboBox
@@ -2921,12 +3288,12 @@ class BranchVerificationDialog(QDialog):
         main_layout.addWidget(self.select_all_checkbox)
         
         # Thông tin
-        info_text = QLabel("""
+        info_text = QLabel(f"""
         <b>Lưu ý:</b>
         - Chọn các tài khoản bạn muốn thay thế sang tài khoản đúng nhánh
         - Các tài khoản có nhiều lựa chọn thay thế sẽ hiển thị danh sách thả xuống (ComboBox) để chọn
         - Hệ thống tự động tìm tài khoản thay thế phù hợp nhất dựa trên broker/server và End Equity
-        - Chỉ hiển thị tài khoản thay thế có End Equity > 100
+        - Chỉ hiển thị tài khoản thay thế có End Equity > {self.min_equity:g}
         - Khi bạn chọn tài khoản khác từ danh sách, giá trị Equity sẽ được cập nhật tương ứng
         """)
         main_layout.addWidget(info_text)
@@ -2948,112 +3315,49 @@ class BranchVerificationDialog(QDialog):
         main_layout.addLayout(buttons_layout)
     
     def find_replacements(self):
-        """Tìm tài khoản thay thế phù hợp cho mỗi tài khoản không đúng nhánh"""
+        """Tìm tài khoản thay thế phù hợp cho mỗi tài khoản không đúng nhánh
+        
+        Khóa server gốc và sàn của tài khoản nhánh đã được chuẩn hóa khi tải dữ liệu; chỉ mục
+        được dựng một lần cho cả dialog nên mỗi tài khoản chỉ cần tra chỉ mục. Sau đó các tài
+        khoản thay thế được phân bổ chung cho cả danh sách để không terminal nào nhận trùng.
+        """
+        server_index = SubstringIndex(
+            (pos, acc.get("server_base", server_base(acc["server"]))) for pos, acc in enumerate(self.branch_accounts))
+        broker_index = SubstringIndex(
+            (pos, acc.get("broker_key", broker_key(acc["broker"]))) for pos, acc in enumerate(self.branch_accounts))
+        equity = [acc.get("equity", 0) for acc in self.branch_accounts]
+        
+        request_candidates = []
         for account in self.mismatched_accounts:
-            login_id = account["login_id"]
             broker = account.get("broker", "")
             server = account.get("server", "")
             
             # Bỏ qua nếu broker hoặc server không có giá trị
             if not broker or not server:
-                self.replacement_map[login_id] = []
+                request_candidates.append([])
                 continue
                 
             # Chuẩn hóa broker và server để so sánh
-            broker_normalized = broker.lower().strip()
+            broker_normalized = broker_key(broker)
             
             # Tách tên server theo yêu cầu: lấy phần trước dấu gạch ngang đầu tiên
             # Ví dụ: MarketEquityInc-Live sẽ lấy MarketEquityInc
-            try:
-                if "-" in server:
-                    server_parts = server.split('-')
-                    base_server = server_parts[0].strip()
-                else:
-                    # Nếu không có dấu gạch ngang, sử dụng toàn bộ tên server
-                    base_server = server.strip()
-                server_normalized = base_server.lower()
-                
-                print(f"Tìm kiếm cho tài khoản {login_id}: Server gốc = {server}, Server đã tách = {base_server}")
-            except Exception as e:
-                print(f"Lỗi khi tách server cho tài khoản {login_id}: {str(e)}")
-                base_server = server.strip()
-                server_normalized = base_server.lower()
-            
-            # Tìm tài khoản phù hợp để thay thế
-            matching_accounts = []
+            server_normalized = server_base(server)
             
-            print(f"--- Bắt đầu tìm tài khoản thay thế cho {login_id} - Broker: {broker}, Server base: {base_server} ---")
-            
-            # Chỉ tìm khớp server, không cần khớp broker
-            for branch_acc in self.branch_accounts:
-                branch_broker = branch_acc["broker"].lower().strip()
-                branch_server = branch_acc["server"].lower().strip()
-                branch_login = branch_acc.get("login_id", "")
-                branch_equity = branch_acc.get("equity", 0)
-                
-                # Tách tên server của tài khoản nhánh theo cùng quy tắc
-                try:
-                    if "-" in branch_acc["server"]:
-                        branch_server_parts = branch_acc["server"].split('-')
-                        branch_base_server = branch_server_parts[0].strip()
-                    else:
-                        # Nếu không có dấu gạch ngang, sử dụng toàn bộ tên server
-                        branch_base_server = branch_acc["server"].strip()
-                    branch_server_normalized = branch_base_server.lower()
-                except Exception as e:
-                    print(f"Lỗi khi tách server cho tài khoản nhánh: {str(e)}")
-                    branch_base_server = branch_acc["server"].strip()
-                    branch_server_normalized = branch_base_server.lower()
-                
-                # So sánh broker và server base
-                broker_match = (broker_normalized in branch_broker or branch_broker in broker_normalized)
-                server_match = (server_normalized in branch_server_normalized or branch_server_normalized in server_normalized)
-                
-                # Log kết quả so sánh cho debugging
-                if server_match:
-                    print(f"  Checking: {branch_login} - Broker: {branch_acc['broker']}, Server: {branch_acc['server']}, Base server: {branch_base_server}")
-                    print(f"    Broker match: {broker_match} (Source: '{broker}' vs Branch: '{branch_acc['broker']}')")
-                    print(f"    Server match: {server_match} (Source base: '{base_server}' vs Branch base: '{branch_base_server}')")
-                    print(f"    Equity: {branch_equity}")
-                
-                # Chỉ yêu cầu server_match, không cần broker_match
-                if server_match:
-                    # Chỉ thêm vào danh sách nếu equity > 100
-                    if branch_equity > 100:
-                        matching_accounts.append(branch_acc)
-                        print(f"    ✅ SERVER MATCH FOUND: {branch_login} - Equity: {branch_equity}")
-                    else:
-                        print(f"    ❌ EQUITY TOO LOW: {branch_login} - Equity: {branch_equity}")
+            # Chỉ tìm khớp server (chuỗi con hai chiều), không cần khớp broker; chỉ lấy tài khoản trên ngưỡng equity
+            candidates = [pos for pos in server_index.lookup(server_normalized) if equity[pos] > self.min_equity]
             
             # Nếu không có tài khoản nào khớp server, thử tìm theo broker
-            if not matching_accounts:
-                print(f"  Không tìm thấy kết quả khớp server, tìm theo broker...")
-                for branch_acc in self.branch_accounts:
-                    branch_broker = branch_acc["broker"].lower().strip()
-                    branch_login = branch_acc.get("login_id", "")
-                    branch_equity = branch_acc.get("equity", 0)
-                    
-                    # So sánh chuỗi con cho broker
-                    broker_match = (broker_normalized in branch_broker or branch_broker in broker_normalized)
-                    
-                    if broker_match:
-                        print(f"  Checking broker only: {branch_login} - Broker: {branch_acc['broker']}")
-                        print(f"    Equity: {branch_equity}")
-                        
-                        # Chỉ thêm vào danh sách nếu equity > 100
-                        if branch_equity > 100:
-                            matching_accounts.append(branch_acc)
-                            print(f"    ✅ BROKER MATCH: {branch_login} - Equity: {branch_equity}")
-                        else:
-                            print(f"    ❌ EQUITY TOO LOW: {branch_login} - Equity: {branch_equity}")
-            
-            # Sắp xếp theo End Equity giảm dần
-            matching_accounts.sort(key=lambda x: x.get("equity", 0), reverse=True)
+            if not candidates:
+                candidates = [pos for pos in broker_index.lookup(broker_normalized) if equity[pos] > self.min_equity]
             
-            print(f"--- Kết quả tìm kiếm cho {login_id}: Tìm thấy {len(matching_accounts)} tài khoản phù hợp ---")
-            
-            # Lưu vào replacement_map
-            self.replacement_map[login_id] = matching_accounts
+            request_candidates.append(candidates)
+        
+        # Phân bổ chung: mỗi tài khoản thay thế chỉ được gán cho một terminal
+        allocation = allocate_replacements(request_candidates, equity)
+        for account, options in zip(self.mismatched_accounts, allocation.options):
+            # Lựa chọn đầu tiên là tài khoản đã phân bổ, sau đó là các tài khoản chưa gán cho ai
+            self.replacement_map[account["login_id"]] = [self.branch_accounts[pos] for pos in options]
     
     def populate_table(self):
         """Điền dữ liệu vào bảng"""
@@ -3106,7 +3410,6 @@ class BranchVerificationDialog(QDialog):
                     equity_item.setFlags(equity_item.flags() & ~Qt.ItemIsEditable)
                     equity_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
                     self.accounts_table.setItem(row, 7, equity_item)
-                    from functools import partial
                     combo.currentIndexChanged.connect(partial(self.update_equity_for_row, row, combo))
                 else:
                     replacement = matching_accounts[0]
@@ -3222,7 +3525,22 @@ class BranchVerificationDialog(QDialog):
     def accept(self):
         """Xử lý khi người dùng nhấn nút đăng nhập tài khoản đã chọn"""
         # Lưu danh sách các tài khoản đã chọn (được dùng bởi hàm process_mismatched_accounts)
-        self.selected_accounts = self.get_selected_accounts()
+        selected_accounts = self.get_selected_accounts()
+        
+        # Không cho phép hai terminal đăng nhập cùng một tài khoản thay thế (có thể xảy ra khi đổi ComboBox)
+        used_by = {}
+        duplicates = []
+        for result in selected_accounts:
+            new_login_id = result["new_account"]["login_id"]
+            if new_login_id in used_by:
+                duplicates.append(f"{new_login_id}: {used_by[new_login_id]} và {result['old_account']['login_id']}")
+            else:
+                used_by[new_login_id] = result["old_account"]["login_id"]
+        if duplicates:
+            QMessageBox.warning(self, "Tài khoản thay thế bị trùng",
+                                "Các tài khoản thay thế sau được chọn cho nhiều terminal:\n" + "\n".join(duplicates))
+            return
+        self.selected_accounts = selected_accounts
         
         # Bỏ chọn tất cả các tài khoản đã chọn
         for row in range(self.accounts_table.rowCount()):
@@ -3237,7 +3555,8 @@ class BranchVerificationDialog(QDialog):
 class LowEquityDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.setWindowTitle("Tài khoản hết tiền (EndEquity < 100)")
+        low_threshold = parent.low_equity_threshold if parent is not None else LOW_EQUITY_THRESHOLD
+        self.setWindowTitle(f"Tài khoản hết tiền (EndEquity < {low_threshold:g})")
         self.resize(1700, 650)
         layout = QVBoxLayout()
         self.setLayout(layout)
@@ -3279,7 +3598,9 @@ class LowEquityDialog(QDialog):
             # Thêm ghi chú phân biệt
             note = acc.get("reason", "")
             if note == "Hết tiền":
-                note_text = "Tài khoản hết tiền (Equity < 100)"
+                note_text = f"Tài khoản hết tiền (Equity < {self.parent().low_equity_threshold:g})"
+            elif note == "Sắp hết tiền":
+                note_text = f"Tài khoản sắp hết tiền (Equity < {self.parent().warn_equity_threshold:g})"
             elif note == "Không tồn tại trong sheet":
                 note_text = "Tài khoản không có trong sheet"
             else:
@@ -3291,97 +3612,34 @@ class LowEquityDialog(QDialog):
         parent = self.parent()
         broker = acc["broker"]
         server = acc["server"]
-        login_col_index = parent.get_column_index(parent.login_col_input.text())
-        broker_col_index = parent.get_column_index(parent.broker_col_input.text())
-        server_col_index = parent.get_column_index(parent.server_col_input.text())
-        name_col_index = 2
-        equity_col_index = 15  # Cột P - EndEquity
-        pass_col_index = parent.get_column_index(parent.pass_col_input.text())
-        header_row = 0
-        try:
-            header_row = int(parent.header_row_input.text()) - 1
-            if header_row < 0:
-                header_row = 0
-        except ValueError:
-            header_row = 0
-        suggestions = []
-        # Chuẩn hóa broker và server để so sánh
-        broker_normalized = broker.lower().strip()
-        # Tách tên server base
-        try:
-            if "-" in server:
-                server_parts = server.split('-')
-                base_server = server_parts[0].strip()
-            else:
-                base_server = server.strip()
-            server_normalized = base_server.lower()
-        except Exception as e:
-            base_server = server.strip()
-            server_normalized = base_server.lower()
-        # Tìm tài khoản phù hợp để thay thế
-        for row_data in parent.all_data[header_row + 1:]:
-            if len(row_data) <= max(login_col_index, broker_col_index, server_col_index, name_col_index, equity_col_index, pass_col_index):
-                continue
-            sug_login_id = str(row_data[login_col_index]).strip()
-            if sug_login_id == acc["login_id"]:
-                continue
-            sug_broker = str(row_data[broker_col_index]).strip().lower()
-            sug_server = str(row_data[server_col_index]).strip().lower()
-            # Tách tên server base của tài khoản gợi ý
-            try:
-                if "-" in sug_server:
-                    sug_server_parts = sug_server.split('-')
-                    sug_base_server = sug_server_parts[0].strip()
-                else:
-                    sug_base_server = sug_server.strip()
-                sug_server_normalized = sug_base_server.lower()
-            except Exception as e:
-                sug_base_server = sug_server.strip()
-                sug_server_normalized = sug_base_server.lower()
-            try:
-                equity_str = str(row_data[equity_col_index]).strip()
-                equity_value = 0
-                if equity_str:
-                    if equity_str.count('.') > 1:
-                        last_dot = equity_str.rfind('.')
-                        equity_str = equity_str.replace('.', '')
-                        equity_str = equity_str[:last_dot] + '.' + equity_str[last_dot:]
-                    else:
-                        equity_str = equity_str.replace(',', '.')
-                    equity_value = float(equity_str)
-            except Exception as e:
-                equity_value = 0
-            if equity_value <= 100:
-                continue
-            name = str(row_data[name_col_index]).strip() if name_col_index < len(row_data) else ""
-            password = str(row_data[pass_col_index]).strip() if pass_col_index < len(row_data) else ""
-            branch_col_index = parent.get_column_index(parent.branch_col_input.text())
-            branch = str(row_data[branch_col_index]).strip() if branch_col_index < len(row_data) else ""
-            # Ưu tiên khớp server base
-            server_match = (server_normalized and sug_server_normalized and (server_normalized in sug_server_normalized or sug_server_normalized in server_normalized))
-            broker_match = (broker_normalized in sug_broker or sug_broker in broker_normalized)
-            suggestions.append({
-                "login_id": sug_login_id,
-                "broker": str(row_data[broker_col_index]).strip(),
-                "server": str(row_data[server_col_index]).strip(),
-                "name": name,
-                "equity": equity_value,
-                "password": password,
-                "branch": branch,
-                "server_match": server_match,
-                "broker_match": broker_match
-            })
-        # Ưu tiên khớp server base
-        server_suggestions = [s for s in suggestions if s["server_match"]]
-        if not server_suggestions:
-            # Nếu không có, ưu tiên khớp broker
-            broker_suggestions = [s for s in suggestions if s["broker_match"]]
-            filtered = broker_suggestions
-        else:
-            filtered = server_suggestions
-        filtered.sort(key=lambda x: x["equity"], reverse=True)
+        table = parent.account_table
+        name_col_index = table.config.name
+        pass_col_index = table.config.password
+        # Chuẩn hóa broker và tách tên server base
+        broker_normalized = broker_key(broker)
+        server_normalized = server_base(server)
+        # Các tài khoản đủ cột có End Equity trên ngưỡng được lập chỉ mục (theo equity giảm dần) một lần
+        min_equity = parent.replacement_min_equity
+        rows, server_index, broker_index = table.suggestion_index(min_equity)
+        
+        def candidates(positions):
+            return [rows[pos] for pos in positions if table.login_ids[rows[pos]] != acc["login_id"]]
+        
+        # Ưu tiên khớp server base, nếu không có thì khớp broker
+        matched_rows = candidates(server_index.lookup(server_normalized, allow_empty=False))
+        if not matched_rows:
+            matched_rows = candidates(broker_index.lookup(broker_normalized))
+        filtered = [{
+            "login_id": table.login_ids[i],
+            "broker": table.broker[i],
+            "server": table.server[i],
+            "name": table.text(i, name_col_index),
+            "equity": table.equity[i],
+            "password": table.text(i, pass_col_index),
+            "branch": table.note[i]
+        } for i in matched_rows]
         if not filtered:
-            QMessageBox.information(self, "Không có gợi ý", "Không tìm thấy tài khoản gợi ý phù hợp (ưu tiên cùng server hoặc cùng broker) có EndEquity > 100.")
+            QMessageBox.information(self, "Không có gợi ý", f"Không tìm thấy tài khoản gợi ý phù hợp (ưu tiên cùng server hoặc cùng broker) có EndEquity > {min_equity:g}.")
             return
         items = [f"[{sug['branch']}] ID: {sug['login_id']} | Server: {sug['server']} | Equity: {sug['equity']} | Sàn: {sug['broker']}" for sug in filtered]
         item, ok = QInputDialog.getItem(self, "Chọn tài khoản gợi ý", f"Chọn tài khoản để đăng nhập thay thế cho {acc['login_id']} ({acc.get('reason','')}) :", items, 0, False)
@@ -3393,11 +3651,19 @@ class LowEquityDialog(QDialog):
 
     def login_selected_suggestions(self):
         parent = self.parent()
+        login_results = []
         for row, acc in enumerate(self.accounts):
             suggestion = self.suggestion_selected[row] if self.suggestion_selected[row] else None
             if suggestion:
-                parent.login_suggestion_to_window(acc, suggestion)
-        QMessageBox.information(self, "Kết quả", "Đã gửi lệnh đăng nhập cho các tài khoản gợi ý đã chọn!")
+                login_results.append(parent.login_suggestion_to_window(acc, suggestion))
+        # Chờ nhật ký terminal một lần sau khi đã gửi phím cho mọi cửa sổ
+        login_count = parent.confirm_login_results(login_results, parent.get_journal_timeout())
+        summary = f"Đã đăng nhập thành công {login_count}/{len(login_results)} tài khoản gợi ý.\n\n"
+        summary += "\n".join(result["message"] for result in login_results)
+        if login_count == len(login_results):
+            QMessageBox.information(self, "Kết quả", summary)
+        else:
+            QMessageBox.warning(self, "Kết quả", summary)
 
 def main():
     # Khởi động ứng dụng với STA (Single-threaded apartment) mode
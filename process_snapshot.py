@@ -0,0 +1,128 @@
+"""
+Mô-đun ảnh chụp danh sách tiến trình: chụp một lần cho mỗi thao tác (quét, đăng nhập)
+rồi dùng lại để xác định nền tảng MT4/MT5 của từng cửa sổ, thay vì duyệt toàn bộ
+tiến trình trên máy cho mỗi cửa sổ
+
+Mỗi tiến trình được định danh bằng (pid, create_time) nên PID bị hệ điều hành cấp lại
+cho tiến trình khác sau khi chụp không bị nhận nhầm.
+"""
+
+import psutil
+
+# Tên tiến trình MT4/MT5 có thể có (so khớp chuỗi con trên tên chữ thường)
+MT4_PROCESS_NAMES = ("terminal.exe", "metatrader4.exe", "mt4.exe")
+MT5_PROCESS_NAMES = ("terminal64.exe", "metatrader5.exe", "mt5.exe")
+
+_PROCESS_ERRORS = (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess)
+
+
+def platform_from_process_name(process_name):
+    """MT4/MT5 theo tên tiến trình (danh sách tên MT4/MT5 ở trên), None nếu không phải terminal
+
+    Dùng chung cho quét, đăng nhập và danh sách terminal theo sự kiện để một cửa sổ luôn
+    được xác định cùng một nền tảng.
+    """
+    process_name = (process_name or "").lower()
+    if any(name in process_name for name in MT5_PROCESS_NAMES):
+        return "MT5"
+    if any(name in process_name for name in MT4_PROCESS_NAMES):
+        return "MT4"
+    return None
+
+
+def read_process(pid):
+    """(create_time, tên tiến trình) của tiến trình đang giữ pid, None nếu tiến trình không còn
+
+    psutil.AccessDenied được ném ra ngoài: không đọc được không có nghĩa là tiến trình không còn.
+    """
+    try:
+        proc = psutil.Process(pid)
+        return proc.create_time(), proc.name()
+    except (psutil.NoSuchProcess, psutil.ZombieProcess):
+        return None
+
+
+class ProcessSnapshot:
+    """Danh sách tiến trình tại một thời điểm: (pid, create_time) -> tên tiến trình
+
+    lookup(pid) đọc thông tin một tiến trình khi đối chiếu (mặc định read_process); một
+    ảnh chụp rỗng vì vậy chỉ đọc các pid được hỏi tới, mỗi pid một lần.
+    """
+
+    def __init__(self, processes=(), lookup=None):
+        self.names = {}         # (pid, create_time) -> tên tiến trình
+        self._by_pid = {}       # pid -> create_time trong ảnh chụp
+        self._verified = set()  # pid đã đối chiếu create_time với tiến trình hiện tại
+        self._lookup = lookup or read_process
+        for pid, create_time, name in processes:
+            self._add(pid, create_time, name)
+
+    def _add(self, pid, create_time, name):
+        self.names[(pid, create_time)] = name or ""
+        self._by_pid[pid] = create_time
+
+    @classmethod
+    def capture(cls):
+        """Chụp danh sách tiến trình hiện tại (một lần duyệt psutil.process_iter)"""
+        processes = []
+        for proc in psutil.process_iter(["pid", "name", "create_time"]):
+            try:
+                info = proc.info
+                processes.append((info["pid"], info.get("create_time"), info.get("name")))
+            except _PROCESS_ERRORS:
+                pass
+        return cls(processes)
+
+    def __len__(self):
+        return len(self.names)
+
+    def identity(self, pid):
+        """(pid, create_time) của tiến trình đang giữ pid, None nếu tiến trình không còn
+
+        Lần đầu hỏi một pid, create_time trong ảnh chụp được đối chiếu với tiến trình hiện tại
+        (một lời gọi cho pid đó); nếu PID đã bị cấp lại, hoặc tiến trình mới khởi động sau khi
+        chụp, thông tin được đọc lại cho riêng pid đó.
+        """
+        if pid is None:
+            return None
+        if pid not in self._verified:
+            self._verified.add(pid)
+            try:
+                info = self._lookup(pid)
+            except Exception:
+                pass    # Không đối chiếu được (AccessDenied), dùng thông tin trong ảnh chụp
+            else:
+                if info is None:
+                    self._by_pid.pop(pid, None)
+                else:
+                    create_time, name = info
+                    if self._by_pid.get(pid) != create_time or (pid, create_time) not in self.names:
+                        self._add(pid, create_time, name)
+        if pid not in self._by_pid:
+            return None
+        return (pid, self._by_pid[pid])
+
+    def name_of(self, pid):
+        """Tên tiến trình đang giữ pid ("" nếu không còn)"""
+        identity = self.identity(pid)
+        return "" if identity is None else self.names.get(identity, "")
+
+    def platform_of(self, pid):
+        """MT4/MT5 của tiến trình theo tên, None nếu không xác định được"""
+        return platform_from_process_name(self.name_of(pid))
+
+    def name_matches(self, pid, process_names):
+        """Tiến trình đang giữ pid có tên chứa một trong các tên đã cho không"""
+        name_lower = self.name_of(pid).lower()
+        return bool(name_lower) and any(process_name in name_lower for process_name in process_names)
+
+    def pids_matching(self, process_names):
+        """Các pid có tên tiến trình chứa một trong các tên đã cho (theo ảnh chụp)"""
+        pids = []
+        for (pid, create_time), name in self.names.items():
+            if self._by_pid.get(pid) != create_time:
+                continue
+            name_lower = name.lower()
+            if any(process_name in name_lower for process_name in process_names):
+                pids.append(pid)
+        return pids
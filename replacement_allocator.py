@@ -0,0 +1,121 @@
+"""
+Mô-đun phân bổ tài khoản thay thế cho các tài khoản không đúng nhánh: mỗi tài khoản
+thay thế chỉ được gán cho tối đa một terminal, tổng End Equity được gán là lớn nhất
+"""
+
+
+class ReplacementAllocation:
+    """Kết quả phân bổ
+
+    assigned[i] là vị trí ứng viên được gán cho yêu cầu i (None nếu hết ứng viên phù hợp);
+    options[i] là các lựa chọn của yêu cầu i: ứng viên đã gán trước, sau đó là các ứng viên
+    tương thích chưa gán cho ai (theo End Equity giảm dần).
+    """
+
+    def __init__(self, assigned, options):
+        self.assigned = assigned
+        self.options = options
+
+    def __len__(self):
+        return sum(1 for position in self.assigned if position is not None)
+
+
+def allocate_replacements(request_candidates, equity):
+    """Gán ứng viên cho các yêu cầu, không ứng viên nào bị gán hai lần
+
+    request_candidates[i] là danh sách vị trí ứng viên tương thích với yêu cầu i;
+    equity[p] là End Equity của ứng viên p. Các yêu cầu có cùng danh sách ứng viên
+    (cùng server/sàn) được gộp thành một nhóm có sức chứa bằng số yêu cầu.
+
+    Ứng viên được xét một lần theo End Equity giảm dần; mỗi ứng viên được nhận nếu tìm
+    được đường tăng (có thể dời ứng viên đã gán sang nhóm tương thích khác). Cách tham
+    lam này cho tổng End Equity lớn nhất và số yêu cầu được gán nhiều nhất.
+    """
+    # Gộp các yêu cầu theo danh sách ứng viên
+    group_of_key = {}
+    group_requests = []     # nhóm -> các yêu cầu (theo thứ tự ban đầu)
+    group_candidates = []   # nhóm -> danh sách ứng viên
+    for request, candidates in enumerate(request_candidates):
+        key = tuple(candidates)
+        group = group_of_key.get(key)
+        if group is None:
+            group = group_of_key[key] = len(group_requests)
+            group_requests.append([])
+            group_candidates.append(key)
+        group_requests[group].append(request)
+
+    candidate_groups = {}   # ứng viên -> các nhóm tương thích
+    for group, candidates in enumerate(group_candidates):
+        for position in candidates:
+            candidate_groups.setdefault(position, []).append(group)
+
+    capacity = [len(requests) for requests in group_requests]
+    members = [[] for _ in group_requests]     # nhóm -> các ứng viên đang gán
+    owner = {}                                 # ứng viên -> nhóm đang giữ
+    remaining = sum(capacity)
+
+    def augment(position, visited):
+        """Tìm đường tăng từ ứng viên position (tìm theo chiều sâu bằng ngăn xếp, không đệ quy
+        để chuỗi nhóm dài không vượt giới hạn đệ quy)"""
+        # Mỗi khung: [ứng viên, chỉ số nhóm kế tiếp, nhóm đang xét, ô kế tiếp trong nhóm đó]
+        stack = [[position, 0, None, 0]]
+        while stack:
+            frame = stack[-1]
+            current, group = frame[0], frame[2]
+            if group is not None:
+                # Thử dời lần lượt các ứng viên đang giữ nhóm sang nhóm khác
+                if frame[3] < len(members[group]):
+                    other = members[group][frame[3]]
+                    frame[3] += 1
+                    stack.append([other, 0, None, 0])
+                else:
+                    frame[2] = None
+                continue
+            groups = candidate_groups[current]
+            while frame[1] < len(groups) and groups[frame[1]] in visited:
+                frame[1] += 1
+            if frame[1] == len(groups):
+                stack.pop()
+                continue
+            group = groups[frame[1]]
+            frame[1] += 1
+            visited.add(group)
+            if len(members[group]) < capacity[group]:
+                # Tìm được chỗ trống: gán dọc theo đường từ cuối về đầu
+                members[group].append(current)
+                owner[current] = group
+                stack.pop()
+                while stack:
+                    parent = stack.pop()
+                    members[parent[2]][parent[3] - 1] = parent[0]
+                    owner[parent[0]] = parent[2]
+                return True
+            frame[2], frame[3] = group, 0
+        return False
+
+    # Nhóm đã thăm trong một lần tìm thất bại vẫn không tới được chỗ trống cho tới
+    # khi có một lần gán thành công, nên được giữ lại giữa các lần thất bại liên tiếp
+    visited = set()
+    for position in sorted(candidate_groups, key=lambda p: (-equity[p], p)):
+        if remaining == 0:
+            break
+        if augment(position, visited):
+            remaining -= 1
+            visited = set()
+
+    # Trong mỗi nhóm, ứng viên equity cao hơn cho yêu cầu đứng trước
+    assigned = [None] * len(request_candidates)
+    for group, requests in enumerate(group_requests):
+        chosen = sorted(members[group], key=lambda p: (-equity[p], p))
+        for request, position in zip(requests, chosen):
+            assigned[request] = position
+
+    options = []
+    for request, candidates in enumerate(request_candidates):
+        spare = [position for position in candidates if position not in owner]
+        spare.sort(key=lambda p: (-equity[p], p))
+        if assigned[request] is None:
+            options.append(spare)
+        else:
+            options.append([assigned[request]] + spare)
+    return ReplacementAllocation(assigned, options)
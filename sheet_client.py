@@ -0,0 +1,283 @@
+"""
+Mô-đun truy cập Google Sheets: giữ client đã xác thực lâu dài (token, phiên
+HTTP keep-alive, handle sheet) và tải dữ liệu theo các vùng cột cần thiết
+(column-projected fetch) thay vì toàn bộ worksheet
+"""
+
+import os
+import json
+import hashlib
+import threading
+
+import gspread
+import requests
+from oauth2client.service_account import ServiceAccountCredentials
+from requests.adapters import HTTPAdapter
+
+SCOPE = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
+
+# Vùng hiển thị trên bảng: cột C đến cột P (index 2 đến 15)
+DISPLAY_START_COL = 2
+DISPLAY_END_COL = 15
+# Cột P - EndEquity (index 15)
+EQUITY_COL = 15
+
+UNFORMATTED_VALUE = "UNFORMATTED_VALUE"
+DRIVE_FILES_URL = "https://www.googleapis.com/drive/v3/files/{}"
+
+
+def column_letter(index):
+    """Chuyển index cột (0, 1, 2...) sang chữ cột (A, B, C... AA, AB...)"""
+    letters = ""
+    index += 1
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def column_spans(column_indexes):
+    """Gộp các index cột thành các khoảng liên tiếp [(đầu, cuối), ...]"""
+    spans = []
+    for index in sorted(set(i for i in column_indexes if i is not None and i >= 0)):
+        if spans and index == spans[-1][1] + 1:
+            spans[-1] = (spans[-1][0], index)
+        else:
+            spans.append((index, index))
+    return spans
+
+
+def cell_text(value):
+    """Chuyển giá trị chưa định dạng (số, bool...) từ API về chuỗi như khi hiển thị"""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def merge_projected_values(spans, range_values, numeric_columns=(EQUITY_COL,)):
+    """Ghép kết quả của từng vùng cột thành các hàng theo đúng vị trí cột gốc
+
+    Các cột không được tải để trống (""). Giống get_all_values(), các hàng được
+    đệm cho đủ độ dài tới cột cuối cùng có dữ liệu. Cột số (equity) giữ nguyên
+    giá trị số, các cột khác được chuyển về chuỗi.
+    """
+    row_count = max((len(values) for values in range_values), default=0)
+    width = 0
+    for (start, _), values in zip(spans, range_values):
+        for row in values:
+            if row:
+                width = max(width, start + len(row))
+
+    rows = [[""] * width for _ in range(row_count)]
+    for (start, end), values in zip(spans, range_values):
+        for r, row in enumerate(values):
+            target = rows[r]
+            for offset, value in enumerate(row[:end - start + 1]):
+                col = start + offset
+                if col in numeric_columns and isinstance(value, (int, float)) and not isinstance(value, bool):
+                    target[col] = value
+                else:
+                    target[col] = cell_text(value)
+    return rows
+
+
+def fetch_projected_values(worksheet, column_indexes):
+    """Tải chỉ các cột cần thiết trong một lần gọi batch_get (giá trị chưa định dạng)"""
+    spans = column_spans(column_indexes)
+    if not spans:
+        return []
+    ranges = [f"{column_letter(start)}:{column_letter(end)}" for start, end in spans]
+    range_values = worksheet.batch_get(ranges, value_render_option=UNFORMATTED_VALUE)
+    return merge_projected_values(spans, range_values)
+
+
+def fetch_values_paged(worksheet, column_indexes=None, page_size=2000):
+    """Tải worksheet theo từng trang page_size hàng (mỗi trang một lần gọi batch_get)
+
+    Trả về generator các trang hàng thô. Mỗi trang được đệm đủ số hàng của vùng
+    (API bỏ các hàng trống cuối vùng) để vị trí hàng không bị lệch giữa các trang.
+    column_indexes=None tải tất cả các cột (giá trị đã định dạng như get_all_values).
+    """
+    spans = column_spans(column_indexes) if column_indexes else None
+    if column_indexes and not spans:
+        return
+    row_count = getattr(worksheet, "row_count", None)
+    last_col = column_letter(max(1, getattr(worksheet, "col_count", 26) or 26) - 1)
+    start = 1
+    while row_count is None or start <= row_count:
+        end = start + page_size - 1
+        if row_count is not None:
+            end = min(end, row_count)
+        if spans:
+            ranges = [f"{column_letter(a)}{start}:{column_letter(b)}{end}" for a, b in spans]
+            page = merge_projected_values(spans, worksheet.batch_get(ranges, value_render_option=UNFORMATTED_VALUE))
+        else:
+            page = [list(row) for row in worksheet.batch_get([f"A{start}:{last_col}{end}"])[0]]
+        if not page and row_count is None:
+            return
+        page.extend([] for _ in range(end - start + 1 - len(page)))
+        yield page
+        start = end + 1
+
+
+def source_key(sheet_url, worksheet_name):
+    """Khóa chuỗi của một nguồn (URL sheet, worksheet), dùng được làm khóa JSON"""
+    return f"{sheet_url}\n{worksheet_name}"
+
+
+def drive_modified_time(spreadsheet):
+    """Thời điểm sửa đổi cuối của spreadsheet theo Drive API (None nếu không hỗ trợ)
+
+    gspread 6 có sẵn get_lastUpdateTime(); với gspread 5 gọi thẳng Drive files.get
+    (chỉ lấy trường modifiedTime) qua phiên HTTP đã xác thực của client.
+    """
+    getter = getattr(spreadsheet, "get_lastUpdateTime", None)
+    if getter is not None:
+        return getter()
+    session = _client_session(getattr(spreadsheet, "client", None))
+    if session is None or not getattr(spreadsheet, "id", None):
+        return None
+    response = session.get(DRIVE_FILES_URL.format(spreadsheet.id),
+                           params={"fields": "modifiedTime", "supportsAllDrives": "true"})
+    response.raise_for_status()
+    return response.json().get("modifiedTime")
+
+
+def sentinel_hash(worksheet, sentinel_range):
+    """Mã băm của một vùng ô nhỏ (sentinel) do người dùng chọn, ví dụ ô ghi thời điểm cập nhật"""
+    values = worksheet.batch_get([sentinel_range], value_render_option=UNFORMATTED_VALUE)
+    payload = json.dumps(values, default=str, ensure_ascii=False)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def probe_revision(spreadsheet, worksheet, sentinel_range=None):
+    """Dấu hiệu phiên bản rẻ của một worksheet, None nếu không xác định được
+
+    Ưu tiên modifiedTime của Drive (một request metadata cho cả spreadsheet),
+    nếu không lấy được thì băm vùng sentinel (nếu có cấu hình).
+    """
+    try:
+        modified = drive_modified_time(spreadsheet)
+        if modified:
+            return f"drive:{modified}"
+    except Exception as e:
+        print(f"Không lấy được modifiedTime từ Drive: {str(e)}")
+    if sentinel_range:
+        try:
+            return f"sentinel:{sentinel_range}:{sentinel_hash(worksheet, sentinel_range)}"
+        except Exception as e:
+            print(f"Không đọc được vùng sentinel {sentinel_range}: {str(e)}")
+    return None
+
+
+def _client_session(client):
+    """Lấy phiên HTTP của client gspread (gspread 5: client.session, gspread 6: client.http_client.session)"""
+    http_client = getattr(client, "http_client", None)
+    if http_client is not None and getattr(http_client, "session", None) is not None:
+        return http_client.session
+    return getattr(client, "session", None)
+
+
+class GoogleClientManager:
+    """Client Google Sheets dùng lâu dài giữa các lần làm mới dữ liệu
+
+    - Chỉ đọc credentials.json và xác thực lại khi tệp thay đổi
+    - Giữ access token cho tới khi hết hạn (chỉ làm mới khi cần)
+    - Dùng chung một phiên HTTP có pool kết nối keep-alive
+    - Lưu handle spreadsheet/worksheet để không phải open_by_url mỗi lần
+    """
+
+    def __init__(self, creds_path, pool_size=8):
+        self.creds_path = creds_path
+        self.pool_size = pool_size
+        self._lock = threading.RLock()
+        self._client = None
+        self._creds_mtime = None
+        self._token_session = None
+        self._spreadsheets = {}   # URL -> Spreadsheet
+        self._worksheets = {}     # (URL, tên worksheet) -> Worksheet
+        self.stats = {"authorize": 0, "token_refresh": 0, "open_spreadsheet": 0, "open_worksheet": 0}
+
+    def _authorize(self, mtime):
+        credentials = ServiceAccountCredentials.from_json_keyfile_name(self.creds_path, SCOPE)
+        client = gspread.authorize(credentials)
+        session = _client_session(client)
+        if session is not None:
+            # Pool kết nối keep-alive dùng chung cho mọi request tới Google
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+            session.mount("https://", adapter)
+        self._client = client
+        self._creds_mtime = mtime
+        self._spreadsheets.clear()
+        self._worksheets.clear()
+        self.stats["authorize"] += 1
+        print("Đã xác thực Google Sheets API (client dùng lại cho các lần sau)")
+
+    def _credentials(self):
+        session = _client_session(self._client)
+        return getattr(session, "credentials", None)
+
+    def _ensure_token(self):
+        """Làm mới access token chỉ khi chưa có hoặc đã hết hạn"""
+        credentials = self._credentials()
+        if credentials is None or credentials.valid:
+            return
+        from google.auth.transport.requests import Request
+        if self._token_session is None:
+            self._token_session = requests.Session()
+            self._token_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        credentials.refresh(Request(session=self._token_session))
+        self.stats["token_refresh"] += 1
+        print(f"Đã làm mới access token (hết hạn lúc {credentials.expiry})")
+
+    def client(self):
+        """Client gspread đã xác thực, tạo lại khi credentials.json thay đổi"""
+        with self._lock:
+            mtime = os.path.getmtime(self.creds_path)
+            if self._client is None or mtime != self._creds_mtime:
+                self._authorize(mtime)
+            self._ensure_token()
+            return self._client
+
+    def spreadsheet(self, sheet_url):
+        """Handle spreadsheet theo URL (được lưu lại sau lần mở đầu tiên)"""
+        client = self.client()
+        with self._lock:
+            sheet = self._spreadsheets.get(sheet_url)
+            if sheet is None:
+                sheet = client.open_by_url(sheet_url)
+                self._spreadsheets[sheet_url] = sheet
+                self.stats["open_spreadsheet"] += 1
+            return sheet
+
+    def worksheet(self, sheet_url, worksheet_name):
+        """Handle worksheet theo (URL, tên) (được lưu lại sau lần mở đầu tiên)"""
+        key = (sheet_url, worksheet_name)
+        with self._lock:
+            worksheet = self._worksheets.get(key)
+            if worksheet is not None:
+                self._ensure_token()
+                return worksheet
+        sheet = self.spreadsheet(sheet_url)
+        with self._lock:
+            worksheet = self._worksheets.get(key)
+            if worksheet is None:
+                worksheet = sheet.worksheet(worksheet_name)
+                self._worksheets[key] = worksheet
+                self.stats["open_worksheet"] += 1
+            return worksheet
+
+    def invalidate(self, sheet_url=None):
+        """Bỏ các handle đã lưu (ví dụ khi sheet bị đổi tên/xóa hoặc request lỗi)"""
+        with self._lock:
+            if sheet_url is None:
+                self._spreadsheets.clear()
+                self._worksheets.clear()
+                return
+            self._spreadsheets.pop(sheet_url, None)
+            for key in [k for k in self._worksheets if k[0] == sheet_url]:
+                del self._worksheets[key]
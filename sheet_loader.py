@@ -0,0 +1,300 @@
+"""
+Mô-đun tải dữ liệu tài khoản (Google Sheet hoặc nguồn cục bộ) trên luồng nền
+(QThread) để giao diện không bị treo trong lúc xác thực, mở nguồn và tải dữ liệu
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from account_table import AccountTableBuilder
+from sheet_sync import SheetSnapshot, snapshot_from_values, row_hash, row_key
+
+# Số worksheet được tải song song tối đa
+MAX_PARALLEL_SOURCES = 4
+
+# Các giai đoạn tải và phần trăm tiến độ tương ứng
+STAGE_AUTH = "auth"
+STAGE_OPEN = "open"
+STAGE_PROBE = "probe"
+STAGE_FETCH = "fetch"
+STAGE_INDEX = "index"
+STAGE_RENDER = "render"
+
+STAGE_PROGRESS = {
+    STAGE_AUTH: (10, "🔐 Đang xác thực/kết nối nguồn dữ liệu..."),
+    STAGE_OPEN: (30, "📂 Đang mở nguồn dữ liệu..."),
+    STAGE_PROBE: (40, "🔎 Đang kiểm tra dữ liệu có thay đổi không..."),
+    STAGE_FETCH: (50, "⬇️ Đang tải dữ liệu..."),
+    STAGE_INDEX: (80, "🧮 Đang lập chỉ mục dữ liệu..."),
+    STAGE_RENDER: (90, "🖥️ Đang hiển thị dữ liệu..."),
+}
+
+
+class LoadCancelled(Exception):
+    """Người dùng đã hủy quá trình tải"""
+
+
+class SheetLoadResult:
+    """Dữ liệu đã tải xong, được chuyển nguyên khối sang luồng giao diện"""
+
+    def __init__(self, worksheet, all_values, header_row, snapshot, row_sources=None, merge_report=None,
+                 revisions=None, unchanged=False, table=None):
+        self.worksheet = worksheet
+        self.all_values = all_values            # None khi tải theo trang (dữ liệu nằm trong table)
+        self.table = table                      # AccountTable đã dựng sẵn khi tải theo trang
+        self.header_row = header_row
+        self.snapshot = snapshot
+        self.row_sources = row_sources or []    # Nguồn (nhãn worksheet) của từng hàng dữ liệu
+        self.merge_report = merge_report or {}
+        self.revisions = revisions or {}        # source_key -> dấu hiệu phiên bản lúc tải
+        self.unchanged = unchanged              # True: sheet không đổi, không tải dữ liệu
+
+
+class SourceMerger:
+    """Gộp dần các hàng của nhiều nguồn (dùng cho cả tải một lần và tải theo trang)
+
+    Các hàng trước hàng tiêu đề và hàng tiêu đề lấy từ nguồn đầu tiên có dữ liệu.
+    Hàng trùng Login ID với một hàng đã nhận trước đó bị bỏ qua.
+    """
+
+    def __init__(self, header_row, key_index):
+        self.header_row = header_row
+        self.key_index = key_index
+        self.header_rows = None
+        self._seen = set()
+        self.report = {"counts": {}, "duplicates": 0, "header_mismatch": []}
+
+    def start_source(self, label, header_rows):
+        """Ghi nhận các hàng tiêu đề của một nguồn, False nếu nguồn không đủ hàng tiêu đề"""
+        self.report["counts"][label] = 0
+        if len(header_rows) < self.header_row:
+            return False
+        if self.header_rows is None:
+            self.header_rows = [list(row) for row in header_rows[:self.header_row]]
+        elif list(header_rows[self.header_row - 1]) != self.header_rows[self.header_row - 1]:
+            self.report["header_mismatch"].append(label)
+        return True
+
+    def add_rows(self, label, rows):
+        """Các hàng dữ liệu được giữ lại (không trùng Login ID) của nguồn label"""
+        kept = []
+        for row in rows:
+            key = row_key(row, self.key_index)
+            if key:
+                if key in self._seen:
+                    self.report["duplicates"] += 1
+                    continue
+                self._seen.add(key)
+            kept.append(row)
+        self.report["counts"][label] += len(kept)
+        return kept
+
+
+def merge_source_values(source_values, header_row, key_index):
+    """Gộp dữ liệu của nhiều worksheet thành một bảng duy nhất
+
+    source_values là list (nhãn nguồn, all_values) theo thứ tự cấu hình. Các hàng
+    trước hàng tiêu đề và hàng tiêu đề lấy từ nguồn đầu tiên có dữ liệu. Hàng trùng
+    Login ID với một nguồn đứng trước bị bỏ qua. Trả về (all_values, row_sources, report).
+    """
+    merger = SourceMerger(header_row, key_index)
+    data_rows = []
+    row_sources = []
+    for label, values in source_values:
+        if not values or not merger.start_source(label, values[:header_row]):
+            continue
+        kept = merger.add_rows(label, values[header_row:])
+        data_rows.extend(kept)
+        row_sources.extend([label] * len(kept))
+    if merger.header_rows is None:
+        return [], row_sources, merger.report
+    return merger.header_rows + data_rows, row_sources, merger.report
+
+
+class SheetLoadWorker(QObject):
+    """Worker chạy trong QThread: xác thực, mở nguồn, tải và lập chỉ mục dữ liệu"""
+
+    progress = pyqtSignal(str, int, str)   # (giai đoạn, phần trăm, thông điệp)
+    rows_ready = pyqtSignal(object, object, str)  # (header hiển thị, [(vị trí, giá trị)], nguồn) khi tải theo trang
+    finished = pyqtSignal(object)          # SheetLoadResult
+    failed = pyqtSignal(str, str)          # (thông điệp lỗi, loại lỗi)
+    cancelled = pyqtSignal()
+
+    def __init__(self, sources, header_row, login_col_index,
+                 column_indexes=None, max_workers=MAX_PARALLEL_SOURCES,
+                 probe=True, known_revisions=None, page_size=0, table_config=None,
+                 branch_extractor=None):
+        super().__init__()
+        self.sources = list(sources)          # Các DataSource cần tải, nguồn đầu là nguồn chính
+        self.max_workers = max_workers
+        self.header_row = header_row
+        self.login_col_index = login_col_index
+        self.column_indexes = column_indexes  # None = tải toàn bộ worksheet
+        self.probe = probe                    # Kiểm tra phiên bản trước khi tải toàn bộ
+        self.known_revisions = known_revisions or {}  # Phiên bản của dữ liệu đang có
+        # page_size > 0: tải theo trang và dựng AccountTable ngay trên luồng nền
+        self.page_size = page_size if table_config is not None else 0
+        self.table_config = table_config
+        self.branch_extractor = branch_extractor
+        self._cancel_requested = False
+
+    def cancel(self):
+        """Yêu cầu hủy; được kiểm tra giữa các giai đoạn tải"""
+        self._cancel_requested = True
+
+    def is_cancelled(self):
+        return self._cancel_requested
+
+    def _stage(self, stage):
+        if self._cancel_requested:
+            raise LoadCancelled()
+        percent, message = STAGE_PROGRESS[stage]
+        self.progress.emit(stage, percent, message)
+
+    def _open_source(self, source):
+        if self._cancel_requested:
+            raise LoadCancelled()
+        source.open()
+
+    def _probe_source(self, source):
+        if self._cancel_requested:
+            raise LoadCancelled()
+        return source.probe_revision()
+
+    def _fetch_source(self, source):
+        if self._cancel_requested:
+            raise LoadCancelled()
+        return source.fetch_values(self.column_indexes, self.header_row)
+
+    def _run_parallel(self, func, items):
+        """Chạy func cho từng nguồn trên thread pool giới hạn, giữ nguyên thứ tự kết quả"""
+        if len(items) == 1:
+            return [func(items[0])]
+        results = [None] * len(items)
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(items)))) as pool:
+            futures = {pool.submit(func, item): i for i, item in enumerate(items)}
+            try:
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+        return results
+
+    def run(self):
+        try:
+            # Xác thực/mở sheet chỉ tốn chi phí ở lần đầu, các lần sau dùng lại client và handle
+            self._stage(STAGE_AUTH)
+            for source in self.sources:
+                source.connect()
+
+            self._stage(STAGE_OPEN)
+            self._run_parallel(self._open_source, self.sources)
+            handle = self.sources[0].handle
+
+            revisions = {}
+            if self.probe:
+                self._stage(STAGE_PROBE)
+                probed = self._run_parallel(self._probe_source, self.sources)
+                revisions = {source.key: token for source, token in zip(self.sources, probed) if token}
+                # Chỉ bỏ qua tải khi mọi nguồn đều có phiên bản và trùng với dữ liệu đang có
+                if (self.known_revisions and len(revisions) == len(self.sources)
+                        and revisions == self.known_revisions):
+                    if self._cancel_requested:
+                        raise LoadCancelled()
+                    self.finished.emit(SheetLoadResult(handle, None, self.header_row, None,
+                                                       revisions=revisions, unchanged=True))
+                    return
+
+            self._stage(STAGE_FETCH)
+            if self.page_size:
+                self._stream_sources(handle, revisions)
+                return
+            fetched = self._run_parallel(self._fetch_source, self.sources)
+
+            self._stage(STAGE_INDEX)
+            primary_location = self.sources[0].location
+            row_sources = []
+            merge_report = {}
+            if len(self.sources) == 1:
+                all_values = fetched[0]
+            else:
+                labelled = [(source.label(primary_location), values)
+                            for source, values in zip(self.sources, fetched)]
+                all_values, row_sources, merge_report = merge_source_values(
+                    labelled, self.header_row, self.login_col_index)
+            if not row_sources and all_values:
+                label = self.sources[0].label()
+                row_sources = [label] * max(0, len(all_values) - self.header_row)
+            snapshot = None
+            if all_values and len(all_values) > self.header_row:
+                snapshot = snapshot_from_values(all_values, self.header_row, self.login_col_index)
+
+            if self._cancel_requested:
+                raise LoadCancelled()
+            self.finished.emit(SheetLoadResult(handle, all_values, self.header_row, snapshot,
+                                               row_sources, merge_report, revisions))
+        except LoadCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            print(f"Lỗi khi tải dữ liệu trên luồng nền: {str(e)}")
+            self.failed.emit(str(e), type(e).__name__)
+
+    def _stream_sources(self, handle, revisions):
+        """Tải lần lượt từng nguồn theo trang, phân tích mỗi trang thẳng vào AccountTableBuilder
+
+        Mỗi trang được gửi sang giao diện (rows_ready) để hiển thị dần rồi bỏ đi,
+        nên bộ nhớ tạm chỉ phụ thuộc kích thước trang thay vì kích thước sheet.
+        """
+        multiple = len(self.sources) > 1
+        primary_location = self.sources[0].location
+        # Chỉ khử trùng Login ID khi gộp nhiều nguồn (giống tải một lần)
+        merger = SourceMerger(self.header_row, self.login_col_index if multiple else None)
+        builder = None
+        keys = []
+        hashes = []
+        for source in self.sources:
+            label = source.label(primary_location) if multiple else source.label()
+            header_rows = []
+            started = False
+            for page in source.iter_pages(self.column_indexes, self.header_row, self.page_size):
+                if self._cancel_requested:
+                    raise LoadCancelled()
+                if not started:
+                    need = self.header_row - len(header_rows)
+                    header_rows.extend(page[:need])
+                    page = page[need:]
+                    if len(header_rows) < self.header_row:
+                        continue
+                    started = merger.start_source(label, header_rows)
+                    if builder is None:
+                        builder = AccountTableBuilder(merger.header_rows, self.header_row, self.table_config,
+                                                      self.branch_extractor)
+                rows = merger.add_rows(label, page)
+                if not rows:
+                    continue
+                keys.extend(row_key(row, self.login_col_index) for row in rows)
+                hashes.extend(row_hash(row) for row in rows)
+                shown = builder.append(rows, label)
+                if shown:
+                    self.rows_ready.emit(builder.display_headers, shown, label)
+                percent, _ = STAGE_PROGRESS[STAGE_FETCH]
+                self.progress.emit(STAGE_FETCH, percent, f"⬇️ Đã tải {len(builder)} hàng ({label})...")
+            if not started:
+                merger.start_source(label, header_rows)
+
+        self._stage(STAGE_INDEX)
+        table = None
+        snapshot = None
+        if builder is not None:
+            table = builder.build()
+            if len(table):
+                header = [self.header_row] + list(merger.header_rows[self.header_row - 1])
+                snapshot = SheetSnapshot(header, keys, hashes, self.login_col_index)
+        if self._cancel_requested:
+            raise LoadCancelled()
+        row_sources = table.row_sources if table is not None else None
+        self.finished.emit(SheetLoadResult(handle, None, self.header_row, snapshot, row_sources,
+                                           merger.report if multiple else None, revisions, table=table))
@@ -0,0 +1,165 @@
+"""
+Mô-đun đồng bộ tăng dần dữ liệu Google Sheet: so sánh lần tải mới với
+snapshot của lần tải trước theo từng hàng (mã băm hàng + Login ID)
+"""
+
+import hashlib
+
+# Độ dài mã băm của mỗi hàng (byte)
+HASH_SIZE = 8
+
+
+def row_hash(row):
+    """Tính mã băm ổn định cho một hàng (bỏ qua các ô trống ở cuối hàng)"""
+    values = ["" if value is None else str(value) for value in row]
+    while values and values[-1] == "":
+        values.pop()
+    joined = "\x1f".join(values)
+    return hashlib.blake2b(joined.encode("utf-8"), digest_size=HASH_SIZE).digest()
+
+
+def row_key(row, key_index):
+    """Lấy Login ID của hàng làm khóa định danh, rỗng nếu không có"""
+    if key_index is None or key_index < 0 or key_index >= len(row):
+        return ""
+    value = row[key_index]
+    return "" if value is None else str(value).strip()
+
+
+class SheetSnapshot:
+    """Snapshot gọn nhẹ của một lần tải: chỉ giữ header, khóa và mã băm từng hàng"""
+
+    def __init__(self, header, keys, hashes, key_index):
+        self.header = tuple("" if h is None else str(h) for h in header)
+        self.keys = keys
+        self.hashes = hashes
+        self.key_index = key_index
+
+    @classmethod
+    def from_rows(cls, header, rows, key_index):
+        """Tạo snapshot từ danh sách hàng dữ liệu (không gồm hàng tiêu đề)"""
+        keys = [row_key(row, key_index) for row in rows]
+        hashes = [row_hash(row) for row in rows]
+        return cls(header, keys, hashes, key_index)
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def to_state(self):
+        """Dạng lưu được bằng JSON (kèm dữ liệu lưu tạm) để lần khởi động sau không phải băm lại"""
+        return {"header": list(self.header), "keys": list(self.keys),
+                "hashes": b"".join(self.hashes).hex(), "key_index": self.key_index}
+
+    @classmethod
+    def from_state(cls, state, header_row, key_index):
+        """Khôi phục snapshot từ to_state(), None nếu không có hoặc khác hàng tiêu đề/cột Login ID"""
+        if not state or state.get("key_index") != key_index:
+            return None
+        header = state.get("header") or []
+        if not header or header[0] != str(header_row):
+            return None
+        data = bytes.fromhex(state.get("hashes", ""))
+        hashes = [data[i:i + HASH_SIZE] for i in range(0, len(data), HASH_SIZE)]
+        keys = state.get("keys") or []
+        if len(keys) != len(hashes):
+            return None
+        return cls(header, keys, hashes, key_index)
+
+
+def snapshot_from_values(all_values, header_row, key_index):
+    """Tạo snapshot từ toàn bộ dữ liệu sheet (header_row tính từ 1)"""
+    header = [header_row] + list(all_values[header_row - 1])
+    return SheetSnapshot.from_rows(header, all_values[header_row:], key_index)
+
+
+class SheetDiff:
+    """Kết quả so sánh hai snapshot: các hàng thêm mới, thay đổi và bị xóa"""
+
+    def __init__(self):
+        self.inserted = []      # Vị trí hàng trong dữ liệu mới
+        self.changed = []       # Cặp (vị trí cũ, vị trí mới)
+        self.deleted = []       # Vị trí hàng trong dữ liệu cũ
+        self.old_to_new = {}    # Vị trí cũ -> vị trí mới của các hàng được giữ lại
+        self.unchanged = 0
+        self.inserted_keys = []
+        self.changed_keys = []
+        self.deleted_keys = []
+        self.requires_full_reload = False
+        self.reason = ""
+
+    def has_changes(self):
+        return bool(self.inserted or self.changed or self.deleted)
+
+    def summary(self):
+        """Tóm tắt ngắn gọn những gì đã thay đổi"""
+        if self.requires_full_reload:
+            return f"Tải lại toàn bộ ({self.reason})"
+        return (f"+{len(self.inserted)} thêm, ~{len(self.changed)} thay đổi, "
+                f"-{len(self.deleted)} xóa, {self.unchanged} không đổi")
+
+    def details(self, limit=10):
+        """Liệt kê các Login ID bị ảnh hưởng (tối đa limit mỗi loại)"""
+        lines = []
+        for label, keys in (("Thêm", self.inserted_keys),
+                            ("Thay đổi", self.changed_keys),
+                            ("Xóa", self.deleted_keys)):
+            named = [k for k in keys if k]
+            if not keys:
+                continue
+            text = ", ".join(named[:limit])
+            if len(named) > limit:
+                text += f", ... (+{len(named) - limit})"
+            unnamed = len(keys) - len(named)
+            if unnamed:
+                text += f"{', ' if named else ''}{unnamed} hàng không có Login ID"
+            lines.append(f"{label}: {text}")
+        return lines
+
+
+def diff_snapshots(old, new):
+    """So sánh hai snapshot theo Login ID (hoặc mã băm với hàng không có Login ID)"""
+    diff = SheetDiff()
+    if old is None:
+        diff.requires_full_reload = True
+        diff.reason = "chưa có dữ liệu trước đó"
+        return diff
+    if old.header != new.header or old.key_index != new.key_index:
+        diff.requires_full_reload = True
+        diff.reason = "hàng tiêu đề hoặc cấu hình cột đã thay đổi"
+        return diff
+
+    # Gom vị trí cũ theo khóa; hàng không có Login ID được nhận diện bằng mã băm
+    old_positions = {}
+    for pos, (key, digest) in enumerate(zip(old.keys, old.hashes)):
+        ident = ("k", key) if key else ("h", digest)
+        old_positions.setdefault(ident, []).append(pos)
+    cursor = {ident: 0 for ident in old_positions}
+
+    retained_order = []
+    for new_pos, (key, digest) in enumerate(zip(new.keys, new.hashes)):
+        ident = ("k", key) if key else ("h", digest)
+        candidates = old_positions.get(ident)
+        if candidates and cursor[ident] < len(candidates):
+            old_pos = candidates[cursor[ident]]
+            cursor[ident] += 1
+            diff.old_to_new[old_pos] = new_pos
+            retained_order.append(old_pos)
+            if old.hashes[old_pos] == digest:
+                diff.unchanged += 1
+            else:
+                diff.changed.append((old_pos, new_pos))
+                diff.changed_keys.append(key)
+        else:
+            diff.inserted.append(new_pos)
+            diff.inserted_keys.append(key)
+
+    for old_pos in range(len(old)):
+        if old_pos not in diff.old_to_new:
+            diff.deleted.append(old_pos)
+            diff.deleted_keys.append(old.keys[old_pos])
+
+    # Các hàng giữ lại phải giữ nguyên thứ tự tương đối, nếu không thì tải lại toàn bộ
+    if any(a > b for a, b in zip(retained_order, retained_order[1:])):
+        diff.requires_full_reload = True
+        diff.reason = "thứ tự các hàng đã thay đổi"
+    return diff
@@ -0,0 +1,171 @@
+"""
+Mô-đun lưu tạm dữ liệu sheet ra đĩa dưới dạng snapshot theo cột,
+đọc lại bằng memory-map để hiển thị ngay khi khởi động
+"""
+
+import os
+import json
+import mmap
+import time
+import struct
+import hashlib
+
+# Định dạng tệp:
+#   MAGIC (8 byte) | độ dài header (uint32) | header JSON (utf-8) | các khối cột
+# Mỗi khối cột là các giá trị của cột nối bằng ký tự NUL rồi mã hóa utf-8,
+# nhờ vậy mỗi cột chỉ cần một lần decode + split khi đọc lại.
+MAGIC = b"JVSNAP1\x00"
+CACHE_DIR_NAME = "sheet_cache"
+_SEPARATOR = "\x00"
+
+
+def cache_path(base_dir, sheet_url, worksheet):
+    """Đường dẫn tệp snapshot ứng với cặp (URL sheet, tên worksheet)"""
+    digest = hashlib.sha1(f"{sheet_url}\n{worksheet}".encode("utf-8")).hexdigest()[:16]
+    return os.path.join(base_dir, CACHE_DIR_NAME, f"{digest}.snap")
+
+
+def save_snapshot(path, sheet_url, worksheet, rows, extra=None):
+    """Ghi toàn bộ dữ liệu (list các hàng) ra tệp snapshot theo cột
+
+    extra là dict thông tin phụ (có thể serialize JSON) lưu kèm trong header.
+    """
+    width = max((len(row) for row in rows), default=0)
+    columns = ([row[col] if col < len(row) else "" for row in rows] for col in range(width))
+    save_snapshot_columns(path, sheet_url, worksheet, columns, [len(row) for row in rows], extra)
+
+
+def save_snapshot_columns(path, sheet_url, worksheet, columns, row_lengths, extra=None):
+    """Ghi dữ liệu đã ở dạng cột (mỗi cột là một list giá trị, đủ số hàng) ra tệp snapshot
+
+    columns có thể là generator để chỉ giữ một cột trong bộ nhớ mỗi lần.
+    """
+    blocks = []
+    for column in columns:
+        values = []
+        for value in column:
+            value = "" if value is None else str(value)
+            values.append(value.replace(_SEPARATOR, ""))
+        blocks.append(_SEPARATOR.join(values).encode("utf-8"))
+
+    offsets = []
+    offset = 0
+    for block in blocks:
+        offsets.append([offset, len(block)])
+        offset += len(block)
+    header = json.dumps({
+        "sheet_url": sheet_url,
+        "worksheet": worksheet,
+        "rows": len(row_lengths),
+        "cols": len(blocks),
+        "row_lengths": list(row_lengths),
+        "saved_at": time.time(),
+        "extra": extra or {},
+        "columns": offsets
+    }, ensure_ascii=False).encode("utf-8")
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        for block in blocks:
+            f.write(block)
+    # Thay thế nguyên tử để không bao giờ đọc phải tệp ghi dở
+    os.replace(tmp_path, path)
+
+
+class SnapshotReader:
+    """Đọc snapshot qua memory-map; các cột chỉ được giải mã khi cần"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        try:
+            if self._mm[:len(MAGIC)] != MAGIC:
+                raise ValueError("Tệp snapshot không hợp lệ")
+            header_len = struct.unpack_from("<I", self._mm, len(MAGIC))[0]
+            header_start = len(MAGIC) + 4
+            self.header = json.loads(self._mm[header_start:header_start + header_len].decode("utf-8"))
+            self._data_start = header_start + header_len
+        except Exception:
+            self.close()
+            raise
+
+    @property
+    def sheet_url(self):
+        return self.header.get("sheet_url", "")
+
+    @property
+    def worksheet(self):
+        return self.header.get("worksheet", "")
+
+    @property
+    def saved_at(self):
+        return self.header.get("saved_at", 0)
+
+    @property
+    def extra(self):
+        return self.header.get("extra") or {}
+
+    @property
+    def row_count(self):
+        return self.header.get("rows", 0)
+
+    @property
+    def column_count(self):
+        return self.header.get("cols", 0)
+
+    @property
+    def row_lengths(self):
+        """Độ dài gốc của từng hàng"""
+        return self.header.get("row_lengths") or [self.column_count] * self.row_count
+
+    def column(self, index):
+        """Giải mã một cột thành list chuỗi (độ dài bằng số hàng)"""
+        offset, length = self.header["columns"][index]
+        start = self._data_start + offset
+        if self.row_count == 0:
+            return []
+        return self._mm[start:start + length].decode("utf-8").split(_SEPARATOR)
+
+    def rows(self):
+        """Dựng lại dữ liệu theo hàng, giữ nguyên độ dài gốc của từng hàng"""
+        columns = [self.column(i) for i in range(self.column_count)]
+        row_lengths = self.row_lengths
+        if not columns:
+            return [[] for _ in range(self.row_count)]
+        return [list(values[:length]) for values, length in zip(zip(*columns), row_lengths)]
+
+    def close(self):
+        try:
+            self._mm.close()
+        finally:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def load_snapshot_columns(path, sheet_url, worksheet, column_indexes):
+    """Đọc snapshot nếu tồn tại và đúng sheet, chỉ giải mã các cột cần dùng
+
+    Trả về (row_lengths, {index cột: list giá trị}, saved_at, extra) hoặc None. Dữ liệu giữ
+    nguyên dạng cột (không dựng lại từng hàng); cột không có trong tệp bị bỏ qua.
+    """
+    if not os.path.exists(path):
+        return None
+    with SnapshotReader(path) as reader:
+        if reader.sheet_url != sheet_url or reader.worksheet != worksheet:
+            return None
+        columns = {col: reader.column(col) for col in column_indexes if 0 <= col < reader.column_count}
+        return reader.row_lengths, columns, reader.saved_at, reader.extra
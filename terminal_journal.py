@@ -0,0 +1,344 @@
+"""
+Mô-đun theo dõi nhật ký (Journal) của terminal MT4/MT5 để biết đăng nhập có thực sự thành
+công: đọc nối tiếp các tệp <thư mục dữ liệu>/logs/YYYYMMDD.log của từng terminal đang chạy,
+mỗi lần chỉ đọc phần mới được ghi thêm (nhớ vị trí đã đọc của từng tệp, không đọc lại từ đầu),
+và nhận ra các sự kiện:
+    authorized          # '12345678': authorized on ICMarketsSC-Demo through Access Server #2
+    connected           # '12345678': connected to ICMarketsSC-Demo
+    invalid_account     # '12345678': invalid account
+                        # '51234567': authorization on Exness-MT5Real8 failed (Invalid account)
+
+Chạy thử với thư mục nhật ký mẫu (không cần Windows):
+    python terminal_journal.py [--from-start] <thư mục dữ liệu> [<thư mục dữ liệu> ...]
+    python terminal_journal.py --from-start journal_samples/mt4 journal_samples/mt5
+"""
+
+import os
+import re
+import sys
+import time
+import codecs
+import threading
+from collections import deque, namedtuple
+
+JOURNAL_AUTHORIZED = "authorized"
+JOURNAL_CONNECTED = "connected"
+JOURNAL_INVALID_ACCOUNT = "invalid_account"
+
+# Thời gian chờ mặc định (giây) cho sự kiện đăng nhập sau khi nhấn Enter
+JOURNAL_TIMEOUT = 5.0
+# Chu kỳ đọc nhật ký (giây)
+JOURNAL_POLL_INTERVAL = 0.5
+# Số sự kiện gần nhất được giữ lại (chung cho mọi terminal) để wait_for_login đối chiếu
+JOURNAL_HISTORY_SIZE = 100
+
+# Một sự kiện trong nhật ký của terminal key
+JournalEvent = namedtuple("JournalEvent", ["key", "event", "login_id", "server", "line"])
+
+_LOGIN_PATTERN = re.compile(r"'(\d{3,12})'\s*:\s*(.*)")
+_INVALID_ACCOUNT_PATTERN = re.compile(r"invalid account", re.IGNORECASE)
+_AUTHORIZED_PATTERN = re.compile(r"\bauthorized on\s+'?([^\s']+)", re.IGNORECASE)
+_CONNECTED_PATTERN = re.compile(r"\bconnected to\s+'?([^\s']+)", re.IGNORECASE)
+_FAILED_SERVER_PATTERN = re.compile(r"\bon\s+'?([^\s']+)'?\s+failed", re.IGNORECASE)
+
+
+def parse_journal_line(line):
+    """(sự kiện, login_id, server) của một dòng nhật ký, None nếu dòng không phải sự kiện đăng nhập"""
+    match = _LOGIN_PATTERN.search(line)
+    login_id, message = (match.group(1), match.group(2)) if match else ("", line)
+    if _INVALID_ACCOUNT_PATTERN.search(message):
+        server = _FAILED_SERVER_PATTERN.search(message)
+        return JOURNAL_INVALID_ACCOUNT, login_id, server.group(1) if server else ""
+    server = _AUTHORIZED_PATTERN.search(message)
+    if server:
+        return JOURNAL_AUTHORIZED, login_id, server.group(1)
+    server = _CONNECTED_PATTERN.search(message)
+    if server:
+        return JOURNAL_CONNECTED, login_id, server.group(1)
+    return None
+
+
+def _read_text(path):
+    """Nội dung tệp văn bản nhỏ (UTF-16 có BOM như MT5 ghi, hoặc UTF-8/ANSI)"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data.startswith(codecs.BOM_UTF16_LE):
+        return data[len(codecs.BOM_UTF16_LE):].decode("utf-16-le", errors="replace")
+    return data.decode("utf-8", errors="replace")
+
+
+def find_data_dir(install_dir, appdata=None):
+    """Thư mục dữ liệu của terminal cài ở install_dir
+
+    Terminal thường ghi dữ liệu vào %APPDATA%/MetaQuotes/Terminal/<mã>/ (tệp origin.txt trong
+    đó chứa đường dẫn cài đặt); ở chế độ /portable thì dùng chính thư mục cài đặt.
+    None nếu không tìm thấy thư mục nhật ký.
+    """
+    if not install_dir:
+        return None
+    install_key = os.path.normcase(os.path.normpath(install_dir))
+    appdata = appdata if appdata is not None else os.environ.get("APPDATA", "")
+    terminals_dir = os.path.join(appdata, "MetaQuotes", "Terminal")
+    try:
+        names = os.listdir(terminals_dir) if appdata else []
+    except OSError:
+        names = []
+    for name in names:
+        data_dir = os.path.join(terminals_dir, name)
+        try:
+            origin = _read_text(os.path.join(data_dir, "origin.txt")).strip()
+        except OSError:
+            continue
+        if origin and os.path.normcase(os.path.normpath(origin)) == install_key:
+            return data_dir
+    if os.path.isdir(os.path.join(install_dir, "logs")):
+        return install_dir
+    return None
+
+
+def terminal_data_dir(pid):
+    """Thư mục dữ liệu của terminal đang chạy với pid, None nếu không xác định được"""
+    import psutil
+
+    try:
+        exe = psutil.Process(pid).exe()
+    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+        return None
+    return find_data_dir(os.path.dirname(exe))
+
+
+class LogTail:
+    """Đọc nối tiếp một tệp nhật ký: mỗi lần chỉ đọc các byte mới kể từ vị trí đã đọc
+
+    Dòng chưa ghi xong được giữ lại đến lần đọc sau; tệp bị cắt ngắn (ghi lại từ đầu) thì
+    đọc lại từ đầu. Tệp UTF-16 có BOM (MT5) được giải mã tăng dần, tệp khác đọc như UTF-8.
+    """
+
+    def __init__(self, path, offset=0):
+        self.path = path
+        self.offset = offset
+        self._decoder = None
+        self._partial = ""
+
+    def read_lines(self):
+        """Các dòng hoàn chỉnh mới được ghi thêm từ lần đọc trước"""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return []
+        if size < self.offset:
+            self.offset = 0
+            self._decoder = None
+            self._partial = ""
+        if size == self.offset:
+            return []
+        with open(self.path, "rb") as f:
+            if self._decoder is None:
+                utf16 = f.read(len(codecs.BOM_UTF16_LE)) == codecs.BOM_UTF16_LE
+                if utf16 and self.offset == 0:
+                    self.offset = len(codecs.BOM_UTF16_LE)
+                encoding = "utf-16-le" if utf16 else "utf-8"
+                self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        self.offset += len(data)
+        lines = (self._partial + self._decoder.decode(data)).split("\n")
+        self._partial = lines.pop()
+        return [line.rstrip("\r") for line in lines if line.strip()]
+
+
+class TerminalJournal:
+    """Nhật ký của một terminal (thư mục <data_dir>/logs)
+
+    Khi bắt đầu theo dõi chỉ đọc tiếp từ cuối tệp mới nhất (sự kiện cũ bị bỏ qua, trừ khi
+    from_start); tệp của ngày mới tạo sau đó được đọc từ đầu.
+    """
+
+    def __init__(self, key, data_dir, from_start=False):
+        self.key = key
+        self.data_dir = data_dir
+        self.logs_dir = os.path.join(data_dir, "logs")
+        self._tails = {}        # tên tệp -> LogTail
+        self._latest = ""       # tên tệp mới nhất đã biết
+        for name in self._log_names()[-1:]:
+            path = os.path.join(self.logs_dir, name)
+            self._tails[name] = LogTail(path, 0 if from_start else os.path.getsize(path))
+            self._latest = name
+
+    def _log_names(self):
+        try:
+            return sorted(name for name in os.listdir(self.logs_dir) if name.lower().endswith(".log"))
+        except OSError:
+            return []
+
+    def poll(self):
+        """Các sự kiện đăng nhập mới ghi thêm vào nhật ký"""
+        for name in self._log_names():
+            if name > self._latest:
+                self._tails[name] = LogTail(os.path.join(self.logs_dir, name))
+                self._latest = name
+        # Chỉ cần giữ tệp cũ hơn đến khi đọc hết phần còn lại của nó
+        events = []
+        for name in sorted(self._tails):
+            for line in self._tails[name].read_lines():
+                parsed = parse_journal_line(line)
+                if parsed is not None:
+                    events.append(JournalEvent(self.key, parsed[0], parsed[1], parsed[2], line))
+        for name in sorted(self._tails)[:-1]:
+            del self._tails[name]
+        return events
+
+
+class JournalWatcher:
+    """Theo dõi nhật ký của nhiều terminal (key -> TerminalJournal), gọi callback(event) cho
+    mỗi sự kiện mới gần như ngay lập tức và nhớ trạng thái gần nhất của từng terminal
+
+    start(callback) chạy một luồng nền đọc nhật ký mỗi interval giây; không start thì
+    wait_for_login tự đọc nhật ký trong lúc chờ.
+    """
+
+    def __init__(self, interval=JOURNAL_POLL_INTERVAL):
+        self.interval = interval
+        self.callback = None
+        self._journals = {}     # key -> TerminalJournal
+        self._status = {}       # key -> JournalEvent gần nhất
+        self._history = deque(maxlen=JOURNAL_HISTORY_SIZE)     # (số thứ tự, JournalEvent)
+        self._sequence = 0
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def watch(self, key, data_dir, from_start=False):
+        """Bắt đầu theo dõi nhật ký của terminal key (giữ nguyên vị trí đọc nếu đang theo dõi)
+
+        Trả về True nếu thư mục dữ liệu có nhật ký để theo dõi.
+        """
+        if not data_dir or not os.path.isdir(os.path.join(data_dir, "logs")):
+            return False
+        with self._condition:
+            journal = self._journals.get(key)
+            if journal is None or journal.data_dir != data_dir:
+                self._journals[key] = TerminalJournal(key, data_dir, from_start)
+                print(f"Đang theo dõi nhật ký terminal {key}: {data_dir}")
+        return True
+
+    def unwatch(self, key):
+        with self._condition:
+            self._journals.pop(key, None)
+            self._status.pop(key, None)
+
+    def status(self, key):
+        """Sự kiện đăng nhập gần nhất của terminal key, None nếu chưa có"""
+        with self._condition:
+            return self._status.get(key)
+
+    def mark(self):
+        """Vị trí hiện tại trong lịch sử sự kiện: wait_for_login chỉ xét sự kiện sau vị trí này"""
+        with self._condition:
+            return self._sequence
+
+    def poll(self):
+        """Đọc phần mới của mọi nhật ký đang theo dõi, trả về các sự kiện mới"""
+        with self._condition:
+            events = []
+            for journal in list(self._journals.values()):
+                try:
+                    events.extend(journal.poll())
+                except Exception as e:
+                    print(f"Lỗi khi đọc nhật ký {journal.logs_dir}: {str(e)}")
+            for event in events:
+                self._sequence += 1
+                self._history.append((self._sequence, event))
+                self._status[event.key] = event
+            if events:
+                self._condition.notify_all()
+            callback = self.callback
+        if callback is not None:
+            for event in events:
+                try:
+                    callback(event)
+                except Exception as e:
+                    print(f"Lỗi khi xử lý sự kiện nhật ký: {str(e)}")
+        return events
+
+    def wait_for_login(self, key, login_id, timeout=JOURNAL_TIMEOUT, since=0):
+        """Kết quả đăng nhập login_id của terminal key sau vị trí since
+
+        Trả về JournalEvent authorized (thành công) hoặc invalid_account (bị từ chối), None nếu
+        hết thời gian chờ. "connected" chỉ là bước kết nối trước khi xác thực nên không phải
+        kết quả; dòng không ghi login_id chỉ được nhận khi là "invalid account".
+        """
+        login_id = str(login_id).strip()
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._condition:
+                for sequence, event in self._history:
+                    if sequence <= since or event.key != key:
+                        continue
+                    if event.event == JOURNAL_AUTHORIZED and event.login_id == login_id:
+                        return event
+                    if event.event == JOURNAL_INVALID_ACCOUNT and event.login_id in ("", login_id):
+                        return event
+                if self._history:
+                    since = max(since, self._history[-1][0])
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                if self._thread is not None:
+                    self._condition.wait(min(remaining, self.interval))
+                    continue
+            time.sleep(min(remaining, self.interval))
+            self.poll()
+
+    def start(self, callback=None):
+        """Chạy luồng nền đọc nhật ký mỗi interval giây"""
+        if self._thread is not None:
+            return
+        self.callback = callback
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="terminal-journal", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        thread = self._thread
+        if thread is not None:
+            self._stop.set()
+            thread.join(timeout=2)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+
+def describe_event(event):
+    """Mô tả ngắn một sự kiện nhật ký để in ra"""
+    if event.event == JOURNAL_INVALID_ACCOUNT:
+        return f"❌ Terminal {event.key}: tài khoản {event.login_id or '?'} sai thông tin đăng nhập (invalid account)"
+    if event.event == JOURNAL_AUTHORIZED:
+        return f"✅ Terminal {event.key}: tài khoản {event.login_id} đã đăng nhập trên {event.server}"
+    return f"🔗 Terminal {event.key}: tài khoản {event.login_id} đã kết nối tới {event.server}"
+
+
+def main():
+    args = sys.argv[1:]
+    from_start = "--from-start" in args
+    data_dirs = [arg for arg in args if arg != "--from-start"]
+    if not data_dirs:
+        print(__doc__)
+        return 1
+    watcher = JournalWatcher()
+    for data_dir in data_dirs:
+        if not watcher.watch(data_dir, data_dir, from_start):
+            print(f"❌ Không có thư mục logs trong {data_dir}")
+    watcher.start(lambda event: print(describe_event(event)))
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        watcher.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
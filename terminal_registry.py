@@ -0,0 +1,217 @@
+"""
+Mô-đun danh sách terminal MT4/MT5 cập nhật theo sự kiện cửa sổ: thay vì duyệt lại
+mọi cửa sổ cấp cao nhất ở mỗi lần quét, danh sách hwnd -> thông tin terminal được
+cập nhật khi cửa sổ được tạo, bị đóng, ẩn/hiện hoặc đổi tiêu đề
+
+Nguồn sự kiện có thể thay thế: WinEventSource dùng SetWinEventHook trên Windows,
+fake_terminals.FakeWindowEventSource giả lập cửa sổ để chạy thử trên hệ điều hành khác.
+Một nguồn sự kiện là một nguồn cửa sổ (xem window_snapshot) có thêm:
+    start(callback)     # callback(event, hwnd) với event là WINDOW_CREATED/DESTROYED/CHANGED
+    stop()
+"""
+
+import sys
+import threading
+
+from process_snapshot import platform_from_process_name
+from window_snapshot import Win32Windows
+
+WINDOW_CREATED = "created"
+WINDOW_DESTROYED = "destroyed"
+WINDOW_CHANGED = "changed"      # Đổi tiêu đề, ẩn hoặc hiện
+
+# Tiêu đề ngắn hơn mức này thường là cửa sổ con của terminal, không phải cửa sổ chính
+MIN_TITLE_LENGTH = 10
+
+
+class TerminalRegistry:
+    """Danh sách terminal đang mở (hwnd -> thông tin), cập nhật theo sự kiện cửa sổ
+
+    parse_title(title) trả về dict có login_id/broker/server; chỉ cửa sổ hiển thị của tiến
+    trình MT4/MT5 có login_id hoặc server trong tiêu đề mới được giữ lại (giống khi quét).
+    """
+
+    def __init__(self, source, parse_title):
+        self.source = source
+        self.parse_title = parse_title
+        self.running = False
+        self._entries = {}      # hwnd -> thông tin terminal
+        self._processes = {}    # pid -> (create_time, nền tảng hoặc None)
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Đọc các cửa sổ hiện có một lần rồi theo dõi sự kiện"""
+        self.source.start(self.on_window_event)
+        self.running = True
+        self.refresh()
+
+    def stop(self):
+        if self.running:
+            self.running = False
+            self.source.stop()
+
+    def refresh(self):
+        """Dựng lại toàn bộ danh sách từ các cửa sổ hiện có"""
+        hwnds = list(self.source.windows())
+        with self._lock:
+            self._entries.clear()
+            self._processes.clear()
+            for hwnd in hwnds:
+                self._update(hwnd)
+
+    def on_window_event(self, event, hwnd):
+        """Cập nhật danh sách theo một sự kiện cửa sổ"""
+        try:
+            with self._lock:
+                if event == WINDOW_DESTROYED:
+                    self._entries.pop(hwnd, None)
+                    return
+                self._update(hwnd, new_window=event == WINDOW_CREATED)
+        except Exception as e:
+            print(f"Lỗi khi cập nhật danh sách terminal: {str(e)}")
+
+    def _process(self, pid, refresh=False):
+        """(create_time, nền tảng) của tiến trình, nhớ theo pid cho tới khi pid tạo cửa sổ mới"""
+        if refresh or pid not in self._processes:
+            info = self.source.process_info(pid)
+            if info is None:
+                self._processes.pop(pid, None)
+                return None
+            create_time, name = info
+            self._processes[pid] = (create_time, platform_from_process_name(name))
+        return self._processes[pid]
+
+    def _update(self, hwnd, new_window=False):
+        info = self.source.window_info(hwnd)
+        if info is None:
+            self._entries.pop(hwnd, None)
+            return
+        title, pid = info
+        # Cửa sổ mới có thể thuộc tiến trình mới dùng lại PID cũ: đọc lại thông tin tiến trình
+        process = self._process(pid, refresh=new_window)
+        if process is None or process[1] is None or not title or len(title) < MIN_TITLE_LENGTH:
+            self._entries.pop(hwnd, None)
+            return
+        current = self._entries.get(hwnd)
+        if current is not None and current["title"] == title and current["pid"] == pid:
+            return
+        account_info = self.parse_title(title)
+        if not (account_info.get("login_id") or account_info.get("server")):
+            self._entries.pop(hwnd, None)
+            return
+        self._entries[hwnd] = {
+            "title": title,
+            "hwnd": hwnd,
+            "process_id": pid,
+            "create_time": process[0],
+            "platform": process[1],
+            "login_id": account_info.get("login_id", ""),
+            "broker": account_info.get("broker", ""),
+            "server": account_info.get("server", "")
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, hwnd):
+        """Thông tin terminal của cửa sổ hwnd, None nếu không phải terminal"""
+        with self._lock:
+            entry = self._entries.get(hwnd)
+            return None if entry is None else dict(entry)
+
+    def terminals(self):
+        """Bản sao danh sách terminal đang mở (theo thứ tự phát hiện)"""
+        with self._lock:
+            return [dict(entry) for entry in self._entries.values()]
+
+    def find_login(self, login_id):
+        """Các terminal đang đăng nhập login_id"""
+        with self._lock:
+            return [dict(entry) for entry in self._entries.values() if entry["login_id"] == login_id]
+
+
+class WinEventSource(Win32Windows):
+    """Nguồn sự kiện cửa sổ thật trên Windows (SetWinEventHook, WINEVENT_OUTOFCONTEXT)
+
+    Sự kiện được gửi về luồng đã gọi start() qua hàng đợi thông điệp của luồng đó,
+    vì vậy cần gọi start() trên luồng giao diện (vòng lặp sự kiện Qt xử lý thông điệp).
+    """
+
+    EVENT_OBJECT_CREATE = 0x8000
+    EVENT_OBJECT_DESTROY = 0x8001
+    EVENT_OBJECT_SHOW = 0x8002
+    EVENT_OBJECT_HIDE = 0x8003
+    EVENT_OBJECT_NAMECHANGE = 0x800C
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    WINEVENT_SKIPOWNPROCESS = 0x0002
+    OBJID_WINDOW = 0
+    CHILDID_SELF = 0
+    GA_ROOT = 2
+
+    def __init__(self):
+        self._hooks = []
+        self._proc = None
+        self._callback = None
+
+    @staticmethod
+    def available():
+        return sys.platform == "win32"
+
+    def start(self, callback):
+        import ctypes
+        from ctypes import wintypes
+
+        self._callback = callback
+        user32 = ctypes.windll.user32
+        self._user32 = user32
+        user32.SetWinEventHook.restype = wintypes.HANDLE
+        user32.GetAncestor.restype = wintypes.HWND
+        user32.GetAncestor.argtypes = [wintypes.HWND, wintypes.UINT]
+        win_event_proc = ctypes.WINFUNCTYPE(None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                                            wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+        # Giữ tham chiếu tới callback để không bị thu gom khi hook còn hoạt động
+        self._proc = win_event_proc(self._on_event)
+        flags = self.WINEVENT_OUTOFCONTEXT | self.WINEVENT_SKIPOWNPROCESS
+        # Hai khoảng sự kiện riêng để không nhận EVENT_OBJECT_LOCATIONCHANGE (rất nhiều) nằm giữa
+        for first, last in ((self.EVENT_OBJECT_CREATE, self.EVENT_OBJECT_HIDE),
+                            (self.EVENT_OBJECT_NAMECHANGE, self.EVENT_OBJECT_NAMECHANGE)):
+            hook = user32.SetWinEventHook(first, last, 0, self._proc, 0, 0, flags)
+            if not hook:
+                self.stop()
+                raise OSError("SetWinEventHook thất bại")
+            self._hooks.append(hook)
+
+    def stop(self):
+        for hook in self._hooks:
+            try:
+                self._user32.UnhookWinEvent(hook)
+            except Exception:
+                pass
+        self._hooks = []
+
+    def _on_event(self, hook, event, hwnd, id_object, id_child, thread_id, timestamp):
+        try:
+            if not hwnd or id_object != self.OBJID_WINDOW or id_child != self.CHILDID_SELF:
+                return
+            if event == self.EVENT_OBJECT_DESTROY:
+                self._callback(WINDOW_DESTROYED, hwnd)
+                return
+            # Chỉ quan tâm cửa sổ cấp cao nhất
+            if self._user32.GetAncestor(hwnd, self.GA_ROOT) != hwnd:
+                return
+            self._callback(WINDOW_CREATED if event == self.EVENT_OBJECT_CREATE else WINDOW_CHANGED, hwnd)
+        except Exception as e:
+            print(f"Lỗi khi xử lý sự kiện cửa sổ: {str(e)}")
+
+
+def create_event_source():
+    """Nguồn sự kiện cửa sổ: giả lập nếu đặt biến môi trường MT_LOGIN_FAKE_TERMINALS,
+    WinEventSource trên Windows, None nếu hệ thống không hỗ trợ"""
+    from fake_terminals import fake_event_source_from_env
+
+    source = fake_event_source_from_env()
+    if source is not None:
+        return source
+    if WinEventSource.available():
+        return WinEventSource()
+    return None
@@ -0,0 +1,287 @@
+"""
+Mô-đun phân tích tiêu đề cửa sổ MT4/MT5: một bộ phân tích dùng các biểu thức chính quy
+biên dịch sẵn (mỗi danh sách mẫu gộp thành một regex có nhóm đặt tên) để nhận dạng định
+dạng tiêu đề và lấy login/server/broker; kết quả được nhớ theo đúng chuỗi tiêu đề (LRU
+có giới hạn) vì tiêu đề terminal hiếm khi đổi giữa các lần quét
+
+Mỗi danh sách mẫu được gộp thành ^(?:.*?mẫu1|.*?mẫu2|...): các nhánh được thử theo thứ tự
+từ đầu chuỗi nên mẫu đứng trước vẫn được ưu tiên (và khớp ở vị trí sớm nhất) giống như
+khi thử lần lượt từng mẫu, nhưng chỉ cần một lần gọi regex cho cả danh sách.
+
+title_parser_benchmark.py so sánh kết quả và tốc độ với cách thử từng mẫu trên title_corpus.txt.
+"""
+
+import re
+from collections import OrderedDict, namedtuple
+
+# Số tiêu đề được nhớ tối đa (tiêu đề dùng lâu nhất chưa đọc lại bị bỏ trước)
+TITLE_CACHE_SIZE = 1024
+
+# Định dạng tiêu đề chuẩn: MT4 "12345678: Server", MT5 "12345678 - Server"
+FORMAT_MT4 = "MT4"
+FORMAT_MT5 = "MT5"
+
+# Các sàn phổ biến (thứ tự = độ ưu tiên khi tiêu đề/server chứa nhiều sàn)
+COMMON_BROKERS = (
+    "exness", "fbs", "fxtm", "forex4you", "admiral",
+    "skilling", "tickmill", "instaforex", "hotforex", "fxpro",
+    "xtb", "oanda", "fxcm", "ig", "pepperstone", "axiory", "icmarkets",
+    "tradingpro", "tradersway", "dukascopy"
+)
+
+# Một số giá trị số phổ biến không phải ID (như năm, trạng thái, v.v.)
+INVALID_LOGIN_IDS = frozenset(["2023", "2024", "2022", "2021", "2020", "2019", "2018", "1234", "123456"])
+
+# Từ khóa cho thấy server/broker đọc được thực ra là thông tin phiên bản, hệ điều hành...
+INVALID_NAME_KEYWORDS = ("version", "v.", "preview", "windows", "microsoft", "update")
+
+# Từ khóa loại trừ khi nhận diện cửa sổ theo tiêu đề (phương pháp thay thế)
+EXCLUDE_KEYWORDS = (
+    "notepad", "chrome", "edge", "firefox", "explorer", "microsoft",
+    "word", "excel", "powerpoint", "outlook", "access", "onenote",
+    "calculator", "paint", "desktop", "document", "settings", "control panel",
+    "visual studio", "vscode", "code", "cmd", "command", "powershell", "terminal",
+    "task manager", "file explorer", "file browser", "sql", "database",
+    "antivirus", "defender", "security", "mail", "messaging", "chat", "teams",
+    "discord", "skype", "zoom", "video", "browser", "internet", "spotify",
+    "player", "game", "nvidia", "amd", "intel", "update", "installer", "setup",
+    "system", "config", "properties", "preferences", "options", "help", "about",
+    "cursor", "python", "camera", "photos", "gallery", "media",
+    "store", "app", "windows", "adobe", "reader", "acrobat", "photoshop", "illustrator"
+)
+
+# Từ khóa loại trừ khi quét tất cả cửa sổ (danh sách ngắn hơn)
+SCAN_EXCLUDE_KEYWORDS = (
+    "notepad", "chrome", "edge", "firefox", "explorer",
+    "word", "excel", "powerpoint", "outlook",
+    "calculator", "paint", "desktop", "document",
+    "visual studio", "vscode", "cmd", "powershell",
+    "settings", "task manager", "file explorer"
+)
+
+# Từ khóa chính xác để nhận diện MT4/MT5
+MT_KEYWORDS = (
+    "metatrader 4", "metatrader 5",
+    "meta trader 4", "meta trader 5",
+    "metatrader4", "metatrader5"
+)
+
+# Từ khóa MT chung (phải đứng riêng, ngăn cách bằng khoảng trắng)
+GENERAL_MT_KEYWORDS = ("mt4", "mt5", "mt4-", "mt5-", "-mt4", "-mt5")
+
+# Từ khóa cho thấy tiêu đề có thông tin server
+SERVER_HINT_KEYWORDS = ("server", "live", "demo", "real")
+
+
+def keyword_pattern(keywords):
+    """Regex tìm bất kỳ từ khóa nào (tương đương any(keyword in text))"""
+    return re.compile("|".join(re.escape(keyword) for keyword in keywords))
+
+
+def _ordered(branches):
+    """Gộp các mẫu thành một regex giữ thứ tự ưu tiên; mỗi nhánh kết thúc bằng nhóm đánh dấu
+    _<số thứ tự> để biết nhánh nào đã khớp (match.lastgroup)"""
+    return re.compile(
+        "^(?:" + "|".join(f".*?(?:{branch})(?P<_{index}>)" for index, branch in enumerate(branches)) + ")",
+        re.DOTALL
+    )
+
+
+def _branch(match):
+    return int(match.lastgroup[1:])
+
+
+def _best_broker(priorities):
+    """Sàn có độ ưu tiên cao nhất trong các độ ưu tiên tìm được, "" nếu không có"""
+    best = min(priorities, default=None)
+    return "" if best is None else COMMON_BROKERS[best]
+
+
+EXCLUDED_TITLE_PATTERN = keyword_pattern(EXCLUDE_KEYWORDS)
+SCAN_EXCLUDED_TITLE_PATTERN = keyword_pattern(SCAN_EXCLUDE_KEYWORDS)
+MT_KEYWORD_PATTERN = keyword_pattern(MT_KEYWORDS)
+SERVER_HINT_PATTERN = keyword_pattern(SERVER_HINT_KEYWORDS)
+GENERAL_MT_PATTERN = re.compile(r"(?<![^ ])(?:" + "|".join(re.escape(k) for k in GENERAL_MT_KEYWORDS) + r")(?![^ ])")
+LOGIN_DIGITS_PATTERN = re.compile(r"\d{5,10}")
+
+# Mẫu chuẩn của MetaTrader (theo thứ tự ưu tiên)
+_MT_PATTERN = _ordered([
+    # MT4 standard: 12345678 : Demo-Server
+    r"(?P<login0>\d{5,10})\s*:\s*(?P<server0>[\w\.-]+)",
+    # MT5 standard: 12345678 - Demo-Server
+    r"(?P<login1>\d{5,10})\s*-\s*(?P<server1>[\w\.-]+)",
+    # MT pattern with @ symbol: 12345678@Demo-Server
+    r"(?P<login2>\d{5,10})@(?P<server2>[\w\.-]+)",
+    # MT pattern with space: 12345678 Demo-Server
+    r"(?P<login3>\d{5,10})\s+(?P<server3>[\w\.-]+\b(?:\s+[\w\.-]+){0,2})\b",
+    # Broker name followed by ID: BrokerName - 12345678
+    r"(?P<server4>[\w\.-]+)\s*-\s*(?P<login4>\d{5,10})",
+])
+_MT_FORMATS = (FORMAT_MT4, FORMAT_MT5, "", "", "")
+
+# Login ID khi tiêu đề không theo mẫu chuẩn
+_LOGIN_PATTERN = _ordered([
+    r"login\s*[:#-]?\s*(?P<login0>\d{5,10})",     # Login: 12345678
+    r"account\s*[:#-]?\s*(?P<login1>\d{5,10})",   # Account: 12345678
+    r"id\s*[:#-]?\s*(?P<login2>\d{5,10})",        # ID: 12345678
+    r"no[.:]?\s*(?P<login3>\d{5,10})",            # No: 12345678
+    r"acc[.:]?\s*(?P<login4>\d{5,10})",           # Acc: 12345678
+    r"a/c[.:]?\s*(?P<login5>\d{5,10})",           # A/C: 12345678
+    r"(?P<login6>\d{5,10})@",                     # Dãy số theo sau là @ (phổ biến trong MT4/5)
+    r":\s*(?P<login7>\d{5,10})",                  # : 12345678
+    r"-\s*(?P<login8>\d{5,10})",                  # - 12345678
+])
+# Dãy số đầu tiên có độ dài phù hợp (dự phòng)
+_ANY_LOGIN_PATTERN = re.compile(r"(?<!\d)\d{5,10}(?!\d)")
+
+# Server khi đã có login ID nhưng tiêu đề không theo mẫu chuẩn ("ID: server" / "ID - server"
+# không thể xuất hiện ở đây vì khi đó mẫu chuẩn đã khớp)
+_SERVER_PATTERN = _ordered([
+    r"server\s*[:#-]?\s*(?P<server0>[\w\.-]+)",   # Server: abc-server
+    r"@(?P<server1>[\w\.-]+)",                    # ID@server
+])
+
+# Server theo từ khóa (trên tiêu đề chữ thường)
+_SERVER_KEYWORD_PATTERN = _ordered([
+    rf"{keyword}\s*[:#-]?\s*(?P<server{index}>[\w\.-]+)"
+    for index, keyword in enumerate(("server", "live", "demo", "real", "practice"))
+])
+
+# Broker trong server/tiêu đề: các lookahead cho mọi vị trí có tên sàn, tại mỗi vị trí nhánh
+# đứng trước trong danh sách được thử trước; sàn được chọn là sàn có độ ưu tiên cao nhất
+_BROKER_PRIORITY = {broker: priority for priority, broker in enumerate(COMMON_BROKERS)}
+_BROKERS = "|".join(re.escape(broker) for broker in COMMON_BROKERS)
+_BROKER_PATTERN = re.compile(rf"(?=({_BROKERS}))")
+# Tên sàn dính với dấu "-" ("-sàn" hoặc "sàn-")
+_DASH_BROKER_PATTERN = re.compile(rf"(?=-({_BROKERS})|({_BROKERS})-)")
+
+_INVALID_NAME_PATTERN = keyword_pattern(INVALID_NAME_KEYWORDS)
+
+
+class ParsedTitle(namedtuple("ParsedTitle", ["login_id", "broker", "server", "title_format"])):
+    """Kết quả phân tích một tiêu đề
+
+    title_format là FORMAT_MT4 nếu tiêu đề có dạng "ID: server", FORMAT_MT5 nếu có dạng
+    "ID - server" (và không có dạng MT4), "" nếu không theo định dạng chuẩn.
+    """
+
+    __slots__ = ()
+
+    def account_info(self):
+        """Thông tin tài khoản dạng dict (login_id/broker/server)"""
+        return {"login_id": self.login_id, "broker": self.broker, "server": self.server}
+
+
+def parse_title(title):
+    """Phân tích tiêu đề cửa sổ MT4/MT5: định dạng, login ID, server, broker
+
+    Login ID/server lấy theo mẫu chuẩn của MetaTrader, nếu không có thì theo từ khóa
+    (login/account/id/...), rồi theo dãy số bất kỳ có 5-10 chữ số. Broker lấy từ server,
+    sau đó từ tiêu đề, cuối cùng dùng server. Tiêu đề không có login ID và server cho
+    kết quả rỗng.
+    """
+    login_id = server = broker = ""
+    title_format = ""
+    title_lower = None
+
+    # Mọi mẫu login đều cần dãy 5-10 chữ số: tiêu đề không có thì bỏ qua cả hai danh sách mẫu
+    has_digits = LOGIN_DIGITS_PATTERN.search(title) is not None
+    match = _MT_PATTERN.match(title) if has_digits else None
+    if match is not None:
+        index = _branch(match)
+        title_format = _MT_FORMATS[index]
+        login_id = match.group(f"login{index}")
+        server = match.group(f"server{index}")
+        if index == 4:
+            # "ID - ID": nhóm đầu cũng là login ID hợp lệ thì được ưu tiên
+            first = match.group("server4")
+            if first.isdigit() and 5 <= len(first) <= 10:
+                login_id, server = first, login_id
+    else:
+        if has_digits:
+            match = _LOGIN_PATTERN.match(title)
+            if match is not None:
+                login_id = match.group(f"login{_branch(match)}")
+            else:
+                match = _ANY_LOGIN_PATTERN.search(title)
+                if match is not None:
+                    login_id = match.group()
+        if login_id:
+            match = _SERVER_PATTERN.match(title)
+            if match is not None:
+                server = match.group(f"server{_branch(match)}")
+        if not server:
+            title_lower = title.lower()
+            match = _SERVER_KEYWORD_PATTERN.match(title_lower)
+            if match is not None:
+                server = match.group(f"server{_branch(match)}")
+
+    if server:
+        broker = _best_broker(_BROKER_PRIORITY[m.group(1)] for m in _BROKER_PATTERN.finditer(server.lower()))
+    if not broker:
+        if title_lower is None:
+            title_lower = title.lower()
+        # Tên sàn đứng riêng (ngăn cách bằng khoảng trắng) hoặc dính với dấu "-"
+        priorities = [_BROKER_PRIORITY[word] for word in title_lower.split(" ") if word in _BROKER_PRIORITY]
+        if "-" in title_lower:
+            priorities.extend(_BROKER_PRIORITY[m.group(1) or m.group(2)]
+                              for m in _DASH_BROKER_PATTERN.finditer(title_lower))
+        broker = _best_broker(priorities)
+        if not broker and "metatrader" in title_lower:
+            broker = title_lower.partition("metatrader")[0].strip()
+    if not broker:
+        broker = server
+
+    # Loại bỏ các giá trị không hợp lệ
+    if login_id and (not login_id.isdigit() or len(login_id) < 5 or login_id in INVALID_LOGIN_IDS):
+        login_id = ""
+    if server and _INVALID_NAME_PATTERN.search(server.lower()):
+        server = ""
+    if broker and _INVALID_NAME_PATTERN.search(broker.lower()):
+        broker = ""
+    if not login_id and not server:
+        broker = ""
+    return ParsedTitle(login_id, broker, server, title_format)
+
+
+class TitleCache:
+    """Bộ nhớ LRU: tiêu đề -> kết quả phân tích
+
+    parse(title) chỉ được gọi khi tiêu đề chưa có trong bộ nhớ; kết quả cần là giá trị
+    không đổi được (ví dụ ParsedTitle) vì được trả lại nguyên cho mọi lần hỏi sau.
+    hits/misses đếm số lần lấy được từ bộ nhớ và số lần phải phân tích.
+    """
+
+    def __init__(self, parse=parse_title, maxsize=TITLE_CACHE_SIZE):
+        self.parse = parse
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, title):
+        """Kết quả phân tích của tiêu đề"""
+        parsed = self._entries.get(title)
+        if parsed is not None:
+            self.hits += 1
+            self._entries.move_to_end(title)
+        else:
+            self.misses += 1
+            parsed = self.parse(title)
+            self._entries[title] = parsed
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return parsed
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        """Xóa các tiêu đề đã nhớ (giữ nguyên bộ đếm)"""
+        self._entries.clear()
+
+    def stats(self):
+        """Chuỗi thống kê bộ nhớ cho log"""
+        total = self.hits + self.misses
+        ratio = self.hits * 100.0 / total if total else 0.0
+        return f"{self.hits} lần dùng lại, {self.misses} lần phân tích ({ratio:.0f}% dùng lại), {len(self)} tiêu đề đang nhớ"
@@ -0,0 +1,188 @@
+"""
+So sánh title_parser.parse_title với cách phân tích tiêu đề cũ (thử lần lượt từng mẫu)
+trên các tiêu đề mẫu: kết quả phải giống hệt và bộ phân tích mới phải nhanh hơn
+
+Cách dùng:
+    python title_parser_benchmark.py [tệp tiêu đề] [số lần lặp]
+"""
+
+import os
+import re
+import sys
+import timeit
+
+from title_parser import parse_title, FORMAT_MT4, FORMAT_MT5
+
+CORPUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "title_corpus.txt")
+
+
+def load_corpus(path=CORPUS_FILE):
+    """Các tiêu đề mẫu (bỏ dòng trống và dòng chú thích bắt đầu bằng #)"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if line.strip() and not line.startswith("#")]
+
+
+def parse_title_reference(title):
+    """Cách phân tích cũ: thử lần lượt từng mẫu (giữ nguyên thứ tự và điều kiện, bỏ phần in log)"""
+    account_info = {"login_id": "", "broker": "", "server": ""}
+    mt_patterns = [
+        r'(\d{5,10})\s*:\s*([\w\.-]+)',
+        r'(\d{5,10})\s*-\s*([\w\.-]+)',
+        r'(\d{5,10})@([\w\.-]+)',
+        r'(\d{5,10})\s+([\w\.-]+\b(?:\s+[\w\.-]+){0,2})\b',
+        r'([\w\.-]+)\s*-\s*(\d{5,10})'
+    ]
+    matched = False
+    for pattern in mt_patterns:
+        matches = re.search(pattern, title)
+        if matches:
+            if matches.group(1).isdigit() and 5 <= len(matches.group(1)) <= 10:
+                account_info["login_id"] = matches.group(1)
+                account_info["server"] = matches.group(2)
+            elif matches.group(2).isdigit() and 5 <= len(matches.group(2)) <= 10:
+                account_info["server"] = matches.group(1)
+                account_info["login_id"] = matches.group(2)
+            else:
+                continue
+            matched = True
+            break
+    if not matched:
+        login_patterns = [
+            r'login\s*[:#-]?\s*(\d{5,10})',
+            r'account\s*[:#-]?\s*(\d{5,10})',
+            r'id\s*[:#-]?\s*(\d{5,10})',
+            r'no[.:]?\s*(\d{5,10})',
+            r'acc[.:]?\s*(\d{5,10})',
+            r'a/c[.:]?\s*(\d{5,10})',
+            r'(\d{5,10})@',
+            r':\s*(\d{5,10})',
+            r'-\s*(\d{5,10})',
+        ]
+        for pattern in login_patterns:
+            matches = re.search(pattern, title)
+            if matches:
+                account_info["login_id"] = matches.group(1)
+                break
+        if not account_info["login_id"]:
+            for num in re.findall(r'\d+', title):
+                if 5 <= len(num) <= 10:
+                    account_info["login_id"] = num
+                    break
+        if not account_info["server"]:
+            if account_info["login_id"]:
+                server_patterns = [
+                    rf'{account_info["login_id"]}\s*:\s*([\w\.-]+)',
+                    rf'{account_info["login_id"]}\s*-\s*([\w\.-]+)',
+                    r'server\s*[:#-]?\s*([\w\.-]+)',
+                    r'@([\w\.-]+)',
+                ]
+                for pattern in server_patterns:
+                    matches = re.search(pattern, title)
+                    if matches:
+                        account_info["server"] = matches.group(1)
+                        break
+            if not account_info["server"]:
+                for keyword in ["server", "live", "demo", "real", "practice"]:
+                    matches = re.search(rf'{keyword}\s*[:#-]?\s*([\w\.-]+)', title.lower())
+                    if matches:
+                        account_info["server"] = matches.group(1)
+                        break
+    common_brokers = [
+        "exness", "fbs", "fxtm", "forex4you", "admiral",
+        "skilling", "tickmill", "instaforex", "hotforex", "fxpro",
+        "xtb", "oanda", "fxcm", "ig", "pepperstone", "axiory", "icmarkets",
+        "tradingpro", "tradersway", "dukascopy"
+    ]
+    if account_info["server"]:
+        server_lower = account_info["server"].lower()
+        for broker in common_brokers:
+            if broker in server_lower:
+                account_info["broker"] = broker
+                break
+    if not account_info["broker"]:
+        title_lower = title.lower()
+        for broker in common_brokers:
+            if f" {broker} " in f" {title_lower} " or f"-{broker}" in title_lower or f"{broker}-" in title_lower:
+                account_info["broker"] = broker
+                break
+    if not account_info["broker"] and "metatrader" in title.lower():
+        parts = title.lower().split("metatrader")
+        if parts and parts[0].strip():
+            account_info["broker"] = parts[0].strip()
+    if not account_info["broker"] and account_info["server"]:
+        account_info["broker"] = account_info["server"]
+    if account_info["login_id"]:
+        if not account_info["login_id"].isdigit() or len(account_info["login_id"]) < 5:
+            account_info["login_id"] = ""
+        invalid_ids = ["2023", "2024", "2022", "2021", "2020", "2019", "2018", "1234", "123456"]
+        if account_info["login_id"] in invalid_ids:
+            account_info["login_id"] = ""
+    invalid_keywords = ["version", "v.", "preview", "windows", "microsoft", "update"]
+    if account_info["server"]:
+        if any(keyword in account_info["server"].lower() for keyword in invalid_keywords):
+            account_info["server"] = ""
+    if account_info["broker"]:
+        if any(keyword in account_info["broker"].lower() for keyword in invalid_keywords):
+            account_info["broker"] = ""
+    if not account_info["login_id"] and not account_info["server"]:
+        account_info = {"login_id": "", "broker": "", "server": ""}
+    return account_info
+
+
+def classify_reference(title):
+    """Cách nhận dạng định dạng cũ của các hàm quét (hai regex riêng)"""
+    is_mt4_format = bool(re.search(r'\d{5,10}\s*:\s*[\w\.-]+', title))
+    is_mt5_format = bool(re.search(r'\d{5,10}\s*-\s*[\w\.-]+', title))
+    return is_mt4_format, is_mt5_format
+
+
+def reference(title):
+    return parse_title_reference(title), classify_reference(title)
+
+
+def compiled(title):
+    parsed = parse_title(title)
+    return parsed.account_info(), (parsed.title_format == FORMAT_MT4,
+                                   parsed.title_format == FORMAT_MT5)
+
+
+def same_result(old, new):
+    """Kết quả giống nhau; cờ MT5 chỉ được dùng khi tiêu đề không có định dạng MT4"""
+    (old_info, (old_mt4, old_mt5)), (new_info, (new_mt4, new_mt5)) = old, new
+    return old_info == new_info and old_mt4 == new_mt4 and (old_mt4 or old_mt5 == new_mt5)
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else CORPUS_FILE
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    titles = load_corpus(path)
+    print(f"Đã đọc {len(titles)} tiêu đề từ {path}")
+
+    mismatches = 0
+    for title in titles:
+        old, new = reference(title), compiled(title)
+        if not same_result(old, new):
+            mismatches += 1
+            print(f"❌ Khác kết quả: {title!r}\n   cũ: {old}\n   mới: {new}")
+    if mismatches:
+        print(f"❌ {mismatches} tiêu đề cho kết quả khác nhau")
+        return 1
+    print("✅ Kết quả giống hệt trên mọi tiêu đề")
+
+    def run(parse):
+        for title in titles:
+            parse(title)
+
+    old_time = min(timeit.repeat(lambda: run(reference), number=repeat, repeat=5))
+    new_time = min(timeit.repeat(lambda: run(compiled), number=repeat, repeat=5))
+    per_title = 1e6 / (repeat * len(titles))
+    print(f"Cách cũ: {old_time * per_title:.1f} µs/tiêu đề")
+    print(f"Bộ phân tích mới: {new_time * per_title:.1f} µs/tiêu đề ({old_time / new_time:.1f} lần nhanh hơn)")
+    if new_time >= old_time:
+        print("❌ Bộ phân tích mới không nhanh hơn")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
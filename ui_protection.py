@@ -12,6 +12,7 @@ import win32con
 import win32process
 import time
 import sys
+from window_snapshot import WindowSnapshot
 
 # Đường dẫn đến tệp cấu hình
 CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mt_login_config.json")
@@ -88,18 +89,15 @@ def get_protected_windows():
     config = load_config()
     return config.get("protected_windows", [])
 
-def find_metatrader_windows():
-    """Tìm tất cả các cửa sổ MT4/MT5 đang chạy"""
-    metatrader_windows = []
-    
-    def enum_windows_callback(hwnd, results):
-        if win32gui.IsWindowVisible(hwnd):
-            title = win32gui.GetWindowText(hwnd)
-            if title and ("MetaTrader" in title or "MT4" in title or "MT5" in title):
-                results.append({"hwnd": hwnd, "title": title})
-    
+def find_metatrader_windows(window_snapshot=None):
+    """Tìm tất cả các cửa sổ MT4/MT5 đang chạy (trong ảnh chụp cửa sổ, chụp mới nếu không có)"""
+    if window_snapshot is None:
+        window_snapshot = WindowSnapshot.capture()
     windows = []
-    win32gui.EnumWindows(enum_windows_callback, windows)
+    for window in window_snapshot:
+        title = window.title
+        if title and ("MetaTrader" in title or "MT4" in title or "MT5" in title):
+            windows.append({"hwnd": window.hwnd, "title": title})
     return windows
 
 class UIProtection:
@@ -140,8 +138,9 @@ class UIProtection:
 def check_and_block_ui_changes():
     """Kiểm tra và ngăn chặn thay đổi giao diện nếu không được phép"""
     if not is_ui_change_allowed():
+        protected_windows = get_protected_windows()
         for window in find_metatrader_windows():
-            if window["title"] in get_protected_windows():
+            if window["title"] in protected_windows:
                 hwnd = window["hwnd"]
                 # Ngăn chặn thanh cuộn và thay đổi kích thước
                 style = win32gui.GetWindowLong(hwnd, win32con.GWL_STYLE)
@@ -0,0 +1,149 @@
+"""
+Mô-đun ảnh chụp cửa sổ: duyệt các cửa sổ cấp cao nhất đang hiển thị một lần cho mỗi
+thao tác (quét, kiểm tra nhánh, kiểm tra hết tiền, đăng nhập) rồi mọi bước của thao tác
+đó dùng lại cùng một ảnh chụp thay vì tự duyệt lại desktop bằng EnumWindows/Desktop()
+
+Nguồn cửa sổ có thể thay thế (Win32Windows trên Windows, fake_terminals.FakeWindowEventSource
+khi chạy thử). Một nguồn cửa sổ cần có:
+    windows()           # hwnd các cửa sổ cấp cao nhất đang có
+    window_info(hwnd)   # (tiêu đề, pid) hoặc None nếu cửa sổ không còn/không hiển thị
+    process_info(pid)   # (create_time, tên tiến trình) hoặc None nếu tiến trình không còn
+    data_dir(pid)       # thư mục dữ liệu (chứa logs/) của terminal, None nếu không xác định được
+"""
+
+from collections import namedtuple
+
+from process_snapshot import ProcessSnapshot, read_process
+from terminal_journal import terminal_data_dir
+
+# Một cửa sổ trong ảnh chụp
+WindowInfo = namedtuple("WindowInfo", ["hwnd", "title", "pid"])
+
+
+class Win32Windows:
+    """Nguồn cửa sổ thật trên Windows (win32gui)"""
+
+    def windows(self):
+        import win32gui
+
+        hwnds = []
+        win32gui.EnumWindows(lambda hwnd, results: results.append(hwnd) or True, hwnds)
+        return hwnds
+
+    def window_info(self, hwnd):
+        import win32gui
+        import win32process
+
+        try:
+            if not win32gui.IsWindow(hwnd) or not win32gui.IsWindowVisible(hwnd):
+                return None
+            _, pid = win32process.GetWindowThreadProcessId(hwnd)
+            return win32gui.GetWindowText(hwnd), pid
+        except Exception:
+            return None
+
+    def process_info(self, pid):
+        try:
+            return read_process(pid)
+        except Exception:
+            return None
+
+    def data_dir(self, pid):
+        try:
+            return terminal_data_dir(pid)
+        except Exception:
+            return None
+
+
+def window_object(hwnd):
+    """Đối tượng pywinauto của cửa sổ hwnd (để focus/gửi phím)"""
+    from pywinauto.controls.hwndwrapper import HwndWrapper
+
+    return HwndWrapper(hwnd)
+
+
+def focus_window(hwnd):
+    """Đưa đúng cửa sổ hwnd lên foreground bằng win32gui (khi pywinauto không focus được)
+
+    Không tìm lại cửa sổ theo tiêu đề vì tiêu đề có thể trùng với terminal khác; ném lỗi
+    nếu Windows không đưa được cửa sổ lên để người gọi bỏ qua thao tác gửi phím.
+    """
+    import win32gui
+
+    win32gui.SetForegroundWindow(hwnd)
+    if win32gui.GetForegroundWindow() != hwnd:
+        raise Exception(f"Cửa sổ {hwnd} không lên được foreground")
+
+
+def verify_window(source, hwnd, process_id, create_time=None):
+    """Tiêu đề hiện tại của cửa sổ hwnd nếu nó vẫn là cửa sổ hiển thị của đúng tiến trình
+    (process_id, create_time) đã quét, None nếu cửa sổ đã đóng/bị ẩn hoặc hwnd/pid đã bị
+    cấp lại cho cửa sổ/tiến trình khác"""
+    info = source.window_info(hwnd)
+    if info is None:
+        return None
+    title, pid = info
+    if process_id is not None and pid != process_id:
+        return None
+    if create_time is not None:
+        process = source.process_info(pid)
+        if process is None or process[0] != create_time:
+            return None
+    return title
+
+
+class WindowSnapshot:
+    """Các cửa sổ cấp cao nhất đang hiển thị tại một thời điểm (không thay đổi sau khi chụp)
+
+    processes là ảnh chụp tiến trình đi kèm: chỉ các pid sở hữu cửa sổ được hỏi tới mới
+    được đọc, mỗi pid một lần cho cả thao tác.
+    """
+
+    def __init__(self, windows, processes=None):
+        self.windows = tuple(windows)
+        self.processes = processes if processes is not None else ProcessSnapshot()
+        self._by_hwnd = {window.hwnd: window for window in self.windows}
+
+    @classmethod
+    def capture(cls, source=None):
+        """Duyệt desktop một lần qua nguồn cửa sổ (mặc định Win32Windows)"""
+        if source is None:
+            source = Win32Windows()
+        windows = []
+        for hwnd in source.windows():
+            info = source.window_info(hwnd)
+            if info is None:
+                continue
+            title, pid = info
+            windows.append(WindowInfo(hwnd, title or "", pid))
+        return cls(windows, ProcessSnapshot(lookup=source.process_info))
+
+    def __iter__(self):
+        return iter(self.windows)
+
+    def __len__(self):
+        return len(self.windows)
+
+    def get(self, hwnd):
+        """Cửa sổ hwnd trong ảnh chụp, None nếu không có"""
+        return self._by_hwnd.get(hwnd)
+
+    def with_title(self, title):
+        """Cửa sổ đầu tiên có đúng tiêu đề đã cho, None nếu không có"""
+        for window in self.windows:
+            if window.title == title:
+                return window
+        return None
+
+    def create_time(self, pid):
+        """Thời điểm khởi động của tiến trình pid (None nếu không còn/không đọc được)"""
+        identity = self.processes.identity(pid)
+        return None if identity is None else identity[1]
+
+    def handle_info(self, window):
+        """hwnd, pid và create_time của cửa sổ: định danh để đăng nhập đúng cửa sổ về sau"""
+        return {"hwnd": window.hwnd, "process_id": window.pid, "create_time": self.create_time(window.pid)}
+
+    def window_object(self, hwnd):
+        """Đối tượng pywinauto của cửa sổ hwnd (để focus/gửi phím), tạo khi cần"""
+        return window_object(hwnd)